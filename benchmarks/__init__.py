@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""
+Reproducible benchmarks of the chair extraction pipeline.
+
+    python -m benchmarks generate 100000 floor.dxf
+    python -m benchmarks run --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks compare baseline.json results.json
+    python -m benchmarks memory --sizes 10000 100000
+    python -m benchmarks save --sizes 100000 1000000
+    python -m benchmarks parallel --sizes 100000 1000000 --workers 2 4 8
+    python -m benchmarks delete --chairs 10000 100000 500000
+    python -m benchmarks diff --chairs 10000 100000 1000000
+    python -m benchmarks clusters --chairs 10000 100000 1000000
+    python -m benchmarks bins
+    python -m benchmarks imports
+
+Everything runs offline: the DXF inputs are synthetic ADAPT-Floor style
+exports generated from a fixed seed.
+"""
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""Command line of the benchmark suite, see benchmarks/__init__.py"""
+
+import argparse
+import json
+import sys
+
+from benchmarks.bench import DEFAULT_DATA_DIR, DEFAULT_SIZES, compare_results, run_benchmarks
+from benchmarks.bins import DEFAULT_MAX_HEIGHT, check_chair_bins
+from benchmarks.clusters import DEFAULT_CHAIRS as DEFAULT_CLUSTER_CHAIRS, DEFAULT_PAIRWISE_MAX, measure_clusters
+from benchmarks.delete import DEFAULT_CHAIRS, DEFAULT_LEGACY_MAX, measure_delete
+from benchmarks.diff import DEFAULT_CHAIRS as DEFAULT_DIFF_CHAIRS, measure_diff
+from benchmarks.imports import measure_imports
+from benchmarks.memory import measure_memory
+from benchmarks.parallel import DEFAULT_WORKERS, measure_parallel
+from benchmarks.save import measure_save
+from benchmarks.synthetic import generate_dxf
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmarks',
+                                     description="Chair extraction benchmarks on synthetic DXF files")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    gen = commands.add_parser('generate', help="write one synthetic DXF file")
+    gen.add_argument('entities', type=int)
+    gen.add_argument('path')
+    gen.add_argument('--seed', type=int, default=0)
+
+    run = commands.add_parser('run', help="time process_dxf end to end and per stage")
+    run.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    run.add_argument('--modes', nargs='+', choices=['full', 'stream', 'fast'], default=['full', 'stream'],
+                     help="'fast' is the full mode with --fast-save")
+    run.add_argument('--repeat', type=int, default=1, help="keep the fastest of N runs")
+    run.add_argument('--seed', type=int, default=0)
+    run.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where the synthetic files are kept")
+    run.add_argument('--output', help="JSON file for the results (default: stdout)")
+
+    cmp = commands.add_parser('compare', help="compare two result files")
+    cmp.add_argument('baseline')
+    cmp.add_argument('current')
+    cmp.add_argument('--threshold', type=float, default=0.10,
+                     help="relative growth reported as a regression (default 0.10)")
+
+    mem = commands.add_parser('memory', help="size of the chair dataset: ChairTable against mtext_df")
+    mem.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    mem.add_argument('--seed', type=int, default=0)
+    mem.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where the synthetic files are kept")
+
+    save = commands.add_parser('save', help="output write time: saveas against the spliced fast path")
+    save.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES))
+    save.add_argument('--seed', type=int, default=0)
+    save.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where the synthetic files are kept")
+    save.add_argument('--no-check', action='store_true', help="skip reading back and auditing the output")
+
+    par = commands.add_parser('parallel', help="parallel ENTITIES scan against the single-process reader")
+    par.add_argument('--sizes', type=int, nargs='+', default=[100_000, 1_000_000])
+    par.add_argument('--workers', type=int, nargs='+', default=list(DEFAULT_WORKERS))
+    par.add_argument('--seed', type=int, default=0)
+    par.add_argument('--data-dir', default=DEFAULT_DATA_DIR, help="where the synthetic files are kept")
+
+    delete = commands.add_parser('delete', help="MTEXT removal time: per-entity delete against one pass")
+    delete.add_argument('--chairs', type=int, nargs='+', default=list(DEFAULT_CHAIRS))
+    delete.add_argument('--legacy-max', type=int, default=DEFAULT_LEGACY_MAX,
+                        help="largest size timed with the per-entity loop (default %(default)s)")
+
+    diff = commands.add_parser('diff', help="revision diff time on synthetic chair datasets")
+    diff.add_argument('--chairs', type=int, nargs='+', default=list(DEFAULT_DIFF_CHAIRS))
+    diff.add_argument('--tolerance', type=float, default=0.1)
+    diff.add_argument('--seed', type=int, default=0)
+
+    clusters = commands.add_parser('clusters', help="duplicate chair grouping: grid hash against pairwise")
+    clusters.add_argument('--chairs', type=int, nargs='+', default=list(DEFAULT_CLUSTER_CHAIRS))
+    clusters.add_argument('--pairwise-max', type=int, default=DEFAULT_PAIRWISE_MAX,
+                          help="largest size checked pairwise (default %(default)s)")
+    clusters.add_argument('--seed', type=int, default=0)
+
+    bins = commands.add_parser('bins', help="check the chair bin tables against the row-by-row functions")
+    bins.add_argument('--max-height', type=float, default=DEFAULT_MAX_HEIGHT,
+                      help="largest chair height checked in inches (default %(default)s)")
+
+    imports = commands.add_parser('imports', help="cold import time of the modules (python -X importtime)")
+    imports.add_argument('--repeat', type=int, default=3, help="keep the fastest of N imports")
+
+    args = parser.parse_args(argv)
+
+    if args.command == 'generate':
+        print(json.dumps(generate_dxf(args.path, args.entities, seed=args.seed)))
+        return 0
+
+    if args.command == 'run':
+        results = run_benchmarks(args.sizes, args.modes, repeat=args.repeat, seed=args.seed,
+                                 data_dir=args.data_dir, log=lambda line: print(line, file=sys.stderr))
+        text = json.dumps(results, indent=2)
+        if args.output:
+            with open(args.output, 'w') as fp:
+                fp.write(text)
+        else:
+            print(text)
+        return 0
+
+    if args.command == 'memory':
+        rows = measure_memory(args.sizes, seed=args.seed, data_dir=args.data_dir,
+                              log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.command == 'save':
+        rows = measure_save(args.sizes, seed=args.seed, data_dir=args.data_dir, check=not args.no_check,
+                            log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.command == 'parallel':
+        rows = measure_parallel(args.sizes, args.workers, seed=args.seed, data_dir=args.data_dir,
+                                log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.command == 'delete':
+        rows = measure_delete(args.chairs, legacy_max=args.legacy_max,
+                              log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0
+
+    if args.command == 'diff':
+        rows = measure_diff(args.chairs, tolerance=args.tolerance, seed=args.seed,
+                            log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0 if all(row['exact'] for row in rows) else 1
+
+    if args.command == 'clusters':
+        rows = measure_clusters(args.chairs, pairwise_max=args.pairwise_max, seed=args.seed,
+                                log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        return 0 if all(row['same_groups'] is not False for row in rows) else 1
+
+    if args.command == 'bins':
+        try:
+            checked = check_chair_bins(args.max_height)
+        except AssertionError as e:
+            print(f"mismatch: {e}", file=sys.stderr)
+            return 1
+        print(json.dumps({'checked': checked}))
+        return 0
+
+    if args.command == 'imports':
+        rows = measure_imports(repeat=args.repeat, log=lambda line: print(line, file=sys.stderr))
+        print(json.dumps(rows, indent=2))
+        # a lean module importing a heavy library fails the run
+        return 0 if all(row.get('ok', True) for row in rows) else 1
+
+    with open(args.baseline) as fp:
+        baseline = json.load(fp)
+    with open(args.current) as fp:
+        current = json.load(fp)
+    rows = compare_results(baseline, current, args.threshold)
+    regressions = 0
+    for size, mode, metric, old, new, ratio, regression in rows:
+        flag = '  REGRESSION' if regression else ''
+        print(f"{size:>9,} {mode:<6} {metric:<22} {old:10.3f} -> {new:10.3f}  x{ratio:5.2f}{flag}")
+        regressions += regression
+    print(f"{regressions} regression(s) above {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmark runner and result comparison.
+
+Each case (file size, read mode) runs dxf_extraction.py in a fresh Python
+process with --profile-json, so the end-to-end wall time includes start-up
+and imports, the peak RSS belongs to that run only and the per-stage times
+come from the pipeline's own StageProfiler.
+"""
+
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from benchmarks.synthetic import generate_dxf
+
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_SIZES = (1_000, 10_000, 100_000, 1_000_000)
+DEFAULT_DATA_DIR = os.path.join(tempfile.gettempdir(), 'dxf_benchmarks')
+FORMAT_VERSION = 1
+
+
+def _versions():
+    versions = {'python': platform.python_version(), 'platform': platform.platform()}
+    for name in ('ezdxf', 'numpy', 'pandas'):
+        try:
+            versions[name] = __import__(name).__version__
+        except ImportError:
+            versions[name] = None
+    try:
+        versions['git_commit'] = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_DIR,
+            capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        versions['git_commit'] = None
+    return versions
+
+
+def synthetic_file(n_entities, seed=0, data_dir=DEFAULT_DATA_DIR):
+    """Path and stats of the synthetic file of n_entities, generated once per seed"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"synthetic_{n_entities}_s{seed}.dxf")
+    stats_path = path + '.json'
+    if os.path.exists(path) and os.path.exists(stats_path):
+        with open(stats_path) as fp:
+            return path, json.load(fp)
+    stats = generate_dxf(path, n_entities, seed=seed)
+    with open(stats_path, 'w') as fp:
+        json.dump(stats, fp)
+    return path, stats
+
+
+def run_case(dxf_path, layer, z_offset=0.25, mode='full', extra_args=()):
+    """Run the extraction CLI once in a fresh process and return its measurements"""
+    with tempfile.TemporaryDirectory() as tmp:
+        output_dxf = os.path.join(tmp, 'out.dxf')
+        profile_json = os.path.join(tmp, 'profile.json')
+        cmd = [sys.executable, os.path.join(REPO_DIR, 'dxf_extraction.py'),
+               dxf_path, layer, str(z_offset), output_dxf, '--profile-json', profile_json]
+        if mode == 'stream':
+            cmd.append('--stream')
+        elif mode == 'fast':
+            cmd.append('--fast-save')
+        cmd.extend(extra_args)
+        start = time.perf_counter()
+        subprocess.run(cmd, cwd=REPO_DIR, check=True, stdout=subprocess.DEVNULL)
+        wall = time.perf_counter() - start
+        with open(profile_json) as fp:
+            profile = json.load(fp)
+    return {
+        'wall_s': wall,
+        'pipeline_s': profile['total_wall_s'],
+        'cpu_s': profile['total_cpu_s'],
+        'peak_rss_mb': profile['peak_rss_mb'],
+        'children_peak_rss_mb': profile.get('children_peak_rss_mb'),
+        'stages': {stage['stage']: stage['wall_s'] for stage in profile['stages']},
+    }
+
+
+def run_benchmarks(sizes=DEFAULT_SIZES, modes=('full', 'stream'), repeat=1, seed=0,
+                   z_offset=0.25, data_dir=DEFAULT_DATA_DIR, log=print):
+    """Benchmark every (size, mode) case, keeping the fastest of repeat runs"""
+    results = []
+    for n_entities in sizes:
+        path, stats = synthetic_file(n_entities, seed=seed, data_dir=data_dir)
+        for mode in modes:
+            runs = [run_case(path, stats['layer'], z_offset, mode) for _ in range(repeat)]
+            best = min(runs, key=lambda run: run['wall_s'])
+            best.update(size=n_entities, mode=mode, chairs=stats['chair'],
+                        file_mb=stats['bytes'] / 2**20, repeat=repeat)
+            results.append(best)
+            if log:
+                log(f"{n_entities:>9,} entities  {mode:<6}  {best['wall_s']:8.2f} s  "
+                    f"{best['peak_rss_mb']:8.1f} MB peak RSS")
+    return {
+        'format': FORMAT_VERSION,
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'seed': seed,
+        'z_offset': z_offset,
+        'environment': _versions(),
+        'results': results,
+    }
+
+
+def compare_results(baseline, current, threshold=0.10):
+    """Relative change of each metric between two result files
+
+    Returns rows (size, mode, metric, baseline, current, ratio, regression)
+    where regression is True when the metric grew by more than threshold.
+    """
+    base_cases = {(r['size'], r['mode']): r for r in baseline['results']}
+    rows = []
+    for result in current['results']:
+        base = base_cases.get((result['size'], result['mode']))
+        if base is None:
+            continue
+        metrics = [('wall_s', base['wall_s'], result['wall_s']),
+                   ('peak_rss_mb', base['peak_rss_mb'], result['peak_rss_mb'])]
+        metrics += [(f"stage:{name}", base['stages'][name], value)
+                    for name, value in result['stages'].items() if name in base['stages']]
+        for metric, old, new in metrics:
+            if old is None or new is None:
+                continue
+            ratio = new / old if old else float('inf')
+            rows.append((result['size'], result['mode'], metric, old, new, ratio,
+                         ratio > 1 + threshold))
+    return rows
@@ -0,0 +1,274 @@
+# -*- coding: utf-8 -*-
+"""
+Chair bins: chair_bins.classify_chairs against the row-by-row functions.
+
+The row-by-row functions below are the original chair height, colour and
+fraction code, superseded by the lookup tables of chair_bins and kept here
+only to check that the tables reproduce them exactly for every 1/4" bin.
+"""
+
+import sys
+from fractions import Fraction
+
+from benchmarks.bench import REPO_DIR
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+DEFAULT_MAX_HEIGHT = 10.0
+
+
+def chair(h_CG, z_offset):
+    """Chair height in inches for one CGS height in mm (row-by-row reference)"""
+    x = float(h_CG)
+    if x >= 25:
+        hc = round(float(Fraction(round((x / 25 - float(z_offset))*4,0)/4)),2)   # ok.
+    elif x >= 10:
+        hc = 0.75
+    #else: hc = (round(x,1))
+    else: hc = 0
+    return hc
+
+
+def convert_to_mixed_number(x):
+    """Mixed-number string of a height in inches, e.g. 2.25 -> '2 1/4'"""
+
+    #decimal_value = 5.25
+    fraction_object = Fraction(x)
+    
+    whole_number = fraction_object.numerator // fraction_object.denominator
+    remainder_numerator = fraction_object.numerator % fraction_object.denominator
+    denominator = fraction_object.denominator
+    
+    if remainder_numerator == 0:
+
+        if whole_number == 0:
+            return " "
+        else: return (f"{whole_number}")
+            
+        print (f"{remainder_numerator}/{denominator}")
+        
+    else:
+
+        if whole_number == 0:
+            return (f"{remainder_numerator}/{denominator}")
+        else: return  (f"{whole_number} {remainder_numerator}/{denominator}")
+
+
+def assign_chair_colors(chair_height):
+    """RGB tuple of one chair height (row-by-row reference)"""
+    if not isinstance(chair_height, (int, float)) or chair_height == " ":
+        return (125, 125, 125)  # Default gray for missing/invalid values
+    
+    # Convert to float to ensure proper comparison
+    height = float(chair_height)
+    
+    # Define colors for different height ranges
+    # Starting from 1.00 with increments of 0.25
+    if height == 1.00:
+        return (0, 0, 255)  # Blue
+    elif height == 1.25:
+        return (0, 125, 255)
+    elif height == 1.50:
+        return (0, 255, 255)  # Cyan
+    elif height == 1.75:
+        return (0, 255, 125)
+    elif height == 2.00:
+        return (0, 255, 125)  # Green
+    elif height == 2.25:
+        return (125, 255, 0)
+    elif height == 2.50:
+        return (255, 255, 0)  # Yellow
+    elif height == 2.75:
+        return (255, 191, 0)
+    elif height == 3.00:
+        return (255, 125, 0)  # Orange
+    elif height == 3.25:
+        return (255, 64, 0)
+    elif height == 3.50:
+        return (255, 0, 0)  # Red
+    elif height == 3.75:
+        return (255, 0, 64)
+    elif height == 4.00:
+        return (255, 0, 125)  # Pink
+    elif height == 4.25:
+        return (255, 0, 191)
+    elif height == 4.50:
+        return (255, 0, 255)  # Magenta
+    elif height == 4.75:
+        return (191, 0, 255)
+    elif height == 5.00:
+        return (125, 0, 255)  # Purple
+    elif height == 5.25:
+        return (64, 0, 255)
+    elif height == 5.50:
+        return (0, 0, 191)  # Dark blue
+    elif height == 5.75:
+        return (0, 0, 125)
+    elif height >= 6.00:
+        return (0, 0, 64)  # Very dark blue
+    else:
+        # For values that fall between defined increments, find the closest lower increment
+        # and return its color directly instead of recursively calling the function
+        base_height = int(height * 4) / 4  # Round down to nearest 0.25
+        
+        # Use a direct mapping instead of recursion
+        color_map = {
+            1.00: (0, 0, 255),
+            1.25: (0, 125, 255),
+            1.50: (0, 255, 255),
+            1.75: (0, 255, 125),
+            2.00: (0, 255, 125),
+            2.25: (125, 255, 0),
+            2.50: (255, 255, 0),
+            2.75: (255, 191, 0),
+            3.00: (255, 125, 0),
+            3.25: (255, 64, 0),
+            3.50: (255, 0, 0),
+            3.75: (255, 0, 64),
+            4.00: (255, 0, 125),
+            4.25: (255, 0, 191),
+            4.50: (255, 0, 255),
+            4.75: (191, 0, 255),
+            5.00: (125, 0, 255),
+            5.25: (64, 0, 255),
+            5.50: (0, 0, 191),
+            5.75: (0, 0, 125),
+            6.00: (0,0,64)
+        }
+        
+        # Return the color for the base_height if it exists in the map
+        if base_height in color_map:
+            return color_map[base_height]
+        # If base_height is less than 1.00, return a default color
+        elif base_height < 1.00:
+            return (125, 125, 125)  # Default gray
+        # If base_height is greater than 5.75 but less than 6.00
+        else:
+            return (0, 0, 64)  # Very dark blue
+
+        if type(chair_height) == str : return " "
+
+
+def assign_chair_hex_colors(chair_height):
+    """Hex colour string of one chair height (row-by-row reference)"""
+    if not isinstance(chair_height, (int, float)) or chair_height == " ":
+        return "#808080"  # Default gray for missing/invalid values
+    
+    # Convert to float to ensure proper comparison
+    height = float(chair_height)
+    
+    # Define colors for different height ranges using hex notation
+    # Starting from 1.00 with increments of 0.25
+    if height == 1.00:
+        return "#0000FF"  # Blue
+    elif height == 1.25:
+        return "#0080FF"
+    elif height == 1.50:
+        return "#00FFFF"  # Cyan
+    elif height == 1.75:
+        return "#00FF80"
+    elif height == 2.00:
+        return "#00FF00"  # Green
+    elif height == 2.25:
+        return "#80FF00"
+    elif height == 2.50:
+        return "#FFFF00"  # Yellow
+    elif height == 2.75:
+        return "#FFBF00"
+    elif height == 3.00:
+        return "#FF8000"  # Orange
+    elif height == 3.25:
+        return "#FF4000"
+    elif height == 3.50:
+        return "#FF0000"  # Red
+    elif height == 3.75:
+        return "#FF0040"
+    elif height == 4.00:
+        return "#FF0080"  # Pink
+    elif height == 4.25:
+        return "#FF00BF"
+    elif height == 4.50:
+        return "#FF00FF"  # Magenta
+    elif height == 4.75:
+        return "#BF00FF"
+    elif height == 5.00:
+        return "#8000FF"  # Purple
+    elif height == 5.25:
+        return "#4000FF"
+    elif height == 5.50:
+        return "#0000BF"  # Dark blue
+    elif height == 5.75:
+        return "#000080"
+    elif height >= 6.00:
+        return "#000040"  # Very dark blue
+    else:
+        # For values that fall between defined increments, find the closest lower increment
+        # and return its color directly instead of recursively calling the function
+        base_height = int(height * 4) / 4  # Round down to nearest 0.25
+        
+        # Use a direct mapping instead of recursion
+        color_map = {
+            1.00: "#0000FF",
+            1.25: "#0080FF",
+            1.50: "#00FFFF",
+            1.75: "#00FF80",
+            2.00: "#00FF00",
+            2.25: "#80FF00",
+            2.50: "#FFFF00",
+            2.75: "#FFBF00",
+            3.00: "#FF8000",
+            3.25: "#FF4000",
+            3.50: "#FF0000",
+            3.75: "#FF0040",
+            4.00: "#FF0080",
+            4.25: "#FF00BF",
+            4.50: "#FF00FF",
+            4.75: "#BF00FF",
+            5.00: "#8000FF",
+            5.25: "#4000FF",
+            5.50: "#0000BF",
+            5.75: "#000080"
+        }
+        
+        # Return the color for the base_height if it exists in the map
+        if base_height in color_map:
+            return color_map[base_height]
+        # If base_height is less than 1.00, return a default color
+        elif base_height < 1.00:
+            return "#808080"  # Default gray
+        # If base_height is greater than 5.75 but less than 6.00
+        else:
+            return "#000040"  # Very dark blue
+
+        if type(chair_height) == str : return " "
+
+
+def check_chair_bins(max_height=DEFAULT_MAX_HEIGHT):
+    """Check classify_chairs against the row-by-row functions for every 1/4" bin
+
+    Every quarter-inch bin up to max_height inches is hit for each usual
+    z_offset, together with the 10 and 25 mm thresholds. Raises
+    AssertionError on the first mismatch and returns the number of CGS
+    values checked.
+    """
+    from ezdxf import colors
+    from chair_bins import classify_chairs
+
+    checked = 0
+    for z_offset in (0, 0.25, 0.5, 0.75):
+        h_cgs = [0.0, 5.0, 9.99, 10.0, 12.5, 24.99, 25.0]
+        h_cgs += [(q / 4 + z_offset) * 25 + d
+                  for q in range(int(max_height * 4) + 1) for d in (-3.1, 0.0, 3.1)]
+        h_cgs = [h for h in h_cgs if h >= 0]
+        chairs = classify_chairs(h_cgs, z_offset)
+        for i, h_CG in enumerate(h_cgs):
+            height = chair(h_CG, z_offset)
+            rgb = assign_chair_colors(height)
+            expected = (height, rgb, assign_chair_hex_colors(height),
+                        colors.rgb2int(rgb), convert_to_mixed_number(height))
+            got = (chairs['Chairs'][i], chairs['chairColor'][i], chairs['chairHexColor'][i],
+                   chairs['trueColor'][i], chairs['Chairs_Fraction'][i])
+            assert expected == got, f"CGS {h_CG} mm, z_offset {z_offset}: {got} != {expected}"
+            checked += 1
+    return checked
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""
+Duplicate chair grouping: chair_clusters.merge_chairs against the pairwise
+check.
+
+Each case spreads n chairs over a floor and puts a second label next to a
+share of them, as at tendon crossings.  The grid hash grouping is timed on
+every size; the O(n^2) pairwise distance check it replaces runs up to
+pairwise_max chairs (None in the results above that) and must find the same
+groups.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench import REPO_DIR
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+DEFAULT_CHAIRS = (10_000, 100_000, 1_000_000)
+DEFAULT_PAIRWISE_MAX = 20_000
+DUPLICATE_SHARE = 0.05
+MERGE_RADIUS = 0.05
+
+
+def _chairs(n_chairs, seed=0):
+    """x, y and quarters of n_chairs chairs, DUPLICATE_SHARE of them doubled"""
+    rng = np.random.default_rng(seed)
+    n_single = int(round(n_chairs / (1 + DUPLICATE_SHARE)))
+    extent = 3 * np.sqrt(n_chairs)  # about 3 units between chairs
+    x = rng.uniform(0, extent, n_single)
+    y = rng.uniform(0, extent, n_single)
+    doubled = rng.choice(n_single, n_chairs - n_single, replace=False)
+    x = np.r_[x, x[doubled] + rng.uniform(-0.02, 0.02, len(doubled))]
+    y = np.r_[y, y[doubled] + rng.uniform(-0.02, 0.02, len(doubled))]
+    return x, y, rng.integers(3, 24, n_chairs)
+
+
+def pairwise_groups(x, y, radius):
+    """Groups of the pairwise check, one row of distances at a time"""
+    group = np.arange(len(x))
+    for i in range(len(x)):
+        near = np.flatnonzero(np.hypot(x[i + 1:] - x[i], y[i + 1:] - y[i]) <= radius) + i + 1
+        if len(near):
+            # relabel both groups with the smaller root
+            roots = np.unique(group[np.r_[i, near]])
+            group[np.isin(group, roots)] = roots[0]
+    return group
+
+
+def measure_clusters(chairs=DEFAULT_CHAIRS, pairwise_max=DEFAULT_PAIRWISE_MAX, radius=MERGE_RADIUS,
+                     seed=0, log=print):
+    """Grouping time in s of n chairs with the grid hash and pairwise"""
+    from chair_clusters import merge_chairs
+
+    rows = []
+    for n_chairs in chairs:
+        x, y, quarters = _chairs(n_chairs, seed)
+        start = time.perf_counter()
+        keep, group, members = merge_chairs(x, y, quarters, radius)
+        grid_s = time.perf_counter() - start
+
+        pairwise_s = None
+        same = None
+        if n_chairs <= pairwise_max:
+            start = time.perf_counter()
+            reference = pairwise_groups(x, y, radius)
+            pairwise_s = time.perf_counter() - start
+            same = bool(np.array_equal(reference, group))
+
+        row = {'chairs': n_chairs, 'grid_s': grid_s, 'pairwise_s': pairwise_s,
+               'speedup': pairwise_s / grid_s if pairwise_s is not None else None,
+               'merged': len(members), 'kept': len(keep), 'same_groups': same}
+        rows.append(row)
+        if log:
+            pairwise = f"{pairwise_s:8.3f} s" if pairwise_s is not None else " skipped"
+            log(f"{n_chairs:>9,} chairs  grid {grid_s:7.3f} s  pairwise {pairwise}  "
+                f"{len(members)} in groups, {n_chairs - len(keep)} merged away  same {same}")
+    return rows
@@ -0,0 +1,78 @@
+# -*- coding: utf-8 -*-
+"""
+Removal of the chair MTEXT: msp.delete_entity() per entity against
+dxf_extraction.delete_entities().
+
+Each case builds a drawing in memory with n chair MTEXT on the tendon layer
+interleaved with as many LINE entities on another layer, so the modelspace
+holds 2n entities, and times only the removal.  The per-entity loop searches
+the entity list on every call and grows quadratically; above legacy_max
+chairs it is skipped (None in the results) as it would take many minutes.
+Both ways must leave the same entities in the same order.
+"""
+
+import sys
+import time
+
+from benchmarks.bench import REPO_DIR
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+DEFAULT_CHAIRS = (10_000, 100_000, 500_000)
+DEFAULT_LEGACY_MAX = 100_000
+
+
+def _drawing(n_chairs):
+    """New drawing with n_chairs MTEXT on PT_TENDON between LINEs, and their handles"""
+    import ezdxf
+
+    doc = ezdxf.new()
+    msp = doc.modelspace()
+    handles = []
+    for i in range(n_chairs):
+        x = float(i % 1000)
+        y = float(i // 1000)
+        msp.add_line((x, y), (x + 1, y), dxfattribs={'layer': 'TENDON_LINES'})
+        mtext = msp.add_mtext(f"\\A1;{25 + i % 150}", dxfattribs={'layer': 'PT_TENDON', 'insert': (x, y)})
+        handles.append(mtext.dxf.handle)
+    return doc, handles
+
+
+def _remaining(doc):
+    return [entity.dxf.handle for entity in doc.modelspace()]
+
+
+def measure_delete(chairs=DEFAULT_CHAIRS, legacy_max=DEFAULT_LEGACY_MAX, log=print):
+    """Removal time in s of n chair MTEXT, per entity and in one pass"""
+    from dxf_extraction import delete_entities
+
+    rows = []
+    for n_chairs in chairs:
+        doc, handles = _drawing(n_chairs)
+        start = time.perf_counter()
+        delete_entities(doc.modelspace(), handles)
+        bulk_s = time.perf_counter() - start
+        remaining = _remaining(doc)
+        in_db = sum(handle in doc.entitydb for handle in handles)
+
+        legacy_s = None
+        same = None
+        if n_chairs <= legacy_max:
+            doc, handles = _drawing(n_chairs)
+            msp = doc.modelspace()
+            start = time.perf_counter()
+            for handle in handles:
+                msp.delete_entity(doc.entitydb[handle])
+            legacy_s = time.perf_counter() - start
+            same = _remaining(doc) == remaining
+
+        row = {'chairs': n_chairs, 'entities': 2 * n_chairs, 'per_entity_s': legacy_s,
+               'bulk_s': bulk_s, 'speedup': legacy_s / bulk_s if legacy_s is not None else None,
+               'same_entities': same, 'left_in_entitydb': in_db}
+        rows.append(row)
+        if log:
+            legacy = f"{legacy_s:9.3f} s" if legacy_s is not None else "  skipped"
+            log(f"{n_chairs:>9,} chairs  per entity {legacy}  bulk {bulk_s:7.3f} s  "
+                f"same {same}  left in db {in_db}")
+    return rows
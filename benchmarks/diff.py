@@ -0,0 +1,83 @@
+# -*- coding: utf-8 -*-
+"""
+Revision diff (chair_diff.diff_chairs) on two synthetic chair datasets.
+
+The current revision is the previous one with every chair moved by less
+than the tolerance, a share of the handles shuffled as by a re-export, and a
+known number of chairs raised by 1/4", removed and added.  The chairs sit
+on a jittered grid ten tolerances wide and the added ones between its
+points, so no two chairs are within the tolerance and every planted change
+has to come out exactly.  The time per chair shows whether the matching
+stays near linear as the datasets grow.
+"""
+
+import sys
+import time
+
+import numpy as np
+
+from benchmarks.bench import REPO_DIR
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+DEFAULT_CHAIRS = (10_000, 100_000, 1_000_000)
+CHANGE_SHARE = 0.01    # share of the chairs changed, removed and added each
+RENUMBER_SHARE = 0.5   # share of the handles shuffled in the current revision
+
+
+def _revisions(n_chairs, tolerance, seed=0):
+    """Previous and current chair frames and the planted changes"""
+    import pandas as pd
+
+    rng = np.random.default_rng(seed)
+    spacing = 10 * tolerance
+    width = int(np.ceil(np.sqrt(n_chairs)))
+    n_changes = max(int(n_chairs * CHANGE_SHARE), 1)
+
+    def chairs(n, first_handle, shift):
+        cells = np.arange(n)
+        # up to 2 tolerances off the grid point, 1.4 or more from any other chair
+        x = (cells % width + shift) * spacing + rng.uniform(-2, 2, n) * tolerance
+        y = (cells // width + shift) * spacing + rng.uniform(-2, 2, n) * tolerance
+        return pd.DataFrame({'x': x, 'y': y,
+                             'handle': [format(first_handle + i, 'X') for i in range(n)],
+                             'Chairs': rng.integers(3, 24, n) / 4})
+
+    previous = chairs(n_chairs, 0x1000, 0.0)
+    current = previous.copy()
+    jitter = tolerance / 4
+    current['x'] += rng.uniform(-jitter, jitter, n_chairs)
+    current['y'] += rng.uniform(-jitter, jitter, n_chairs)
+    picked = rng.choice(n_chairs, 2 * n_changes, replace=False)
+    changed, removed = picked[:n_changes], picked[n_changes:]
+    current.loc[changed, 'Chairs'] += 0.25
+    current = current.drop(removed)
+    current = pd.concat([current, chairs(n_changes, 0x1000 + n_chairs, 0.5)], ignore_index=True)
+    handles = current['handle'].to_numpy(dtype=object)
+    shuffled = rng.choice(len(handles), int(len(handles) * RENUMBER_SHARE), replace=False)
+    handles[shuffled] = handles[rng.permutation(shuffled)]
+    current['handle'] = handles
+    return previous, current, n_changes
+
+
+def measure_diff(chairs=DEFAULT_CHAIRS, tolerance=0.1, seed=0, log=print):
+    """Diff time in s per dataset size and whether the planted changes were found"""
+    from chair_diff import diff_chairs
+
+    rows = []
+    for n_chairs in chairs:
+        previous, current, n_changes = _revisions(n_chairs, tolerance, seed)
+        start = time.perf_counter()
+        diff_df, delta_df = diff_chairs(previous, current, tolerance)
+        diff_s = time.perf_counter() - start
+        found = diff_df['status'].value_counts().reindex(['changed', 'added', 'removed'], fill_value=0)
+        row = {'chairs': n_chairs, 'diff_s': diff_s, 'us_per_chair': diff_s / n_chairs * 1e6,
+               'planted': n_changes, **{status: int(n) for status, n in found.items()},
+               'exact': bool((found == n_changes).all())}
+        rows.append(row)
+        if log:
+            log(f"{n_chairs:>9,} chairs  {diff_s:7.3f} s  {row['us_per_chair']:5.2f} us/chair  "
+                f"changed {row['changed']} added {row['added']} removed {row['removed']} "
+                f"of {n_changes}  exact {row['exact']}")
+    return rows
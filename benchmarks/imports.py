@@ -0,0 +1,97 @@
+# -*- coding: utf-8 -*-
+"""
+Cold start: import time of the modules, measured with python -X importtime.
+
+Each module is imported in a fresh interpreter and the cumulative time of
+its own import line is kept (the fastest of the repeats).  Every module has
+a list of the heavy libraries it may load at import; one that loads another
+(pandas, ezdxf, openpyxl or pyarrow) is reported as a failure, so a stray
+top-level import in the lean core shows up like a regression.  The command
+line start-up is timed with --help, which needs no heavy library either.
+"""
+
+import subprocess
+import sys
+import time
+
+from benchmarks.bench import REPO_DIR
+
+
+HEAVY_LIBRARIES = ('pandas', 'ezdxf', 'openpyxl', 'pyarrow')
+
+# pandas 3 imports pyarrow itself when it is installed
+PANDAS = ('pandas', 'pyarrow')
+
+# module -> heavy libraries it may import when it is imported
+IMPORT_CASES = {
+    'chair_bins': (),
+    'chair_clusters': PANDAS,
+    'chair_export': (),
+    'dxf_splice': (),
+    'result_cache': (),
+    'dxf_extraction': (),
+    'chair_table': PANDAS,
+    'chair_regions': PANDAS,
+    'dxf_batch': PANDAS,
+    'chair_diff': PANDAS,
+}
+
+# scripts whose --help is timed
+CLI_SCRIPTS = ('dxf_extraction.py', 'dxf_batch.py')
+
+
+def parse_importtime(stderr):
+    """{module name: cumulative import time in us} from python -X importtime output"""
+    times = {}
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # the column header
+        times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+def import_time(module, repeat=3, python=sys.executable):
+    """Cold import time of module in ms and the heavy libraries it loaded"""
+    best = None
+    for _ in range(repeat):
+        result = subprocess.run([python, '-X', 'importtime', '-c', f'import {module}'],
+                                cwd=REPO_DIR, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+        times = parse_importtime(result.stderr)
+        ms = times[module] / 1000
+        best = ms if best is None else min(best, ms)
+    loaded = sorted({name.split('.')[0] for name in times} & set(HEAVY_LIBRARIES))
+    return best, loaded
+
+
+def cli_start_time(script, repeat=3, python=sys.executable):
+    """Wall time in s of 'python script --help' in a fresh process"""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([python, script, '--help'], cwd=REPO_DIR, capture_output=True, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def measure_imports(cases=IMPORT_CASES, scripts=CLI_SCRIPTS, repeat=3, log=print):
+    """One row per module and per script: cold start time and heavy libraries loaded"""
+    rows = []
+    for module, allowed in cases.items():
+        ms, loaded = import_time(module, repeat=repeat)
+        unexpected = [name for name in loaded if name not in allowed]
+        rows.append({'module': module, 'import_ms': ms, 'heavy': loaded, 'ok': not unexpected})
+        if log:
+            flag = f"  UNEXPECTED {', '.join(unexpected)}" if unexpected else ''
+            log(f"{module:<16} {ms:8.1f} ms  {', '.join(loaded) or '-'}{flag}")
+    for script in scripts:
+        seconds = cli_start_time(script, repeat=repeat)
+        rows.append({'script': script, 'help_s': seconds})
+        if log:
+            log(f"{script + ' --help':<24} {seconds:6.3f} s")
+    return rows
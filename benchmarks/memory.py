@@ -0,0 +1,52 @@
+# -*- coding: utf-8 -*-
+"""
+Memory of the chair dataset: the wide mtext_df frame against the ChairTable.
+
+For each synthetic file the layer is streamed once, then the sizes of the
+classified ChairTable, the mtext_df frame process_dxf returns and the compact
+display frame are compared.  The Arrow sizes are what st.dataframe sends to
+the browser for each frame.
+"""
+
+import sys
+
+from benchmarks.bench import DEFAULT_DATA_DIR, DEFAULT_SIZES, REPO_DIR, synthetic_file
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+def _arrow_mb(frame):
+    """Arrow size of a frame in MB, None without pyarrow"""
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return None
+    return pa.Table.from_pandas(frame, preserve_index=False).nbytes / 2**20
+
+
+def measure_memory(sizes=DEFAULT_SIZES, seed=0, z_offset=0.25, data_dir=DEFAULT_DATA_DIR, log=print):
+    """Sizes in MB of the chair dataset representations for each file size"""
+    from dxf_extraction import stream_layer
+
+    rows = []
+    for n_entities in sizes:
+        path, stats = synthetic_file(n_entities, seed=seed, data_dir=data_dir)
+        table = stream_layer(path, stats['layer']).chair_table().classify(z_offset)
+        frame = table.to_frame()
+        display = table.to_frame(compact=True)
+        row = {
+            'size': n_entities,
+            'chairs': len(table),
+            'table_mb': table.nbytes / 2**20,
+            'frame_mb': frame.memory_usage(deep=True).sum() / 2**20,
+            'display_frame_mb': display.memory_usage(deep=True).sum() / 2**20,
+            'frame_arrow_mb': _arrow_mb(frame),
+            'display_arrow_mb': _arrow_mb(display),
+        }
+        row['frame_to_table'] = row['frame_mb'] / row['table_mb'] if row['table_mb'] else None
+        rows.append(row)
+        if log:
+            log(f"{n_entities:>9,} entities  {len(table):>8,} chairs  table {row['table_mb']:8.2f} MB  "
+                f"frame {row['frame_mb']:8.2f} MB  display {row['display_frame_mb']:8.2f} MB")
+    return rows
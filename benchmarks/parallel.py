@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel ENTITIES scan (dxf_parallel) against the single-process reader.
+
+Each case runs the read-only extraction CLI (--stream) in a fresh process,
+once without --workers and once per worker count, and reports the wall time,
+the time of the stream stage, the speedup over the single-process reader,
+the peak RSS of the main process and of the largest worker.  The worst case
+memory is the main process plus every worker at that peak.  The chair
+schedules of all runs are compared with the sequential one.
+"""
+
+import os
+import tempfile
+
+from benchmarks.bench import DEFAULT_DATA_DIR, run_case, synthetic_file
+
+DEFAULT_WORKERS = (2, 4, 8)
+
+
+def _read(path):
+    with open(path, 'rb') as fp:
+        return fp.read()
+
+
+def measure_parallel(sizes, workers=DEFAULT_WORKERS, seed=0, z_offset=0.25, data_dir=DEFAULT_DATA_DIR,
+                     log=print):
+    """One row per (size, worker count), workers 1 being the sequential reader"""
+    rows = []
+    for n_entities in sizes:
+        path, stats = synthetic_file(n_entities, seed=seed, data_dir=data_dir)
+        with tempfile.TemporaryDirectory() as tmp:
+            baseline = None
+            for n_workers in (1,) + tuple(workers):
+                schedule = os.path.join(tmp, f"counts_{n_workers}.csv")
+                extra = ['--schedule', schedule]
+                if n_workers > 1:
+                    extra += ['--workers', str(n_workers)]
+                run = run_case(path, stats['layer'], z_offset, 'stream', extra_args=extra)
+                if baseline is None:
+                    baseline = (run, _read(schedule))
+                base_run, base_schedule = baseline
+                worker_mb = run['children_peak_rss_mb'] if n_workers > 1 else None
+                row = {
+                    'size': n_entities,
+                    'workers': n_workers,
+                    'wall_s': run['wall_s'],
+                    'stream_s': run['stages'].get('stream'),
+                    'speedup': base_run['wall_s'] / run['wall_s'],
+                    'stream_speedup': base_run['stages']['stream'] / run['stages']['stream'],
+                    'peak_rss_mb': run['peak_rss_mb'],
+                    'worker_peak_rss_mb': worker_mb,
+                    'total_rss_bound_mb': run['peak_rss_mb'] + (n_workers * worker_mb if worker_mb else 0),
+                    'same_counts': _read(schedule) == base_schedule,
+                }
+                rows.append(row)
+                if log:
+                    worker = f"{worker_mb:7.1f} MB" if worker_mb else "      -   "
+                    log(f"{n_entities:>9,} entities  {n_workers:>2} workers  {row['wall_s']:7.2f} s  "
+                        f"stream x{row['stream_speedup']:5.2f}  main {row['peak_rss_mb']:7.1f} MB  "
+                        f"worker {worker}  same {row['same_counts']}")
+    return rows
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+"""
+Save time of the annotated DXF: doc.saveas() against the spliced fast path.
+
+For each synthetic file the document is loaded and annotated twice, once
+saved in full and once spliced into the original bytes (dxf_splice).  Both
+the save stage alone and the whole write (MTEXT delete, labels and save) are
+timed; the fast path formats the labels into the output instead of creating
+entities and cuts the MTEXT from the copied bytes.  The spliced file is read
+back with ezdxf and audited to check that it holds the same entities and a
+valid handle seed.
+"""
+
+import os
+import sys
+import tempfile
+
+from benchmarks.bench import DEFAULT_DATA_DIR, DEFAULT_SIZES, REPO_DIR, synthetic_file
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+WRITE_STAGES = ('delete', 'annotate', 'save')
+
+
+def _write_seconds(path, layer, z_offset, output, fast):
+    """Wall time of the save stage and of all write stages of one annotation run"""
+    from dxf_extraction import LayerSelection, read_dxf, scan_layers, write_chair_layers
+    from pipeline_profile import StageProfiler
+
+    doc = read_dxf(path)
+    scans = scan_layers(doc.modelspace(), LayerSelection(layer))
+    layers = [(name, scan.chair_table().classify(z_offset), scan.mtext_handles)
+              for name, scan in scans.items()]
+    profile = StageProfiler()
+    write_chair_layers(doc, layers, output, profile=profile, source=path if fast else None)
+    stages = {stage['stage']: stage['wall_s'] for stage in profile.stages}
+    return stages['save'], sum(stages.get(name, 0.0) for name in WRITE_STAGES)
+
+
+def _check_output(full_path, fast_path):
+    """Audit errors of the spliced file and whether its entities match the full save"""
+    import ezdxf
+
+    def entities(doc):
+        return [(e.dxftype(), e.dxf.handle, e.dxf.layer) for e in doc.modelspace()]
+
+    full, fast = ezdxf.readfile(full_path), ezdxf.readfile(fast_path)
+    seed = int(fast.header['$HANDSEED'], 16)
+    return {
+        'same_entities': entities(full) == entities(fast),
+        'seed_above_handles': all(int(h, 16) < seed for h in full.entitydb.keys()),
+        'audit_errors': len(fast.audit().errors),
+    }
+
+
+def measure_save(sizes=DEFAULT_SIZES, seed=0, z_offset=0.25, data_dir=DEFAULT_DATA_DIR,
+                 check=True, log=print):
+    """Save and write seconds of saveas and of the spliced writer for each file size"""
+    rows = []
+    for n_entities in sizes:
+        path, stats = synthetic_file(n_entities, seed=seed, data_dir=data_dir)
+        with tempfile.TemporaryDirectory() as tmp:
+            full_path = os.path.join(tmp, 'full.dxf')
+            fast_path = os.path.join(tmp, 'fast.dxf')
+            saveas_s, saveas_write_s = _write_seconds(path, stats['layer'], z_offset, full_path, fast=False)
+            splice_s, splice_write_s = _write_seconds(path, stats['layer'], z_offset, fast_path, fast=True)
+            row = {
+                'size': n_entities,
+                'file_mb': stats['bytes'] / 2**20,
+                'saveas_s': saveas_s,
+                'splice_s': splice_s,
+                'speedup': saveas_s / splice_s if splice_s else None,
+                'saveas_write_s': saveas_write_s,
+                'splice_write_s': splice_write_s,
+                'write_speedup': saveas_write_s / splice_write_s if splice_write_s else None,
+                'output_mb': os.path.getsize(full_path) / 2**20,
+                'spliced_output_mb': os.path.getsize(fast_path) / 2**20,
+            }
+            if check:
+                row.update(_check_output(full_path, fast_path))
+        rows.append(row)
+        if log:
+            log(f"{n_entities:>9,} entities  save: saveas {saveas_s:8.3f} s  splice {splice_s:8.3f} s  "
+                f"x{row['speedup']:.1f}   write: {saveas_write_s:8.3f} s  {splice_write_s:8.3f} s  "
+                f"x{row['write_speedup']:.1f}")
+    return rows
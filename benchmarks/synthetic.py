@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+Synthetic DXF files shaped like ADAPT-Floor exports.
+
+The tendon layer holds the MTEXT height labels (``\\A1;<CGS in mm>``), the
+"Elong" labels and the tendon polylines; distractor layers hold grid lines
+and their own MTEXT so the layer filter has real work to do.  ezdxf builds
+the skeleton (header, tables, objects) and the entities are streamed as DXF
+text, so a million entities are written in seconds and with flat memory.
+"""
+
+import io
+import os
+import random
+import re
+
+import ezdxf
+
+
+TENDON_LAYER = 'PT_TENDON'
+DISTRACTOR_LAYERS = ('GRID', 'SLAB_OUTLINE', 'DIMENSIONS')
+
+# Share of each entity kind, the rest are distractor entities
+CHAIR_SHARE = 0.45
+ELONG_SHARE = 0.05
+TENDON_LINE_SHARE = 0.20
+
+# CGS heights in mm, a few below the 10 and 25 mm thresholds
+CGS_HEIGHTS = [0, 5, 12, 20] + list(range(25, 191, 3))
+
+MTEXT = ("  0\nMTEXT\n  5\n{handle}\n330\n{owner}\n100\nAcDbEntity\n  8\n{layer}\n"
+         "100\nAcDbMText\n 10\n{x}\n 20\n{y}\n 30\n{z}\n 40\n0.1\n 71\n1\n  1\n{text}\n")
+LINE = ("  0\nLINE\n  5\n{handle}\n330\n{owner}\n100\nAcDbEntity\n  8\n{layer}\n"
+        "100\nAcDbLine\n 10\n{x}\n 20\n{y}\n 30\n0.0\n 11\n{x2}\n 21\n{y2}\n 31\n0.0\n")
+LWPOLYLINE = ("  0\nLWPOLYLINE\n  5\n{handle}\n330\n{owner}\n100\nAcDbEntity\n  8\n{layer}\n"
+              "100\nAcDbPolyline\n 90\n3\n 70\n0\n 10\n{x}\n 20\n{y}\n 10\n{x2}\n 20\n{y}\n"
+              " 10\n{x2}\n 20\n{y2}\n")
+
+
+def synthetic_entities(n_entities, owner, seed=0, start_handle=0x1000, extent=200.0):
+    """Yield (DXF text, kind) of n_entities synthetic modelspace entities"""
+    rnd = random.Random(seed)
+    handle = start_handle
+    for _ in range(n_entities):
+        x = round(rnd.uniform(0, extent), 4)
+        y = round(rnd.uniform(0, extent), 4)
+        pick = rnd.random()
+        fields = {'handle': f"{handle:X}", 'owner': owner, 'x': x, 'y': y}
+        if pick < CHAIR_SHARE:
+            h = rnd.choice(CGS_HEIGHTS)
+            text = MTEXT.format(layer=TENDON_LAYER, z=h / 1000, text=f"\\A1;{h}", **fields)
+            kind = 'chair'
+        elif pick < CHAIR_SHARE + ELONG_SHARE:
+            text = MTEXT.format(layer=TENDON_LAYER, z=0.0,
+                                text=f"\\A1;Elong = {rnd.randint(5, 60)} mm", **fields)
+            kind = 'elong'
+        elif pick < CHAIR_SHARE + ELONG_SHARE + TENDON_LINE_SHARE:
+            text = LWPOLYLINE.format(layer=TENDON_LAYER, x2=x + 1.5, y2=y + 0.5, **fields)
+            kind = 'tendon'
+        else:
+            layer = rnd.choice(DISTRACTOR_LAYERS)
+            if rnd.random() < 0.3:
+                text = MTEXT.format(layer=layer, z=0.0, text=f"\\A1;C{rnd.randint(1, 99)}", **fields)
+            else:
+                text = LINE.format(layer=layer, x2=x + 5.0, y2=y, **fields)
+            kind = 'distractor'
+        handle += 1
+        yield text, kind
+
+
+def generate_dxf(path, n_entities, seed=0):
+    """Write a synthetic ADAPT-Floor style DXF file with n_entities entities
+
+    Returns a dict with the number of entities of each kind ('chair',
+    'elong', 'tendon', 'distractor') and the tendon layer name.
+    """
+    doc = ezdxf.new('R2018')
+    for name in (TENDON_LAYER,) + DISTRACTOR_LAYERS:
+        doc.layers.add(name)
+    owner = doc.modelspace().block_record_handle
+    skeleton = io.StringIO()
+    doc.write(skeleton)
+    skeleton = skeleton.getvalue()
+
+    start_handle = int(str(doc.entitydb.handles), 16) + 0x100
+    marker = "  0\nSECTION\n  2\nENTITIES\n"
+    head, tail = skeleton.split(marker, 1)
+    head = re.sub(r"(\$HANDSEED\n  5\n)[0-9A-Fa-f]+\n",
+                  lambda m: f"{m.group(1)}{start_handle + n_entities:X}\n", head)
+
+    counts = {'chair': 0, 'elong': 0, 'tendon': 0, 'distractor': 0}
+    with open(path, 'w', encoding='utf-8', newline='\n') as fp:
+        fp.write(head)
+        fp.write(marker)
+        for text, kind in synthetic_entities(n_entities, owner, seed, start_handle):
+            fp.write(text)
+            counts[kind] += 1
+        fp.write(tail)
+    counts['layer'] = TENDON_LAYER
+    counts['entities'] = n_entities
+    counts['bytes'] = os.path.getsize(path)
+    return counts
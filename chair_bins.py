@@ -0,0 +1,214 @@
+# -*- coding: utf-8 -*-
+"""
+Vectorized chair-height classification.
+
+Chair heights are whole quarter inches, so every chair is identified by its
+quarter count q (height = q / 4 inches).  Colours, true colour and fraction
+labels are looked up from tables indexed by q instead of being computed row
+by row.
+
+This is the dependency-light core of the extraction: the labels are parsed,
+classified and counted with numpy alone, pandas and ezdxf are only needed to
+read the DXF file and to build the DataFrames.
+"""
+
+import re
+from fractions import Fraction
+from functools import lru_cache
+
+import numpy as np
+
+
+MM_PER_INCH = 25           # the ADAPT-Floor CGS labels are divided by 25
+CHAIR_MIN_MM = 25          # CGS at or above this gets a computed chair
+SMALL_CHAIR_MM = 10        # CGS in [10, 25) mm gets the 3/4" chair
+SMALL_CHAIR_QUARTERS = 3   # 3/4"
+
+# Kinds of MTEXT labels on the tendon layers
+LABEL_CHAIR, LABEL_ELONG, LABEL_OTHER = 0, 1, 2
+LABEL_KINDS = ('chair', 'elong', 'other')
+
+# One pattern for the whole label: "Elong" anywhere makes an elongation label,
+# otherwise the CGS height is the number after the last ';' (or the whole
+# content), with braces, whitespace and paragraph breaks (\P) allowed around
+# it.  An "Elong" always matches first, the number alternative has to run to
+# the end of the content.
+LABEL_PATTERN = re.compile(r'''
+    (?P<elong>Elong)
+  | (?:^|;) [\s{}]* (?P<cgs>[-+]?(?:\d+(?:\.\d*)?|\.\d+)) (?:[\s{}]|\\P)* $
+''', re.VERBOSE)
+
+# Bin b holds the colour of a chair of b/4 inches; below 1" is gray and
+# anything at or above 6" falls in the last bin
+CHAIR_RGB_TABLE = [(125, 125, 125)] * 4 + [
+    (0, 0, 255),      # 1     Blue
+    (0, 125, 255),    # 1 1/4
+    (0, 255, 255),    # 1 1/2 Cyan
+    (0, 255, 125),    # 1 3/4
+    (0, 255, 125),    # 2     Green
+    (125, 255, 0),    # 2 1/4
+    (255, 255, 0),    # 2 1/2 Yellow
+    (255, 191, 0),    # 2 3/4
+    (255, 125, 0),    # 3     Orange
+    (255, 64, 0),     # 3 1/4
+    (255, 0, 0),      # 3 1/2 Red
+    (255, 0, 64),     # 3 3/4
+    (255, 0, 125),    # 4     Pink
+    (255, 0, 191),    # 4 1/4
+    (255, 0, 255),    # 4 1/2 Magenta
+    (191, 0, 255),    # 4 3/4
+    (125, 0, 255),    # 5     Purple
+    (64, 0, 255),     # 5 1/4
+    (0, 0, 191),      # 5 1/2 Dark blue
+    (0, 0, 125),      # 5 3/4
+    (0, 0, 64),       # 6 and above, very dark blue
+]
+
+CHAIR_HEX_TABLE = ["#808080"] * 4 + [
+    "#0000FF", "#0080FF", "#00FFFF", "#00FF80",
+    "#00FF00", "#80FF00", "#FFFF00", "#FFBF00",
+    "#FF8000", "#FF4000", "#FF0000", "#FF0040",
+    "#FF0080", "#FF00BF", "#FF00FF", "#BF00FF",
+    "#8000FF", "#4000FF", "#0000BF", "#000080",
+    "#000040",
+]
+
+MAX_BIN = len(CHAIR_RGB_TABLE) - 1
+
+
+def _object_array(values):
+    """1-D object array that keeps tuples as single elements"""
+    table = np.empty(len(values), dtype=object)
+    table[:] = values
+    return table
+
+
+CHAIR_RGB = np.array(CHAIR_RGB_TABLE, dtype=np.uint8)
+CHAIR_RGB_TUPLES = _object_array(CHAIR_RGB_TABLE)
+CHAIR_HEX = _object_array(CHAIR_HEX_TABLE)
+CHAIR_TRUE_COLOR = ((CHAIR_RGB[:, 0].astype(np.int64) << 16)
+                    | (CHAIR_RGB[:, 1].astype(np.int64) << 8)
+                    | CHAIR_RGB[:, 2].astype(np.int64))
+
+
+def quarter_label(q):
+    """Mixed-number label of q quarter inches, e.g. 9 -> '2 1/4', 0 -> ' '"""
+    fraction_object = Fraction(int(q), 4)
+    whole_number = fraction_object.numerator // fraction_object.denominator
+    remainder_numerator = fraction_object.numerator % fraction_object.denominator
+    denominator = fraction_object.denominator
+    if remainder_numerator == 0:
+        return " " if whole_number == 0 else f"{whole_number}"
+    if whole_number == 0:
+        return f"{remainder_numerator}/{denominator}"
+    return f"{whole_number} {remainder_numerator}/{denominator}"
+
+
+@lru_cache(maxsize=64)
+def _label_table(q_min, q_max):
+    return _object_array([quarter_label(q) for q in range(q_min, q_max + 1)])
+
+
+def quarter_labels(quarters):
+    """Mixed-number labels for an array of quarter counts"""
+    quarters = np.asarray(quarters, dtype=np.int64)
+    if quarters.size == 0:
+        return np.empty(0, dtype=object)
+    q_min = min(int(quarters.min()), 0)
+    q_max = max(int(quarters.max()), MAX_BIN)
+    return _label_table(q_min, q_max)[quarters - q_min]
+
+
+def chair_quarters(h_cgs, z_offset):
+    """Chair height in quarter inches for an array of CGS heights in mm
+
+    Same rule as the row-by-row chair() of benchmarks/bins.py: CGS >= 25 mm
+    is converted to inches, reduced by z_offset and rounded to the nearest
+    1/4" (half to even); CGS in [10, 25) mm gets the 3/4" chair and anything
+    lower gets 0.
+    """
+    x = np.asarray(h_cgs, dtype=float)
+    with np.errstate(invalid='ignore'):
+        q = np.rint((x / MM_PER_INCH - float(z_offset)) * 4)
+    q = np.where(x >= CHAIR_MIN_MM, q,
+                 np.where(x >= SMALL_CHAIR_MM, SMALL_CHAIR_QUARTERS, 0))
+    return q.astype(np.int64)
+
+
+def chair_bins(quarters):
+    """Index into the colour tables for each quarter count"""
+    return np.clip(quarters, 0, MAX_BIN).astype(np.uint8)
+
+
+def classify_chairs(h_cgs, z_offset):
+    """Chair height, colours and label for an array of CGS heights in mm
+
+    Returns a dict of arrays keyed like the mtext_df columns: 'Chairs',
+    'chairColor', 'chairHexColor', 'trueColor' and 'Chairs_Fraction', plus
+    the intermediate 'quarters' and 'bin' arrays.
+    """
+    quarters = chair_quarters(h_cgs, z_offset)
+    bins = chair_bins(quarters)
+    return {
+        'quarters': quarters,
+        'bin': bins,
+        'Chairs': quarters / 4,
+        'chairColor': CHAIR_RGB_TUPLES[bins],
+        'chairHexColor': CHAIR_HEX[bins],
+        'trueColor': CHAIR_TRUE_COLOR[bins],
+        'Chairs_Fraction': quarter_labels(quarters),
+    }
+
+
+def classify_label(text):
+    """(kind, CGS label) of one MTEXT content, the label None unless a chair"""
+    m = LABEL_PATTERN.search(text)
+    if m is None:
+        return LABEL_OTHER, None
+    if m.group('elong') is not None:
+        return LABEL_ELONG, None
+    return LABEL_CHAIR, m.group('cgs')
+
+
+def parse_chair_labels(full_text):
+    """Kinds of the MTEXT contents and the CGS height of the chairs
+
+    Each distinct content is matched once against LABEL_PATTERN, so the
+    labels are classified and their height extracted in a single pass.
+    Returns the kind of every row (LABEL_CHAIR, LABEL_ELONG or LABEL_OTHER),
+    the sorted distinct CGS labels (object array), the label code of each
+    chair row and its CGS height in mm.  Contents that are neither are left
+    to the caller as LABEL_OTHER rows instead of failing the whole run.
+    """
+    seen = {}
+    index = {}
+    kinds = []
+    codes = []
+    for text in full_text:
+        parsed = seen.get(text)
+        if parsed is None:
+            parsed = seen[text] = classify_label(text)
+        kind, label = parsed
+        kinds.append(kind)
+        if kind == LABEL_CHAIR:
+            codes.append(index.setdefault(label, len(index)))
+    labels = sorted(index)
+    # codes in order of first appearance -> codes of the sorted labels
+    remap = np.empty(len(labels), dtype=np.int64)
+    remap[[index[label] for label in labels]] = np.arange(len(labels))
+    codes = remap[np.asarray(codes, dtype=np.int64)]
+    heights = np.array([float(label) for label in labels], dtype=np.float64)[codes]
+    return np.asarray(kinds, dtype=np.uint8), _object_array(labels), codes, heights
+
+
+def quarter_counts(quarters):
+    """Distinct chair heights (quarter counts, increasing) and the number of
+    chairs of each, zero-height chairs left out"""
+    heights, counts = np.unique(np.asarray(quarters, dtype=np.int64), return_counts=True)
+    keep = heights != 0
+    return heights[keep], counts[keep].astype(np.int64)
+
+
+def chair_schedule(h_cgs, z_offset):
+    """Chair heights in quarter inches and their counts for CGS heights in mm"""
+    return quarter_counts(chair_quarters(h_cgs, z_offset))
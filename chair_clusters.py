@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+"""
+Duplicate and near-coincident chairs.
+
+At tendon crossings, and where banded and distributed tendons overlap,
+ADAPT-Floor writes several height labels at almost the same point, and each
+one would be counted as a chair.  The chairs closer than a merge radius are
+grouped here and one governing chair is kept per group.
+
+The close pairs are found on a grid hash: the points are sorted by cell of
+the radius' size and every point only looks at the 3 x 3 cells around it,
+so the whole search is O(n log n).  Groups are the connected components of
+those pairs (single linkage), so the radius has to stay below the spacing of
+the chairs along a tendon or whole rows would chain into one group.  The
+governing chair of a group is the highest one ('max'), the lowest ('min')
+or the first in drawing order ('first'); ties go to the first.
+"""
+
+import numpy as np
+import pandas as pd
+
+from chair_bins import quarter_labels
+
+
+MERGE_RULES = ('max', 'min', 'first')
+MERGED_COLUMNS = ['group', 'handle', 'x', 'y', 'Chairs', 'Chairs_Fraction', 'kept']
+
+
+def near_pairs(ax, ay, bx, by, radius):
+    """Indices (i, j) and squared distance of the point pairs a[i], b[j] at
+    most radius apart
+
+    Both point sets are sorted by grid cell (cells of the radius' size) and
+    the pairs are looked up in the 3 x 3 cells around every a point.  The
+    key of a neighbouring cell is the point's key plus a constant, so the
+    queries stay sorted and the binary searches walk the keys in order.
+    """
+    if not len(ax) or not len(bx):
+        empty = np.empty(0, dtype=np.int64)
+        return empty, empty, np.empty(0, dtype=np.float64)
+    x0 = min(ax.min(), bx.min())
+    y0 = min(ay.min(), by.min())
+    aky = ((ay - y0) // radius).astype(np.int64)
+    bky = ((by - y0) // radius).astype(np.int64)
+    ny = max(aky.max(), bky.max()) + 3  # one spare row on each side for the offsets
+    akey = (((ax - x0) // radius).astype(np.int64) + 1) * ny + aky + 1
+    bkey = (((bx - x0) // radius).astype(np.int64) + 1) * ny + bky + 1
+    a_order = np.argsort(akey, kind='stable')
+    akey = akey[a_order]
+    b_order = np.argsort(bkey, kind='stable')
+    bkey = bkey[b_order]
+
+    i_parts, j_parts = [], []
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            query = akey + (dx * ny + dy)
+            lo = np.searchsorted(bkey, query, 'left')
+            n = np.searchsorted(bkey, query, 'right') - lo
+            # b candidates of a[a_order[k]] are b_order[lo[k]:lo[k] + n[k]]
+            i = np.repeat(a_order, n)
+            j = b_order[np.repeat(lo - (np.cumsum(n) - n), n) + np.arange(n.sum())]
+            i_parts.append(i)
+            j_parts.append(j)
+    i = np.concatenate(i_parts)
+    j = np.concatenate(j_parts)
+    d2 = (ax[i] - bx[j]) ** 2 + (ay[i] - by[j]) ** 2
+    close = d2 <= radius * radius
+    return i[close], j[close], d2[close]
+
+
+def cluster_points(x, y, radius):
+    """Group of every point: the smallest index of the points it is chained
+    to by steps of at most radius, its own index when it has no neighbour"""
+    if radius <= 0:
+        raise ValueError(f"merge radius must be positive, got {radius}")
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    i, j, _ = near_pairs(x, y, x, y, radius)
+    keep = i < j
+    i, j = i[keep], j[keep]
+    group = np.arange(len(x))
+    # pull the smallest index along the pairs and jump to the root, until stable
+    while True:
+        low = np.minimum(group[i], group[j])
+        previous = group.copy()
+        np.minimum.at(group, i, low)
+        np.minimum.at(group, j, low)
+        group = group[group]
+        if np.array_equal(group, previous):
+            return group
+
+
+def governing_chairs(group, quarters, rule='max'):
+    """Sorted indices of the chair kept in each group under rule"""
+    if rule not in MERGE_RULES:
+        raise ValueError(f"unknown merge rule '{rule}', expected one of {', '.join(MERGE_RULES)}")
+    index = np.arange(len(group))
+    if rule == 'max':
+        order = np.lexsort((index, -np.asarray(quarters), group))
+    elif rule == 'min':
+        order = np.lexsort((index, np.asarray(quarters), group))
+    else:
+        order = np.lexsort((index, group))
+    first = np.r_[True, group[order][1:] != group[order][:-1]] if len(order) else np.empty(0, dtype=bool)
+    return np.sort(order[first])
+
+
+def merge_chairs(x, y, quarters, radius, rule='max'):
+    """Chairs to keep after merging and the groups of more than one chair
+
+    Returns the sorted indices of the kept chairs, the group of every chair
+    (see cluster_points) and the indices of the chairs of merged groups, in
+    group then drawing order.
+    """
+    group = cluster_points(x, y, radius)
+    keep = governing_chairs(group, quarters, rule)
+    sizes = np.bincount(group, minlength=len(group))
+    members = np.flatnonzero(sizes[group] > 1)
+    members = members[np.argsort(group[members], kind='stable')]
+    return keep, group, members
+
+
+def merge_tables(tables, radius, rule='max'):
+    """Merge the duplicate chairs of classified ChairTables
+
+    tables maps layer name -> ChairTable; chairs of different layers merge
+    too, as banded and distributed tendons are often on their own layers.
+    Returns the tables with only the governing chairs and merged_df, one
+    row per chair of a merged group ('layer' first when there are several
+    tables).
+    """
+    tables = dict(tables)
+    parts = list(tables.values())
+    offsets = np.cumsum([0] + [len(t) for t in parts])
+    x = np.concatenate([t.x for t in parts])
+    y = np.concatenate([t.y for t in parts])
+    quarters = np.concatenate([t.quarters for t in parts]).astype(np.int64)
+    keep, group, members = merge_chairs(x, y, quarters, radius, rule)
+
+    merged = {}
+    for (name, table), lo, hi in zip(tables.items(), offsets[:-1], offsets[1:]):
+        merged[name] = table.take(keep[(keep >= lo) & (keep < hi)] - lo)
+
+    kept = np.zeros(len(x), dtype=bool)
+    kept[keep] = True
+    handle = np.concatenate([t.handle for t in parts])[members]
+    _, group_number = np.unique(group[members], return_inverse=True)
+    merged_df = pd.DataFrame({
+        'group': group_number.reshape(-1),
+        'handle': np.array([format(int(h), 'X') for h in handle], dtype=object),
+        'x': x[members],
+        'y': y[members],
+        'Chairs': quarters[members] / 4,
+        'Chairs_Fraction': quarter_labels(quarters[members]) if len(members) else np.empty(0, dtype=object),
+        'kept': kept[members],
+    }, columns=MERGED_COLUMNS)
+    if len(tables) > 1:
+        layer = np.searchsorted(offsets, members, side='right') - 1
+        merged_df.insert(0, 'layer', np.asarray(list(tables), dtype=object)[layer])
+    return merged, merged_df
@@ -0,0 +1,346 @@
+# -*- coding: utf-8 -*-
+"""
+Revision diff: the chairs that changed between two exports of a floor.
+
+Each revision is a chair dataset, either read from its DXF export in
+read-only mode (through process_dxf, so a ResultCache serves a revision that
+was already processed) or a stored per-chair table of an earlier run (the
+'Chairs' table of a schedule written with export_chairs=True).
+
+Chairs are matched by handle first; a handle pair only counts when the two
+labels are within the tolerance of each other, since a re-export may hand
+out the handles again.  The chairs left over are paired by location: mutual
+nearest neighbours within the tolerance, found on the grid hash of
+chair_clusters.near_pairs, so matching stays O(n log n) on 100k+ chairs.
+Matched chairs whose height differs are 'changed', unmatched ones 'added' or
+'removed'.  The result is the per-chair list of those, a delta schedule of
+the counts per height and optionally a DXF with the changed locations
+circled.
+
+Command line:
+    python chair_diff.py rev_A.dxf rev_B.dxf PT_TENDON 0.25 --highlight diff.dxf
+"""
+
+import argparse
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from chair_bins import quarter_counts, quarter_labels
+from chair_clusters import near_pairs
+from chair_export import DEFAULT_FORMAT, EXPORTERS, export_schedule, schedule_format_of
+from chair_table import ChairTable
+from dxf_extraction import is_drawing, logger, process_dxf, read_dxf, write_dxf
+
+
+DEFAULT_TOLERANCE = 0.1  # drawing units, the distance a relabelled chair may move
+STATUSES = ('changed', 'added', 'removed')
+CHAIR_COLUMNS = ['x', 'y', 'Chairs']  # needed of a stored per-chair table
+DIFF_COLUMNS = ['status', 'match', 'handle_old', 'handle_new', 'x', 'y',
+                'Chairs_old', 'Chairs_new', 'Fraction_old', 'Fraction_new']
+# Layer and ACI colour of the markers of each status in the highlight DXF
+HIGHLIGHT_LAYERS = {'changed': ('CHAIRS_CHANGED', 2), 'added': ('CHAIRS_ADDED', 3),
+                    'removed': ('CHAIRS_REMOVED', 1)}
+
+
+def read_chair_table(path):
+    """Per-chair table stored by an earlier run: the 'Chairs' table of an XLSX
+    or JSON schedule, or a CSV / Parquet file of it (<name>_chairs.csv)
+
+    Raises ValueError when the file holds no per-chair table, e.g. the
+    counts file of a CSV schedule given instead of its _chairs file.
+    """
+    schedule_format = schedule_format_of(path)
+    if schedule_format in ('xlsx', 'json'):
+        table = 'sheet' if schedule_format == 'xlsx' else 'table'
+        expected = f"a 'Chairs' {table} (schedule written with --chair-table)"
+    else:
+        stem, suffix = os.path.splitext(os.fspath(path))
+        expected = f"the per-chair file {stem}_chairs{suffix}"
+    if schedule_format == 'xlsx':
+        with pd.ExcelFile(path) as book:
+            chairs = (pd.read_excel(book, sheet_name='Chairs', dtype={'handle': str})
+                      if 'Chairs' in book.sheet_names else None)
+    elif schedule_format == 'json':
+        import json
+
+        with open(path, encoding='utf-8') as fp:
+            chairs = json.load(fp).get('Chairs')
+        chairs = None if chairs is None else pd.DataFrame(chairs)
+    elif schedule_format == 'parquet':
+        chairs = pd.read_parquet(path)
+    else:
+        chairs = pd.read_csv(path, dtype={'handle': str})
+    missing = CHAIR_COLUMNS if chairs is None else [c for c in CHAIR_COLUMNS if c not in chairs]
+    if missing:
+        raise ValueError(f"'{path}' is not a per-chair table (no {', '.join(missing)}); "
+                         f"expected {expected}")
+    return chairs
+
+
+def load_chairs(source, selected_layer=None, z_offset=0.0, **kwargs):
+    """Chair dataset of one revision
+
+    A ChairTable or per-chair frame is used as it is, a DXF file, its content
+    or a Drawing goes through process_dxf in read-only mode (kwargs such as
+    cache or workers are passed on) and any other path is read as a stored
+    per-chair table.
+    """
+    if isinstance(source, (ChairTable, pd.DataFrame)):
+        return source
+    if (is_drawing(source) or not isinstance(source, (str, os.PathLike))
+            or os.fspath(source).lower().endswith('.dxf')):
+        if selected_layer is None:
+            raise ValueError("a layer is needed to read the chairs of a DXF export")
+        table, _ = process_dxf(source, selected_layer, z_offset, None, stream=True, compact=True,
+                               schedule_output=False, **kwargs)
+        return table
+    return read_chair_table(source)
+
+
+def chair_arrays(chairs):
+    """Handles (uint64, 0 when unknown), x, y and quarter counts of a chair dataset"""
+    if isinstance(chairs, ChairTable):
+        handle = chairs.handle
+    elif 'handle' in chairs:
+        handle = np.array([int(h, 16) if isinstance(h, str) and h else 0
+                           for h in chairs['handle'].to_numpy(dtype=object)], dtype=np.uint64)
+    else:
+        handle = np.zeros(len(chairs), dtype=np.uint64)
+    x = np.asarray(chairs['x'], dtype=np.float64)
+    y = np.asarray(chairs['y'], dtype=np.float64)
+    quarters = np.rint(np.asarray(chairs['Chairs'], dtype=np.float64) * 4).astype(np.int64)
+    return handle, x, y, quarters
+
+
+def unmatched(n, matched):
+    """Sorted indices below n that are not in matched"""
+    rest = np.ones(n, dtype=bool)
+    rest[matched] = False
+    return np.flatnonzero(rest)
+
+
+def match_by_handle(old_handle, new_handle):
+    """Indices (old, new) of the chairs with the same handle, unknown (0) ones left out"""
+    _, i_old, i_new = np.intersect1d(old_handle, new_handle, return_indices=True)
+    known = old_handle[i_old] != 0
+    return i_old[known], i_new[known]
+
+
+def _nearest(i, j, d2, n):
+    """Nearest j of every i (-1 without a pair), ties going to the lower j"""
+    order = np.lexsort((j, d2, i))
+    first = np.r_[True, i[order][1:] != i[order][:-1]] if len(order) else np.empty(0, dtype=bool)
+    nearest = np.full(n, -1, dtype=np.int64)
+    nearest[i[order][first]] = j[order][first]
+    return nearest
+
+
+def match_by_position(old_x, old_y, new_x, new_y, tolerance):
+    """Indices (old, new) of the chairs paired by location
+
+    Chairs that are each other's nearest neighbour within tolerance are
+    paired; the search is repeated on the chairs that had a neighbour but
+    lost it to a closer one, until no pair is left.
+    """
+    a = np.arange(len(old_x))
+    b = np.arange(len(new_x))
+    i_old, i_new = [], []
+    while len(a) and len(b):
+        i, j, d2 = near_pairs(old_x[a], old_y[a], new_x[b], new_y[b], tolerance)
+        if not len(i):
+            break
+        nearest_b = _nearest(i, j, d2, len(a))
+        nearest_a = _nearest(j, i, d2, len(b))
+        paired = np.flatnonzero(nearest_b >= 0)
+        mutual = paired[nearest_a[nearest_b[paired]] == paired]
+        i_old.append(a[mutual])
+        i_new.append(b[nearest_b[mutual]])
+        # only chairs that still had a candidate can be paired in the next round
+        left_a = np.zeros(len(a), dtype=bool)
+        left_a[i] = True
+        left_a[mutual] = False
+        left_b = np.zeros(len(b), dtype=bool)
+        left_b[j] = True
+        left_b[nearest_b[mutual]] = False
+        a, b = a[left_a], b[left_b]
+    if not i_old:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    return np.concatenate(i_old), np.concatenate(i_new)
+
+
+def match_chairs(old, new, tolerance=DEFAULT_TOLERANCE):
+    """Indices (old, new) of the matched chairs of two chair_arrays() and
+    whether each pair was matched by handle"""
+    if tolerance <= 0:
+        raise ValueError(f"tolerance must be positive, got {tolerance}")
+    old_handle, old_x, old_y, _ = old
+    new_handle, new_x, new_y, _ = new
+    i_old, i_new = match_by_handle(old_handle, new_handle)
+    close = np.hypot(old_x[i_old] - new_x[i_new], old_y[i_old] - new_y[i_new]) <= tolerance
+    i_old, i_new = i_old[close], i_new[close]
+
+    # the rest by location
+    rest_old = unmatched(len(old_x), i_old)
+    rest_new = unmatched(len(new_x), i_new)
+    p_old, p_new = match_by_position(old_x[rest_old], old_y[rest_old],
+                                     new_x[rest_new], new_y[rest_new], tolerance)
+    by_handle = np.r_[np.ones(len(i_old), dtype=bool), np.zeros(len(p_old), dtype=bool)]
+    return np.r_[i_old, rest_old[p_old]], np.r_[i_new, rest_new[p_new]], by_handle
+
+
+def _handles(handle):
+    return np.array([format(int(h), 'X') if h else None for h in handle], dtype=object)
+
+
+def _fractions(quarters):
+    return quarter_labels(quarters) if len(quarters) else np.empty(0, dtype=object)
+
+
+def delta_schedule(old_quarters, new_quarters):
+    """Counts per chair height before and after and their difference, only
+    the heights whose count changed"""
+    q_old, n_old = quarter_counts(old_quarters)
+    q_new, n_new = quarter_counts(new_quarters)
+    heights = np.union1d(q_old, q_new)
+    before = np.zeros(len(heights), dtype=np.int64)
+    after = np.zeros(len(heights), dtype=np.int64)
+    before[np.searchsorted(heights, q_old)] = n_old
+    after[np.searchsorted(heights, q_new)] = n_new
+    keep = after != before
+    heights = heights[keep]
+    return pd.DataFrame({'h_chair [in]': heights / 4,
+                         'before': before[keep],
+                         'after': after[keep],
+                         'delta': after[keep] - before[keep],
+                         'h_chairs_inches': _fractions(heights)})
+
+
+def diff_chairs(previous, current, tolerance=DEFAULT_TOLERANCE):
+    """Changed, added and removed chairs between two chair datasets
+
+    previous and current are ChairTables or per-chair frames (see
+    load_chairs).  Returns diff_df, one row per chair that is not unchanged
+    with its handle, location and height in both revisions, and delta_df, the
+    delta schedule.  A removed chair keeps its old location, the others the
+    new one.
+    """
+    old = chair_arrays(previous)
+    new = chair_arrays(current)
+    i_old, i_new, by_handle = match_chairs(old, new, tolerance)
+    old_handle, old_x, old_y, old_q = old
+    new_handle, new_x, new_y, new_q = new
+
+    changed = old_q[i_old] != new_q[i_new]
+    added = unmatched(len(new_x), i_new)
+    removed = unmatched(len(old_x), i_old)
+    c_old, c_new = i_old[changed], i_new[changed]
+    logger.info("%d chairs matched (%d by handle, %d by location), %d changed, %d added, %d removed",
+                len(i_old), by_handle.sum(), len(i_old) - by_handle.sum(), len(c_old),
+                len(added), len(removed))
+
+    none = np.full(len(removed) + len(added), None, dtype=object)
+    nan = np.full(len(removed) + len(added), np.nan)
+    diff_df = pd.DataFrame({
+        'status': np.repeat(np.array(STATUSES, dtype=object), [len(c_old), len(added), len(removed)]),
+        'match': np.r_[np.where(by_handle[changed], 'handle', 'position').astype(object), none],
+        'handle_old': np.r_[_handles(old_handle[c_old]), none[:len(added)], _handles(old_handle[removed])],
+        'handle_new': np.r_[_handles(new_handle[c_new]), _handles(new_handle[added]), none[:len(removed)]],
+        'x': np.r_[new_x[c_new], new_x[added], old_x[removed]],
+        'y': np.r_[new_y[c_new], new_y[added], old_y[removed]],
+        'Chairs_old': np.r_[old_q[c_old] / 4, nan[:len(added)], old_q[removed] / 4],
+        'Chairs_new': np.r_[new_q[c_new] / 4, new_q[added] / 4, nan[:len(removed)]],
+        'Fraction_old': np.r_[_fractions(old_q[c_old]), none[:len(added)], _fractions(old_q[removed])],
+        'Fraction_new': np.r_[_fractions(new_q[c_new]), _fractions(new_q[added]), none[:len(removed)]],
+    }, columns=DIFF_COLUMNS)
+    return diff_df, delta_schedule(old_q, new_q)
+
+
+def write_highlight_dxf(diff_df, target, base=None, radius=None, text_height=0.100):
+    """DXF with a circle and a label at every chair of diff_df
+
+    The markers of each status go to their own layer (HIGHLIGHT_LAYERS).
+    base is a DXF file, its content or a Drawing to draw them on, typically
+    the current export; without it a drawing with only the markers is
+    written, to be overlaid on the export.  radius defaults to twice the
+    text height.
+    """
+    import ezdxf
+
+    doc = ezdxf.new() if base is None else base if is_drawing(base) else read_dxf(base)
+    msp = doc.modelspace()
+    radius = 2 * text_height if radius is None else radius
+    for status, (layer, color) in HIGHLIGHT_LAYERS.items():
+        if layer not in doc.layers:
+            doc.layers.add(layer, color=color)
+    for status, x, y, old, new in zip(diff_df['status'], diff_df['x'].tolist(), diff_df['y'].tolist(),
+                                      diff_df['Fraction_old'], diff_df['Fraction_new']):
+        layer = HIGHLIGHT_LAYERS[status][0]
+        if status == 'changed':
+            label = f"{str(old).strip()} -> {str(new).strip()}"
+        elif status == 'added':
+            label = f"+ {str(new).strip()}"
+        else:
+            label = f"- {str(old).strip()}"
+        msp.add_circle((x, y), radius, dxfattribs={'layer': layer})
+        msp.add_text(label, height=text_height,
+                     dxfattribs={'layer': layer, 'insert': (x + radius, y + radius)})
+    write_dxf(doc, target)
+
+
+def diff_revisions(previous, current, selected_layer=None, z_offset=0.0, tolerance=DEFAULT_TOLERANCE,
+                   highlight_output=None, overlay_only=False, schedule_output=None,
+                   schedule_format=None, **kwargs):
+    """Diff two revisions and write the highlight DXF and delta schedule when given
+
+    previous and current are anything load_chairs() takes.  The highlight DXF
+    is drawn on the current export when it is a DXF file or Drawing, unless
+    overlay_only.  The schedule has the delta schedule ('Delta') and the
+    changed chairs ('Changes').  Returns diff_df and delta_df.
+    """
+    diff_df, delta_df = diff_chairs(load_chairs(previous, selected_layer, z_offset, **kwargs),
+                                    load_chairs(current, selected_layer, z_offset, **kwargs),
+                                    tolerance)
+    if highlight_output is not None:
+        drawing = is_drawing(current) or (isinstance(current, (str, os.PathLike))
+                                          and os.fspath(current).lower().endswith('.dxf'))
+        write_highlight_dxf(diff_df, highlight_output,
+                            base=current if drawing and not overlay_only else None)
+    if schedule_output is not None:
+        export_schedule({'Delta': delta_df, 'Changes': diff_df}, schedule_output, schedule_format)
+    return diff_df, delta_df
+
+
+def main(argv=None):
+    """Command line: diff two revisions of a floor"""
+    parser = argparse.ArgumentParser(description="Chairs that changed between two DXF exports")
+    parser.add_argument('previous', help="previous DXF export or its stored per-chair table")
+    parser.add_argument('current', help="current DXF export or its stored per-chair table")
+    parser.add_argument('selected_layer', help="layer name or pattern such as 'PT*'")
+    parser.add_argument('z_offset', type=float, nargs='?', default=0.0)
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f"distance in drawing units within which chairs are the same "
+                             f"(default {DEFAULT_TOLERANCE})")
+    parser.add_argument('--highlight', metavar='PATH', help="DXF with the changed chairs circled")
+    parser.add_argument('--overlay-only', action='store_true',
+                        help="only the markers in the highlight DXF, not the current drawing")
+    parser.add_argument('--schedule', metavar='PATH',
+                        help=f"delta schedule file (default: chair_diff.{DEFAULT_FORMAT})")
+    parser.add_argument('--schedule-format', choices=sorted(EXPORTERS),
+                        help="schedule format (default: from the --schedule suffix)")
+    parser.add_argument('--workers', type=int, metavar='N', help="scan each DXF file in N processes")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(format='%(message)s')
+    logger.setLevel(logging.INFO)
+    schedule = args.schedule or f"chair_diff.{args.schedule_format or DEFAULT_FORMAT}"
+    diff_df, delta_df = diff_revisions(args.previous, args.current, args.selected_layer, args.z_offset,
+                                       args.tolerance, args.highlight, args.overlay_only, schedule,
+                                       args.schedule_format, workers=args.workers)
+    print(delta_df.to_string(index=False) if len(delta_df) else "No change in the chair counts")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+"""
+Export of the chair schedule and the per-chair table.
+
+A run produces a few named tables: 'Counts' (chairs_df, the chair schedule),
+'Layers' and 'Regions' when several layers or regions were counted, and on
+request 'Chairs' with one row per chair.  An exporter writes them in one
+format: CSV (the default, nothing beyond pandas), JSON, Parquet (pyarrow) or
+XLSX (openpyxl, one sheet per table).
+
+Exporters are registered by name and resolved on first use, so the library
+behind a format is only imported when that format is asked for: a CSV run
+never loads openpyxl.  Further formats are added with register_exporter(),
+the writer can be given as a 'module:function' string to keep it lazy too.
+"""
+
+import importlib
+import json
+import os
+
+
+DEFAULT_FORMAT = 'csv'
+
+
+class Exporter:
+    """One output format of the schedule tables
+
+    writer is a callable or a 'module:function' string imported on first
+    use.  A single_file writer is called as writer(tables, target) with all
+    tables; otherwise as writer(frame, target) once per table, the first
+    table going to the target and the others to <stem>_<table><suffix>.
+    """
+
+    def __init__(self, name, suffix, writer, single_file=False):
+        self.name = name
+        self.suffix = suffix
+        self.single_file = single_file
+        self._writer = writer
+
+    @property
+    def writer(self):
+        if isinstance(self._writer, str):
+            module, function = self._writer.split(':')
+            self._writer = getattr(importlib.import_module(module), function)
+        return self._writer
+
+    def table_paths(self, target, names):
+        """Output path of each table when the tables go to separate files"""
+        stem = os.path.splitext(os.fspath(target))[0]
+        return {name: os.fspath(target) if i == 0 else f"{stem}_{name.lower()}{self.suffix}"
+                for i, name in enumerate(names)}
+
+    def write(self, tables, target):
+        """Write the tables (name -> DataFrame) to a file path or binary stream"""
+        if self.single_file:
+            self.writer(tables, target)
+            return
+        if hasattr(target, 'write'):
+            if len(tables) > 1:
+                raise ValueError(f"{self.name} writes one file per table, give a file path "
+                                 f"to export {', '.join(tables)}")
+            self.writer(next(iter(tables.values())), target)
+            return
+        for name, path in self.table_paths(target, list(tables)).items():
+            self.writer(tables[name], path)
+
+
+EXPORTERS = {}
+
+
+def register_exporter(name, suffix, writer, single_file=False):
+    """Add (or replace) the exporter of a format, see Exporter"""
+    EXPORTERS[name] = Exporter(name, suffix, writer, single_file)
+    return EXPORTERS[name]
+
+
+def get_exporter(schedule_format):
+    try:
+        return EXPORTERS[schedule_format.lower()]
+    except KeyError:
+        raise ValueError(f"unknown schedule format '{schedule_format}', "
+                         f"expected one of {', '.join(EXPORTERS)}") from None
+
+
+def schedule_format_of(target, schedule_format=None):
+    """Format given, else the one matching the target's suffix, else DEFAULT_FORMAT"""
+    if schedule_format:
+        return get_exporter(schedule_format).name
+    if isinstance(target, (str, os.PathLike)):
+        suffix = os.path.splitext(os.fspath(target))[1].lower()
+        for exporter in EXPORTERS.values():
+            if exporter.suffix == suffix:
+                return exporter.name
+    return DEFAULT_FORMAT
+
+
+def schedule_path(path, schedule_format=DEFAULT_FORMAT):
+    """Schedule file next to path: same name, the suffix of the format
+
+    Only the extension of the file name is replaced, dots in the directory
+    names are left alone.
+    """
+    return os.path.splitext(os.fspath(path))[0] + get_exporter(schedule_format).suffix
+
+
+def export_schedule(tables, target, schedule_format=None):
+    """Write the schedule tables to target (a file path or a binary stream)
+
+    tables maps table name -> DataFrame, 'Counts' first; None tables are
+    skipped.  Returns the format used.
+    """
+    tables = {name: frame for name, frame in tables.items() if frame is not None}
+    schedule_format = schedule_format_of(target, schedule_format)
+    get_exporter(schedule_format).write(tables, target)
+    return schedule_format
+
+
+def write_csv(frame, target):
+    frame.to_csv(target, index=False)
+
+
+def write_parquet(frame, target):
+    try:
+        frame.to_parquet(target, index=False)
+    except ImportError as e:
+        raise ImportError(f"Parquet export needs pyarrow: {e}") from None
+
+
+def write_json(tables, target):
+    """All tables in one JSON object of table name -> list of row records"""
+    text = '{' + ','.join(f"{json.dumps(name)}:{frame.to_json(orient='records')}"
+                          for name, frame in tables.items()) + '}'
+    if hasattr(target, 'write'):
+        target.write(text.encode('utf-8'))
+    else:
+        with open(target, 'w', encoding='utf-8') as fp:
+            fp.write(text)
+
+
+def write_xlsx(tables, target):
+    """One sheet per table; the Counts sheet keeps its index column as the
+    workbook always had"""
+    import pandas as pd
+
+    with pd.ExcelWriter(target) as writer:
+        for name, frame in tables.items():
+            frame.to_excel(writer, sheet_name=name, index=(name == 'Counts'))
+
+
+register_exporter('csv', '.csv', write_csv)
+register_exporter('json', '.json', write_json, single_file=True)
+register_exporter('parquet', '.parquet', write_parquet)
+register_exporter('xlsx', '.xlsx', write_xlsx, single_file=True)
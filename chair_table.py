@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+"""
+Compact columnar chair dataset.
+
+A ChairTable holds one entry per chair label in typed arrays: float64
+coordinates, int16 colour index, the handle as a uint64, the CGS label as a
+dictionary-encoded categorical, and after classification the chair height in
+quarter inches (int16) and its colour bin (uint8).  A table of several layers
+(ChairTable.concat) also has the layer of each chair as a categorical.  The
+display columns of mtext_df (RGB tuple, hex colour, true colour, fraction
+label) are not stored, they are derived from the bin and quarter arrays when
+asked for.
+
+MTEXT that is neither a chair height nor an elongation label does not stop
+the run, it is kept aside in the rejects frame of the table.
+"""
+
+import numpy as np
+import pandas as pd
+from pandas.api.types import union_categoricals
+
+from chair_bins import (CHAIR_HEX, CHAIR_RGB_TUPLES, CHAIR_TRUE_COLOR, LABEL_CHAIR, LABEL_OTHER,
+                        chair_bins, chair_quarters, parse_chair_labels, quarter_labels)
+
+
+# mtext_df columns in the order process_dxf has always returned them
+FRAME_COLUMNS = ['x', 'y', 'z', 'color_index', 'handle', 'text',
+                 'Chairs', 'chairColor', 'chairHexColor', 'trueColor', 'Chairs_Fraction']
+# Columns of the compact display frame, colours are left to the caller
+COMPACT_COLUMNS = ['x', 'y', 'z', 'handle', 'text', 'Chairs', 'Chairs_Fraction']
+# Columns of the rejected labels: where they are and their whole MTEXT content
+REJECT_COLUMNS = ['handle', 'x', 'y', 'z', 'text']
+
+
+# the gray bins share one hex colour, the categories have to be distinct
+_HEX_CATEGORIES, _HEX_CODES = np.unique(CHAIR_HEX.astype(str), return_inverse=True)
+
+
+def _categorical_labels(quarters):
+    """Fraction labels of the quarter counts as a categorical, one label per distinct height"""
+    unique, codes = np.unique(quarters, return_inverse=True)
+    return pd.Categorical.from_codes(codes.reshape(-1), categories=list(quarter_labels(unique)))
+
+
+class ChairTable:
+    """Chair labels of one layer as typed column arrays
+
+    Build it with from_columns() from the MTEXT rows of a LayerScan, then
+    classify(z_offset) returns a table sharing the same arrays with the
+    quarters and bin filled in.  Columns are read like a DataFrame's,
+    table['Chairs'] gives a Series.
+    """
+
+    def __init__(self, x, y, z, color_index, handle, text, heights, quarters=None, layer=None,
+                 rejects=None):
+        self.x = x
+        self.y = y
+        self.z = z
+        self.color_index = color_index
+        self.handle = handle      # uint64, the hex handle as a number
+        self.text = text          # categorical CGS label (mm) as written in the DXF
+        self.heights = heights    # CGS height in mm
+        self.quarters = quarters  # chair height in 1/4", None before classify()
+        self.bin = None if quarters is None else chair_bins(quarters)
+        self.layer = layer        # categorical layer name, None for a single-layer table
+        self.rejects = rejects    # DataFrame of the labels that could not be parsed
+        self.merged = None        # DataFrame of the merged duplicates, see chair_clusters
+        self.regions = None       # DataFrame of the per-region counts, see chair_regions
+
+    @classmethod
+    def from_columns(cls, full_text, x, y, z, color_index, handle):
+        """Chair rows of MTEXT columns: "Elong" labels dropped, CGS height parsed
+
+        The label after the last ';' of the MTEXT content is the CGS height in
+        mm, see chair_bins.LABEL_PATTERN.  Contents that are neither a height
+        nor an elongation go to the rejects frame with their handle and
+        coordinates.
+        """
+        kinds, labels, codes, heights = parse_chair_labels(full_text)
+        keep = kinds == LABEL_CHAIR
+        rejected = np.flatnonzero(kinds == LABEL_OTHER)
+        rejects = pd.DataFrame({
+            'handle': np.asarray(handle, dtype=object)[rejected],
+            'x': np.asarray(x, dtype=np.float64)[rejected],
+            'y': np.asarray(y, dtype=np.float64)[rejected],
+            'z': np.asarray(z, dtype=np.float64)[rejected],
+            'text': np.asarray(full_text, dtype=object)[rejected],
+        }, columns=REJECT_COLUMNS)
+        text = pd.Categorical.from_codes(codes, categories=pd.Index(labels, dtype=object))
+        handles = np.array([int(h, 16) for h in np.asarray(handle, dtype=object)[keep]],
+                           dtype=np.uint64)
+        return cls(np.asarray(x, dtype=np.float64)[keep],
+                   np.asarray(y, dtype=np.float64)[keep],
+                   np.asarray(z, dtype=np.float64)[keep],
+                   np.asarray(color_index, dtype=np.int16)[keep],
+                   handles, text, heights, rejects=rejects)
+
+    def classify(self, z_offset):
+        """Table of the same chairs with their heights for z_offset"""
+        quarters = chair_quarters(self.heights, z_offset).astype(np.int16)
+        return ChairTable(self.x, self.y, self.z, self.color_index, self.handle,
+                          self.text, self.heights, quarters, self.layer, self.rejects)
+
+    def take(self, index):
+        """Table of the chairs at the given positions, e.g. after merging
+        duplicates (see chair_clusters)"""
+        return ChairTable(self.x[index], self.y[index], self.z[index], self.color_index[index],
+                          self.handle[index], self.text[index], self.heights[index],
+                          None if self.quarters is None else self.quarters[index],
+                          None if self.layer is None else self.layer[index], self.rejects)
+
+    @classmethod
+    def concat(cls, tables):
+        """One table of several layers from a dict of layer name -> ChairTable
+
+        The chairs keep the layer order of the dict and get a 'layer' column;
+        the quarters are kept when every table is classified.  The rejects
+        are stacked the same way.
+        """
+        tables = dict(tables)
+        if not tables:
+            raise ValueError("no layer tables to concatenate")
+        parts = list(tables.values())
+        layer = pd.Categorical.from_codes(np.repeat(np.arange(len(parts)), [len(t) for t in parts]),
+                                          categories=list(tables))
+        quarters = None
+        if all(t.quarters is not None for t in parts):
+            quarters = np.concatenate([t.quarters for t in parts])
+
+        def joined(name):
+            return np.concatenate([getattr(t, name) for t in parts])
+
+        rejects = [t.rejects.assign(layer=name)[['layer'] + REJECT_COLUMNS]
+                   for name, t in tables.items() if t.rejects is not None]
+        rejects = pd.concat(rejects, ignore_index=True) if rejects else None
+
+        return cls(joined('x'), joined('y'), joined('z'), joined('color_index'), joined('handle'),
+                   union_categoricals([t.text for t in parts]), joined('heights'), quarters, layer,
+                   rejects)
+
+    def __len__(self):
+        return len(self.x)
+
+    @property
+    def empty(self):
+        return len(self) == 0
+
+    @property
+    def nbytes(self):
+        """Bytes held by the arrays, the categorical dictionaries included"""
+        arrays = [self.x, self.y, self.z, self.color_index, self.handle, self.heights,
+                  self.text.codes, self.text.categories.to_numpy()]
+        strings = list(self.text.categories)
+        if self.quarters is not None:
+            arrays += [self.quarters, self.bin]
+        if self.layer is not None:
+            arrays += [self.layer.codes]
+            strings += list(self.layer.categories)
+        return sum(a.nbytes for a in arrays) + sum(len(c) for c in strings)
+
+    def column(self, name, compact=False):
+        """Values of one mtext_df column, derived from the arrays when needed
+
+        compact=True keeps the dictionary encoding and narrow dtypes instead of
+        the object and int64 columns of the original frame.
+        """
+        if name in ('x', 'y', 'z'):
+            return getattr(self, name)
+        if name == 'color_index':
+            return self.color_index if compact else self.color_index.astype(np.int64)
+        if name == 'handle':
+            return np.array([format(int(h), 'X') for h in self.handle], dtype=object)
+        if name == 'text':
+            return self.text if compact else np.asarray(self.text, dtype=object)
+        if name == 'heights':
+            return self.heights
+        if name == 'layer':
+            if self.layer is None:
+                raise KeyError("'layer' is only kept by multi-layer tables, see ChairTable.concat")
+            return self.layer if compact else np.asarray(self.layer, dtype=object)
+        if self.quarters is None:
+            raise KeyError(f"'{name}' needs a classified table, call classify(z_offset)")
+        if name == 'Chairs':
+            return self.quarters / 4
+        if name == 'bin':
+            return self.bin
+        if name == 'chairColor':
+            return CHAIR_RGB_TUPLES[self.bin]
+        if name == 'chairHexColor':
+            if compact:
+                return pd.Categorical.from_codes(_HEX_CODES[self.bin], categories=_HEX_CATEGORIES)
+            return CHAIR_HEX[self.bin]
+        if name == 'trueColor':
+            return CHAIR_TRUE_COLOR[self.bin]
+        if name == 'Chairs_Fraction':
+            return _categorical_labels(self.quarters) if compact else quarter_labels(self.quarters)
+        raise KeyError(name)
+
+    def __getitem__(self, name):
+        return pd.Series(self.column(name), name=name)
+
+    def to_frame(self, columns=None, compact=False):
+        """mtext_df of the table, by default with the columns and dtypes process_dxf returns
+
+        compact=True gives the smaller display frame: no colour columns unless
+        asked for, categorical labels and narrow integer dtypes.  A multi-layer
+        table starts with the 'layer' column.
+        """
+        if columns is None:
+            columns = COMPACT_COLUMNS if compact else FRAME_COLUMNS
+            if self.quarters is None:
+                columns = [c for c in columns if c in ('x', 'y', 'z', 'color_index', 'handle', 'text')]
+            if self.layer is not None:
+                columns = ['layer'] + columns
+        frame = pd.DataFrame({name: self.column(name, compact) for name in columns}, columns=columns)
+        if 'text' in frame and not compact:
+            frame['text'] = frame['text'].astype(object)  # as str.split() has always left it
+        return frame
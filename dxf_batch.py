@@ -0,0 +1,198 @@
+# -*- coding: utf-8 -*-
+"""
+Batch chair extraction for whole project folders.
+
+Every DXF file of a folder (or glob) is run through process_dxf in a process
+pool, all layers matching the layer pattern in one pass.  Each file gets its
+annotated DXF in the output folder and all chair counts are gathered in one
+workbook with per-file and per-project totals.
+
+Command line:
+    python dxf_batch.py exports/ --layer "PT*" --z-offset 0.25 --workers 8
+"""
+
+import argparse
+import glob
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+
+REPORT_COLUMNS = ['file', 'layer', 'status', 'chairs', 'wall_time_s', 'output_dxf', 'error']
+
+
+def find_dxf_files(inputs):
+    """Expand directories and glob patterns into a sorted list of DXF files"""
+    if isinstance(inputs, (str, os.PathLike)):
+        inputs = [inputs]
+    files = set()
+    for item in inputs:
+        item = os.fspath(item)
+        if os.path.isdir(item):
+            files.update(os.path.join(item, name) for name in os.listdir(item)
+                         if name.lower().endswith('.dxf'))
+        else:
+            files.update(path for path in glob.glob(item) if os.path.isfile(path))
+    return sorted(files)
+
+
+def output_names(files, output_dir):
+    """Output DXF path of each input file, <stem>_chairs.dxf
+
+    The folders below the common folder of the inputs are repeated in
+    output_dir, so proj/a.dxf and proj2/a.dxf do not write the same file.
+    Names that still clash (a.dxf and a.DXF) raise ValueError before any
+    file is processed.
+    """
+    if not files:
+        return {}
+    root = os.path.commonpath([os.path.dirname(os.path.abspath(path)) for path in files])
+    names = {}
+    seen = {}
+    for path in files:
+        stem = os.path.splitext(os.path.relpath(os.path.abspath(path), root))[0]
+        name = os.path.join(output_dir, f"{stem}_chairs.dxf")
+        key = os.path.normcase(name).lower()
+        if key in seen:
+            raise ValueError(f"'{path}' and '{seen[key]}' would both be written to '{name}'")
+        seen[key] = path
+        names[path] = name
+    return names
+
+
+def process_file(dxf_file_path, layer_pattern, z_offset, output_dir, output_dxf_name=None):
+    """Extract the chairs of one file for every layer matching layer_pattern
+
+    Runs inside a worker process.  The file is parsed and saved once with a
+    <layer>_chairs layer per matching layer, to output_dxf_name or
+    <stem>_chairs.dxf in output_dir.  Errors are caught and reported per file
+    so that one bad export never stops the batch.
+    """
+    import dxf_extraction
+
+    start = time.perf_counter()
+    if output_dxf_name is None:
+        stem = os.path.splitext(os.path.basename(dxf_file_path))[0]
+        output_dxf_name = os.path.join(output_dir, f"{stem}_chairs.dxf")
+    try:
+        os.makedirs(os.path.dirname(output_dxf_name) or '.', exist_ok=True)
+        # warnings only, the batch report carries the per-layer summary
+        # no schedule next to the input, the combined workbook is the batch's output
+        table, chairs_df = dxf_extraction.process_dxf(
+            dxf_file_path, layer_pattern, z_offset, output_dxf_name, verbosity=0, compact=True,
+            schedule_output=False)
+    except Exception as e:
+        return [{'file': dxf_file_path, 'layer': layer_pattern, 'status': 'failed',
+                 'error': f"{type(e).__name__}: {e}",
+                 'wall_time_s': time.perf_counter() - start}], []
+
+    if table.layer is None:
+        layer_chairs = {layer_pattern: chairs_df['count'].sum()}
+    else:
+        layer_df = dxf_extraction.count_chairs_by_layer(table)
+        layer_chairs = layer_df.groupby('layer')['count'].sum().reindex(
+            table.layer.categories, fill_value=0).to_dict()
+    rows = [{'file': dxf_file_path, 'layer': layer, 'status': 'ok', 'chairs': int(chairs),
+             'output_dxf': output_dxf_name}
+            for layer, chairs in layer_chairs.items()]
+
+    file_time = time.perf_counter() - start
+    if len(rows) == 1:
+        rows[0]['wall_time_s'] = file_time
+    else:
+        rows.append({'file': dxf_file_path, 'layer': '*', 'status': 'total',
+                     'chairs': sum(row['chairs'] for row in rows),
+                     'output_dxf': output_dxf_name, 'wall_time_s': file_time})
+    return rows, [chairs_df.assign(file=dxf_file_path)]
+
+
+def combine_counts(counts):
+    """Per-file and per-project chair count tables from the per-file chairs_df"""
+    if not counts:
+        empty = pd.DataFrame(columns=['h_chair [in]', 'h_chairs_inches', 'count'])
+        return empty.assign(file=[]), empty
+    per_file = pd.concat(counts, ignore_index=True)
+    per_file = (per_file.groupby(['file', 'h_chair [in]', 'h_chairs_inches'], as_index=False)['count']
+                .sum()
+                .sort_values(['file', 'h_chair [in]'], ignore_index=True))
+    project = (per_file.groupby(['h_chair [in]', 'h_chairs_inches'], as_index=False)['count']
+               .sum()
+               .sort_values('h_chair [in]', ignore_index=True))
+    return per_file, project
+
+
+def run_batch(inputs, layer_pattern, z_offset, output_dir='chairs_output',
+              workbook_name='chair_counts.xlsx', workers=None):
+    """Run the chair extraction over many DXF files in a process pool
+
+    inputs is a directory, a glob pattern or a list of them.  Returns the run
+    report (one row per file and layer, with the wall time per file), the
+    per-file counts and the project totals; the same tables are written to
+    workbook_name in output_dir next to the annotated DXF files.
+    """
+    files = find_dxf_files(inputs)
+    names = output_names(files, output_dir)
+    os.makedirs(output_dir, exist_ok=True)
+
+    # Forked workers inherit the libraries loaded here instead of each
+    # importing them for its first file
+    import dxf_extraction
+    dxf_extraction.preload()
+
+    rows = []
+    counts = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(process_file, path, layer_pattern, z_offset, output_dir, names[path]): path
+                   for path in files}
+        for future in as_completed(futures):
+            try:
+                file_rows, file_counts = future.result()
+            except Exception as e:
+                # the worker itself died (e.g. out of memory)
+                file_rows = [{'file': futures[future], 'layer': layer_pattern,
+                              'status': 'failed', 'error': f"{type(e).__name__}: {e}"}]
+                file_counts = []
+            rows.extend(file_rows)
+            counts.extend(file_counts)
+
+    report_df = (pd.DataFrame(rows, columns=REPORT_COLUMNS)
+                 .sort_values(['file', 'layer'], kind='stable', ignore_index=True))
+    per_file_df, project_df = combine_counts(counts)
+
+    workbook_path = os.path.join(output_dir, workbook_name)
+    with pd.ExcelWriter(workbook_path) as writer:
+        project_df.to_excel(writer, sheet_name='Project', index=False)
+        per_file_df.to_excel(writer, sheet_name='Files', index=False)
+        report_df.to_excel(writer, sheet_name='Report', index=False)
+
+    return report_df, per_file_df, project_df
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract PT chair heights and counts from many DXF files")
+    parser.add_argument('inputs', nargs='+', help="DXF folders or glob patterns")
+    parser.add_argument('--layer', required=True, help="tendon layer name or pattern, e.g. 'PT*'")
+    parser.add_argument('--z-offset', type=float, default=0.0,
+                        help="distance between tendon CGS and chair height in inches")
+    parser.add_argument('--output-dir', default='chairs_output', help="folder for the DXF files and the workbook")
+    parser.add_argument('--workbook', default='chair_counts.xlsx', help="name of the combined workbook")
+    parser.add_argument('--workers', type=int, default=None, help="worker processes (default: CPU count)")
+    args = parser.parse_args(argv)
+
+    report_df, per_file_df, project_df = run_batch(args.inputs, args.layer, args.z_offset,
+                                                   output_dir=args.output_dir,
+                                                   workbook_name=args.workbook,
+                                                   workers=args.workers)
+    with pd.option_context('display.max_rows', None, 'display.width', 200):
+        print(report_df.drop(columns=['output_dxf']).to_string(index=False))
+        print("\nProject totals:\n", project_df.to_string(index=False))
+    failed = (report_df['status'] == 'failed').sum()
+    print(f"\n{len(report_df[report_df.status == 'ok'])} layer(s) processed, {failed} failure(s)")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
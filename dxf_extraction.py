@@ -5,521 +5,1359 @@ Created on Wed Aug 13 10:50:49 2025
 @author: Esneyder Montoya, PhD, PE
 """
 
-import pandas as pd
-import ezdxf as ed
 from collections import Counter
-import math
-from fractions import Fraction
-from ezdxf import colors
+import contextlib
+from fnmatch import fnmatchcase
+import importlib.util
+import io
+import logging
+import os
+import sys
+import time
+import numpy as np
 
+# pandas and ezdxf are imported by the functions that use them, importing
+# this module only costs numpy (see preload() and python -m benchmarks imports)
+from chair_bins import quarter_counts, quarter_labels
+from chair_export import DEFAULT_FORMAT, EXPORTERS, export_schedule, schedule_path
+from dxf_splice import BINARY_DXF_SENTINEL, SpliceError, splice_dxf, text_entity_tags
+from pipeline_profile import StageProfiler
+from result_cache import content_sha256
 
-def process_dxf(dxf_file_path, selected_layer, z_offset, output_dxf_name):
 
-    
-    
-    # Open a DXF file
-    doc = ed.readfile(dxf_file_path)
-    
-    # Now you can work with the DXF document
-    # For example, to access the modelspace:
-    msp = doc.modelspace()
-    
-    # To iterate through all entities in modelspace:
-    #for entity in msp:
-    #    print(f"Entity: {entity.dxftype()}")
-    
-    # To get specific layers:
-    # layers = doc.layers
-    # for layer in layers:
-    #     print(f"Layer: {layer.dxf.name}")
-    #    for entity in layer:
-    #        print(f"Entity: {entity.dxftype()}")
-    
-    
-    # Specify the layer name you want to analyze
-    layer_name = selected_layer  # Replace with your actual layer name
-    
-    # Filter entities by layer and collect their types
-    entity_types = []
-    for entity in msp.query(f'*[layer=="{layer_name}"]'):
-        entity_types.append(entity.dxftype())
-    
-    # Count and print the unique entity types in the layer
-    type_counter = Counter(entity_types)
-    print(f"Entity types in layer '{layer_name}':")
-    for entity_type, count in type_counter.items():
-        print(f"  - {entity_type}: {count} entities")
-    
-    # If you want to print all entities in the layer with their types
-    print(f"\nDetailed list of entities in layer '{layer_name}':")
-    for i, entity in enumerate(msp.query(f'*[layer=="{layer_name}"]')):
-        print(f"  {i+1}. Type: {entity.dxftype()}, Handle: {entity.dxf.handle}")
-    
-    # Helper function to convert AutoCAD color index to RGB
-    def acad_color_to_rgb(doc, color_index):
-        """Convert AutoCAD color index to RGB tuple"""
-        if color_index == 0:  # ByBlock
-            return "ByBlock"
-        elif color_index == 256:  # ByLayer
-            return "ByLayer"
-        elif color_index == 257:  # ByEntity
-            return "ByEntity"
-        
-        try:
-            # Try to get RGB from the document's color table
-            rgb = doc.tables.colors.get(color_index)
-            if rgb:
-                return rgb
-        except:
-            pass
-        
-        # Fallback to standard AutoCAD color table
-        # This is a simplified version - a complete implementation would have all 255 colors
-        standard_colors = {
-            1: (255, 0, 0),      # Red
-            2: (255, 255, 0),    # Yellow
-            3: (0, 255, 0),      # Green
-            4: (0, 255, 255),    # Cyan
-            5: (0, 0, 255),      # Blue
-            6: (255, 0, 255),    # Magenta
-            7: (255, 255, 255),  # White/Black
-            8: (128, 128, 128),  # Gray
-            9: (192, 192, 192),  # Light Gray
-        }
-        
-        return standard_colors.get(color_index, (0, 0, 0))  # Default to black if not found
-    
-    # Filter MTEXT entities by layer and collect their data
-    mtext_data = []
-    for entity in msp.query(f'MTEXT[layer=="{layer_name}"]'):
+logger = logging.getLogger(__name__)
+
+EZDXF_AVAILABLE = importlib.util.find_spec('ezdxf') is not None
+
+
+def preload():
+    """Import pandas, ezdxf and the chair modules now rather than on first use
+
+    A process pool forked afterwards starts its workers with them loaded.
+    """
+    import ezdxf.document
+    import chair_regions
+    import chair_table
+
+
+def is_drawing(source):
+    """True for an ezdxf Drawing, without importing ezdxf for anything else"""
+    # a Drawing cannot exist before ezdxf.document was imported
+    document = sys.modules.get('ezdxf.document')
+    return document is not None and isinstance(source, document.Drawing)
+
+
+# Summary-only by default, the per-entity listing needs verbosity=2 (DEBUG)
+logger.setLevel(logging.INFO)
+
+VERBOSITY_LEVELS = {0: logging.WARNING, 1: logging.INFO, 2: logging.DEBUG}
+
+
+MTEXT_COLUMNS = ['full_text', 'x', 'y', 'z', 'color_index', 'handle']
+
+
+class LayerScan:
+    """Entities of one layer, collected in a single pass over the modelspace"""
+
+    def __init__(self, layer_name, source=None, keep_entities=False):
+        self.layer_name = layer_name
+        self.source = source            # path of the scanned DXF file, if known
+        self.type_counter = Counter()   # dxftype -> number of entities
+        # (dxftype, handle) in modelspace order, only kept for the debug listing
+        self.entity_list = [] if keep_entities else None
+        # MTEXT rows as one list per column, see MTEXT_COLUMNS
+        self.mtext_columns = {name: [] for name in MTEXT_COLUMNS}
+        self.mtext_handles = []         # MTEXT handles, the chairs among them are replaced
+
+    def add(self, entity):
+        """Record one entity that lives on the scanned layer"""
+        entity_type = entity.dxftype()
+        self.count(entity_type, entity.dxf.handle)
+        if entity_type == 'MTEXT':
+            self.add_mtext(entity)
+
+    def count(self, entity_type, handle):
+        """Count an entity by type without looking at its content"""
+        self.type_counter[entity_type] += 1
+        if self.entity_list is not None:
+            self.entity_list.append((entity_type, handle))
+
+    def extend(self, other):
+        """Append the entities of a scan of a later part of the same layer"""
+        self.type_counter.update(other.type_counter)
+        if self.entity_list is not None:
+            self.entity_list.extend(other.entity_list)
+        for name, values in other.mtext_columns.items():
+            self.mtext_columns[name].extend(values)
+        self.mtext_handles.extend(other.mtext_handles)
+
+    def add_mtext(self, entity):
+        """Collect the row of one MTEXT entity"""
+        handle = entity.dxf.handle
         # Get the insertion point (x, y coordinates)
         x, y, z = entity.dxf.insert
+        columns = self.mtext_columns
+        columns['full_text'].append(entity.text)
+        columns['x'].append(x)
+        columns['y'].append(y)
+        columns['z'].append(z)
+        columns['color_index'].append(entity.dxf.color)
+        columns['handle'].append(handle)
+        self.mtext_handles.append(handle)
+
+    def mtext_frame(self):
+        """Return the collected MTEXT rows as a DataFrame"""
+        import pandas as pd
         
-        # Get the text content
-        text_content = entity.text
-        
-        # Get the color index
-        color_index = entity.dxf.color
-        
-        # Convert color index to RGB
-        #rgb = acad_color_to_rgb(doc, color_index)
-        
-        # Format RGB as a string for display
-        if isinstance(color_index, tuple):
-            rgb_str = f"RGB({color_index[0]}, {color_index[1]}, {color_index[2]})"
-        else:
-            rgb_str = color_index
+        return pd.DataFrame(self.mtext_columns, columns=MTEXT_COLUMNS)
+
+    def chair_table(self):
+        """Chair rows of the collected MTEXT as a compact ChairTable"""
+        from chair_table import ChairTable
         
-        # Add data to our list
-        mtext_data.append({
-            'full_text': text_content,
-            'x': x,
-            'y': y,
-            'z': z,
-            'color_index': color_index,
-    #       'rgb': rgb_str,
-            'handle': entity.dxf.handle
-        })
-    
-    # Create a DataFrame from the collected data
-    mtext_df = pd.DataFrame(mtext_data)
-    
-    # Print summary information
-    print(f"Found {len(mtext_df)} MTEXT entities in layer '{layer_name}'")
-    print("\nDataFrame Preview:")
-    print(mtext_df.head())
-    
-    # Optional: Save to CSV
-    # mtext_df.to_csv(f"mtext_entities_{layer_name}.csv", index=False)
-    
-    # Print entity type counts for reference
-    entity_types = []
-    for entity in msp.query(f'*[layer=="{layer_name}"]'):
-        entity_types.append(entity.dxftype())
-    
-    type_counter = Counter(entity_types)
-    print(f"\nAll entity types in layer '{layer_name}':")
-    for entity_type, count in type_counter.items():
-        print(f"  - {entity_type}: {count} entities")
-    
-    # Drop rows where full_text contains "Elong"
-    mtext_df=mtext_df[~mtext_df.full_text.str.contains("Elong")].reset_index(drop=True)
-    # mtext_df.drop('handle', axis=1, inplace=True)
-    
-    text = mtext_df.full_text.str.split(';')
-    text = text.str[-1]
-    mtext_df['text'] =  text
-    
-    mtext_df.drop('full_text', axis=1, inplace=True)
-    
-    r = mtext_df.text.astype(float)
-    h_CG_max= max(r)
-    h_CG_min= min(r)
-    
-    h_CG_max , h_CG_min
-    
-    r1 = max(mtext_df.z)
-    r2 = min(mtext_df.z)
-    h_cable = (r1-r2)*1000 / 25  #max cable height from top to bot in inches
-    
-    r1, r2, h_cable
-    
-    # Define a function to get chair height in inches
-    # Ask the user if the chair heights given in the dxf already have the z-offset !!!
-    #z_offset = input("Check if offset given in dxf, What is the offset b/w the cable CGS and the chair height (inches)? ")
-    
-    # z_offset = 0.75
-    
-    def chair(h_CG):
-        x = float(h_CG)
-        if x >= 25:
-            hc = round(float(Fraction(round((x / 25 - float(z_offset))*4,0)/4)),2)   # ok.
-        elif x >= 10:
-            hc = 0.75
-        #else: hc = (round(x,1))
-        else: hc = 0
-        return hc
+        return ChairTable.from_columns(**self.mtext_columns)
+
+
+def scan_layer(entities, layer_name, source=None, keep_entities=False):
+    """Visit each entity once and keep the ones on layer_name
+
+    entities can be a modelspace or any other iterable of DXF entities.
+    Layer names are compared case-sensitively, like msp.query('*[layer=="..."]').
+    """
+    scan = LayerScan(layer_name, source=source, keep_entities=keep_entities)
+    for entity in entities:
+        if entity.dxf.layer == layer_name:
+            scan.add(entity)
+    return scan
+
+
+CHAIR_LAYER_SUFFIX = "_chairs"
+# AutoCAD does not allow these in layer names, so they always mean a pattern
+LAYER_WILDCARDS = '*?'
+
+
+def chair_layer_name(layer_name):
+    """Name of the layer that receives the chair labels of layer_name"""
+    return layer_name + CHAIR_LAYER_SUFFIX
+
+
+class LayerSelection:
+    """Layers picked by a name, a list of names or shell-style patterns like 'PT*'
+
+    Named layers are always extracted, even without entities.  A pattern
+    selects the layers of the scanned entities that match it (case-sensitive),
+    leaving out the <layer>_chairs layers of an earlier run.
+    """
+
+    def __init__(self, selected_layer):
+        if isinstance(selected_layer, str):
+            selected_layer = [selected_layer]
+        self.names = []
+        self.patterns = []
+        for name in selected_layer:
+            if any(c in name for c in LAYER_WILDCARDS):
+                self.patterns.append(name)
+            elif name not in self.names:
+                self.names.append(name)
+        if not self.names and not self.patterns:
+            raise ValueError("no layer selected")
+        self._matches = dict.fromkeys(self.names, True)  # layer name -> selected
+
+    @property
+    def single(self):
+        """True for one plain layer name, the original single-layer extraction"""
+        return len(self.names) == 1 and not self.patterns
+
+    @property
+    def key(self):
+        """Text of the selection for cache keys and messages"""
+        return self.names[0] if self.single else ", ".join(self.names + self.patterns)
+
+    def match(self, layer_name):
+        """True when layer_name is selected, worked out once per distinct name"""
+        selected = self._matches.get(layer_name)
+        if selected is None:
+            selected = (not layer_name.endswith(CHAIR_LAYER_SUFFIX)
+                        and any(fnmatchcase(layer_name, pattern) for pattern in self.patterns))
+            self._matches[layer_name] = selected
+        return selected
+
+    def ordered(self, scans):
+        """scans (layer name -> LayerScan) with the named layers first in the
+        given order, then the pattern matches sorted by name; raises ValueError
+        when the patterns select nothing at all"""
+        if not scans:
+            raise ValueError(f"no layer matches '{self.key}'")
+        matched = sorted(name for name in scans if name not in self.names)
+        return {name: scans[name] for name in self.names + matched}
+
+
+def scan_layers(entities, selection, source=None, keep_entities=False):
+    """scan_layer for all layers of a LayerSelection in one pass
+
+    Returns a dict of layer name -> LayerScan in LayerSelection.ordered order.
+    """
+    scans = {name: LayerScan(name, source=source, keep_entities=keep_entities)
+             for name in selection.names}
+    match = selection.match
+    for entity in entities:
+        layer = entity.dxf.layer
+        if match(layer):
+            scan = scans.get(layer)
+            if scan is None:
+                scan = scans[layer] = LayerScan(layer, source=source, keep_entities=keep_entities)
+            scan.add(entity)
+    return selection.ordered(scans)
+
+
+# Entities that belong to a POLYLINE or INSERT and are not modelspace entities
+LINKED_TYPES = ('VERTEX', 'SEQEND', 'ATTRIB')
+
+
+def dxf_bytes(source):
+    """Content of an in-memory DXF input, None when source is a file path
+
+    source can be bytes, a bytearray or memoryview, or a binary stream such
+    as io.BytesIO or a Streamlit UploadedFile.
+    """
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return bytes(source)
+    if hasattr(source, 'getvalue'):
+        return source.getvalue()
+    if hasattr(source, 'read'):
+        return source.read()
+    return None
+
+
+@contextlib.contextmanager
+def open_dxf_text(source):
+    """Text stream over a DXF file path or in-memory DXF content
+
+    The encoding is detected from the header like ezdxf.readfile() does.
+    """
+    from ezdxf.filemanagement import dxf_file_info, dxf_stream_info
+
+    data = dxf_bytes(source)
+    if data is None:
+        info = dxf_file_info(str(source))
+        with open(source, mode='rt', encoding=info.encoding,
+                  errors='surrogateescape') as fp:
+            yield fp
+        return
+    info = dxf_stream_info(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore'))
+    yield io.TextIOWrapper(io.BytesIO(data), encoding=info.encoding, errors='surrogateescape')
+
+
+@contextlib.contextmanager
+def open_dxf_tags(source):
+    """Raw tags of a DXF file path or in-memory DXF content, ASCII or binary
+
+    ASCII files are streamed through open_dxf_text(); a binary DXF has no
+    line structure to stream and is read whole.
+    """
+    from ezdxf.lldxf.tagger import ascii_tags_loader, binary_tags_loader
+
+    data = dxf_bytes(source)
+    if data is None:
+        with open(source, 'rb') as fp:
+            if fp.read(len(BINARY_DXF_SENTINEL)) == BINARY_DXF_SENTINEL:
+                data = BINARY_DXF_SENTINEL + fp.read()
+    if data is not None and data.startswith(BINARY_DXF_SENTINEL):
+        yield binary_tags_loader(data, errors='surrogateescape')
+        return
+    with open_dxf_text(source if data is None else data) as fp:
+        yield ascii_tags_loader(fp)
+
+
+def read_dxf(source):
+    """Load a DXF document from a file path or from in-memory DXF content"""
+    import ezdxf as ed
+    
+    data = dxf_bytes(source)
+    if data is None:
+        return ed.readfile(source)
+    if data.startswith(BINARY_DXF_SENTINEL):
+        from ezdxf.document import Drawing
+        from ezdxf.lldxf.tagger import binary_tags_loader
+        return Drawing.load(binary_tags_loader(data, errors='surrogateescape'))
+    with open_dxf_text(data) as fp:
+        return ed.read(fp)
+
+
+def write_dxf(doc, target):
+    """Save doc to a file path or write it to a binary stream (e.g. io.BytesIO)"""
+    if not hasattr(target, 'write'):
+        doc.saveas(target)
+        return
+    # same text encoding and error handler as Drawing.save()
+    fp = io.TextIOWrapper(target, encoding=doc.output_encoding, errors='dxfreplace')
+    try:
+        doc.write(fp)
+        fp.flush()
+    finally:
+        fp.detach()  # leave the caller's stream open
+
+
+def iter_entity_tags(dxf_file_path):
+    """Yield the raw tags of each ENTITIES section entity, one entity at a time
+
+    dxf_file_path can also be in-memory DXF content (see dxf_bytes).  Only the
+    tags of the current entity are kept in memory and the file is closed as
+    soon as the ENTITIES section ends.
+    """
+    with open_dxf_tags(dxf_file_path) as file_tags:
+        in_entities = False
+        prev_tag = None
+        tags = []
+        for tag in file_tags:
+            if in_entities:
+                if tag.code == 0:
+                    if tags:
+                        yield tags
+                    if tag.value == 'ENDSEC':
+                        return
+                    tags = [tag]
+                else:
+                    tags.append(tag)
+            elif tag.code == 2 and prev_tag == (0, 'SECTION'):
+                in_entities = tag.value == 'ENTITIES'
+            prev_tag = tag
+
+
+def load_entity(tags):
+    """Build a standalone entity from the raw tags of iter_entity_tags"""
+    from ezdxf.entities import factory
+    from ezdxf.lldxf.extendedtags import ExtendedTags
+    from ezdxf.lldxf.types import DXFTag
+    from ezdxf.lldxf.tagger import tag_compiler
+
+    # tag_compiler looks one tag ahead to finish a point, a closing tag keeps
+    # a trailing point (e.g. the last LWPOLYLINE vertex) from being dropped
+    compiled = list(tag_compiler(iter(tags + [DXFTag(0, 'ENDSEC')])))
+    return factory.load(ExtendedTags(compiled[:-1]))
+
+
+def stream_layer(dxf_file_path, layer_name, keep_entities=False):
+    """Build a LayerScan by streaming the ENTITIES section of a DXF file
+
+    Read-only counterpart of scan_layer(doc.modelspace(), layer_name): the
+    document is never loaded, only MTEXT entities on layer_name are decoded
+    and paperspace or linked sub-entities are skipped like msp iteration does.
+    """
+    return stream_layers(dxf_file_path, LayerSelection(layer_name), keep_entities)[layer_name]
+
+
+def stream_layers(dxf_file_path, selection, keep_entities=False, workers=None):
+    """stream_layer for all layers of a LayerSelection in one pass
+
+    Returns a dict of layer name -> LayerScan, see scan_layers.  workers > 1
+    scans the ENTITIES section in that many processes (see dxf_parallel).
+    """
+    if workers is not None and workers > 1:
+        from dxf_parallel import parallel_stream_layers
+        return parallel_stream_layers(dxf_file_path, selection, workers, keep_entities)
+    data = dxf_bytes(dxf_file_path)
+    source = dxf_file_path if data is None else None  # in memory, no path
+    scans = scan_entity_tags(iter_entity_tags(dxf_file_path if data is None else data),
+                             selection, source, keep_entities)
+    return selection.ordered(scans)
+
+
+def scan_entity_tags(entities, selection, source=None, keep_entities=False):
+    """LayerScans of the layers of selection from raw entity tags (iter_entity_tags)
+
+    Returns a dict of layer name -> LayerScan, the names of selection first
+    and the matched layers as they were met; LayerSelection.ordered() sorts it.
+    """
+    scans = {name: LayerScan(name, source=source, keep_entities=keep_entities)
+             for name in selection.names}
+    match = selection.match
+    for tags in entities:
+        entity_type = tags[0].value
+        if entity_type in LINKED_TYPES:
+            continue
+        layer = '0'
+        handle = None
+        paperspace = False
+        for code, value in tags:
+            if code == 8:
+                layer = value
+            elif code == 5:
+                handle = value
+            elif code == 67:
+                paperspace = int(value) == 1
+        if paperspace or not match(layer):
+            continue
+        scan = scans.get(layer)
+        if scan is None:
+            scan = scans[layer] = LayerScan(layer, source=source, keep_entities=keep_entities)
+        scan.count(entity_type, handle)
+        if entity_type == 'MTEXT':
+            scan.add_mtext(load_entity(tags))
+    return scans
+
+
+def add_chair_text(layout, layer, texts, x, y, z, true_color,
+                   height=0.100, style='STANDARD', created=None):
+    """Create one TEXT entity per chair on layer from column arrays
+
+    The attributes shared by all labels are built once and the true colour is
+    set at creation instead of as a second attribute write.  The new entities
+    are appended to the list created when given.  Returns the time spent in
+    seconds.
+    """
+    start = time.perf_counter()
+    shared = {
+        'layer': layer,
+        'height': height,  # Text height - adjust as needed
+        'style': style,    # Text style - adjust as needed
+    }
+    new_entity = layout.new_entity
+    for text, x_coord, y_coord, z_coord, color in zip(
+            map(str, texts), x.tolist(), y.tolist(), z.tolist(), true_color.tolist()):
+        attribs = shared.copy()
+        attribs['text'] = text
+        attribs['insert'] = (x_coord, y_coord, z_coord)
+        attribs['true_color'] = color
+        entity = new_entity('TEXT', attribs)
+        if created is not None:
+            created.append(entity)
+    return time.perf_counter() - start
+
+
+BOUNDARY_TYPES = ('LWPOLYLINE', 'TEXT', 'MTEXT')
+FLATTEN_DISTANCE = 0.01  # max chord deviation of arc segments in region outlines
+
+
+def boundary_regions(entities, layer_name):
+    """Closed LWPOLYLINE outlines on layer_name as named polygon regions
+
+    A region is named after the first TEXT or MTEXT of the layer inside it,
+    else after its handle; arc segments are flattened.  Returns a dict of
+    name -> list of (x, y) vertices.
+    """
+    from ezdxf.path import make_path
+
+    outlines = []
+    labels = []
+    for entity in entities:
+        if entity.dxf.layer != layer_name:
+            continue
+        entity_type = entity.dxftype()
+        if entity_type == 'LWPOLYLINE':
+            points = [(v.x, v.y) for v in make_path(entity).flattening(FLATTEN_DISTANCE)]
+            if len(points) >= 3 and (entity.closed or points[0] == points[-1]):
+                outlines.append((entity.dxf.handle, points))
+        elif entity_type == 'TEXT':
+            labels.append((entity.dxf.text, entity.dxf.insert))
+        elif entity_type == 'MTEXT':
+            labels.append((entity.plain_text(), entity.dxf.insert))
+    
+    from chair_regions import points_in_polygon
+    regions = {}
+    label_x = np.array([insert[0] for _, insert in labels])
+    label_y = np.array([insert[1] for _, insert in labels])
+    for handle, points in outlines:
+        inside = np.flatnonzero(points_in_polygon(label_x, label_y, points))
+        name = labels[inside[0]][0].strip() if len(inside) else ''
+        if not name or name in regions:
+            name = f"{name} {handle}".strip()
+        regions[name] = points
+    return regions
+
+
+def read_boundary_regions(source, layer_name):
+    """Named polygon regions of a boundary layer, see boundary_regions
+
+    source is a Drawing or a DXF file path or content; files are read at the
+    tag level and only the boundary layer's outlines and labels are decoded.
+    """
+    if is_drawing(source):
+        return boundary_regions(source.modelspace(), layer_name)
+    
+    def layer_entities():
+        for tags in iter_entity_tags(source):
+            if tags[0].value not in BOUNDARY_TYPES:
+                continue
+            layer = '0'
+            paperspace = False
+            for code, value in tags:
+                if code == 8:
+                    layer = value
+                elif code == 67:
+                    paperspace = int(value) == 1
+            if layer == layer_name and not paperspace:
+                yield load_entity(tags)
+
+    return boundary_regions(layer_entities(), layer_name)
+
+
+def read_layer_names(dxf_file_path):
+    """Return the layer names of the LAYER table, stopping before ENTITIES"""
+    layers = []
+    with open_dxf_tags(dxf_file_path) as tags:
+        prev_tag = None
+        in_layer_entry = False
+        for tag in tags:
+            if tag.code == 0:
+                if tag.value in ('ENDTAB', 'ENDSEC') and layers:
+                    break
+                in_layer_entry = tag.value == 'LAYER'
+            elif tag.code == 2:
+                if prev_tag == (0, 'SECTION') and tag.value == 'ENTITIES':
+                    break
+                if in_layer_entry:
+                    layers.append(tag.value)
+                    in_layer_entry = False
+            prev_tag = tag
+    return layers
+
+
+@contextlib.contextmanager
+def preserved_document(doc):
+    """Undo the chair layer edits on doc when the block exits
+
+    Used when process_dxf works on a caller's Drawing: the modelspace entity
+    order, the layer table, the handle seed and the file name are restored,
+    so the same document can be annotated again with another z_offset.
+    Entities removed inside the block must be unlinked, not destroyed.
+    """
+    msp = doc.modelspace()
+    entities = list(msp.entity_space)
+    layer_names = {layer.dxf.name for layer in doc.layers}
+    handle_seed = str(doc.entitydb.handles)
+    filename = doc.filename
+    try:
+        yield doc
+    finally:
+        original = set(map(id, entities))
+        for entity in list(msp.entity_space):
+            if id(entity) not in original:
+                msp.unlink_entity(entity)
+                doc.entitydb.delete_entity(entity)
+        msp.entity_space.clear()
+        for entity in entities:
+            msp.add_entity(entity)
+        for name in [layer.dxf.name for layer in doc.layers]:
+            if name not in layer_names:
+                doc.layers.remove(name)
+        doc.entitydb.handles.reset(handle_seed)
+        doc.filename = filename
+
+
+def delete_entities(layout, handles, keep_entities=False):
+    """Remove the entities of handles from layout in one pass over its entity list
+
+    Same result as layout.delete_entity() for each entity, the entities are
+    also dropped from the entity database; with keep_entities=True they are
+    only unlinked like layout.unlink_entity() does.  Each of those calls
+    searches the entity list, which makes removing many entities quadratic.
+    Returns the number of entities removed.
+    """
+    entitydb = layout.doc.entitydb
+    entities = [entitydb[handle] for handle in handles]
+    removed = set(map(id, entities))
+    space = layout.entity_space
+    kept = [entity for entity in space.entities if id(entity) not in removed]
+    if len(space.entities) - len(kept) != len(removed):
+        raise ValueError(f"{len(removed) - len(space.entities) + len(kept)} of the entities "
+                         f"to delete are not in the layout")
+    space.entities = kept
+    for entity in entities:
+        entity.set_owner(None)
+        if not keep_entities:
+            entitydb.delete_entity(entity)
+    return len(entities)
+
+
+def write_chair_layers(doc, layers, output_dxf_name, keep_source=False, profile=None,
+                       source=None):
+    """Replace the MTEXT of several layers by chair labels on <layer>_chairs
+    and save doc once
+
+    layers is a list of (layer name, classified chair table, MTEXT handles)
+    and output_dxf_name a file path or a binary stream.  With
+    keep_source=True the MTEXT entities are only unlinked from the
+    modelspace, as preserved_document() requires.  The delete, annotate and
+    save stages are recorded in profile (a StageProfiler) when given.
+    source is the file path or content doc was loaded from: the output is
+    then spliced into the original bytes (dxf_splice) instead of saving the
+    whole drawing, falling back to saveas when the file does not allow it.
+    """
+    if profile is None:
+        profile = StageProfiler()
+    if source is not None:
+        try:
+            splice_chair_layers(doc, layers, output_dxf_name, source, profile)
+            return
+        except SpliceError as e:
+            logger.warning("Fast save not possible (%s), saving the whole drawing", e)
+    msp = doc.modelspace()
     
-    # Apply the function to the 'Age' column
-    mtext_df['Chairs'] = mtext_df['text'].apply(chair)
+    profile.begin('delete')
+    for selected_layer, mtext_df, mtext_handles in layers:
+        # Count how many will be deleted
+        count = len(mtext_handles)
+        logger.info("Deleting %d MTEXT entities on layer '%s'", count, selected_layer)
+    
+    # Delete them all in one pass over the modelspace
+    delete_entities(msp, [handle for _, _, mtext_handles in layers for handle in mtext_handles],
+                    keep_entities=keep_source)
+    
+    profile.begin('annotate')
+    for selected_layer, mtext_df, mtext_handles in layers:
+        # Create a new layer if it doesn't exist
+        new_layer_name = chair_layer_name(selected_layer)
+        if new_layer_name not in doc.layers:
+            doc.layers.new(name=new_layer_name)
+        
+        # Add all chair labels in one batch, colour set at creation
+        elapsed = add_chair_text(msp, new_layer_name,
+                                 mtext_df['Chairs_Fraction'].to_numpy(),
+                                 mtext_df['x'].to_numpy(),
+                                 mtext_df['y'].to_numpy(),
+                                 mtext_df['z'].to_numpy(),
+                                 mtext_df['trueColor'].to_numpy())
+        logger.info("Added %d text entities to layer '%s' in %.3f s",
+                    len(mtext_df), new_layer_name, elapsed)
     
+    # Save the modified DXF file
+    profile.begin('save')
+    write_dxf(doc, output_dxf_name)
+    profile.end()
+    logger.info("Saved '%s'",
+                output_dxf_name if isinstance(output_dxf_name, (str, os.PathLike)) else 'in memory')
+
+
+def splice_chair_layers(doc, layers, output_dxf_name, source, profile):
+    """Fast path of write_chair_layers: splice the edits into the source bytes
+
+    The labels are formatted straight into the output and the MTEXT is cut
+    from the copied ENTITIES section, so doc is left as loaded apart from the
+    new layers and handles it hands out.  Raises dxf_splice.SpliceError,
+    before anything is written, when the file cannot be spliced.
+    """
+    profile.begin('annotate')
+    owner = doc.modelspace().block_record_handle
+    next_handle = doc.entitydb.next_handle
+    deleted = []
+    new_layers = []
+    chunks = []
+    for selected_layer, mtext_df, mtext_handles in layers:
+        deleted += mtext_handles
+        new_layer_name = chair_layer_name(selected_layer)
+        if new_layer_name not in doc.layers:
+            layer = doc.layers.new(name=new_layer_name)
+            new_layers.append(layer)
+        handles = [next_handle() for _ in range(len(mtext_df))]
+        chunks.append(text_entity_tags(handles, owner, new_layer_name,
+                                       mtext_df['Chairs_Fraction'].to_numpy(),
+                                       mtext_df['x'].to_numpy(),
+                                       mtext_df['y'].to_numpy(),
+                                       mtext_df['z'].to_numpy(),
+                                       mtext_df['trueColor'].to_numpy(),
+                                       dxfversion=doc.dxfversion))
+        logger.info("Replacing %d MTEXT entities on layer '%s' by %d text entities on '%s'",
+                    len(mtext_handles), selected_layer, len(mtext_df), new_layer_name)
+    
+    profile.begin('save')
+    data = dxf_bytes(source)
+    if data is None:
+        with open(source, 'rb') as fp:
+            data = fp.read()
+    splice_dxf(data, output_dxf_name, doc, deleted, ''.join(chunks), new_layers)
+    profile.end()
+    logger.info("Spliced the edits into '%s'",
+                output_dxf_name if isinstance(output_dxf_name, (str, os.PathLike)) else 'in memory')
+
+
+@contextlib.contextmanager
+def log_verbosity(verbosity):
+    """Set the module logger level for the block, None keeps the current level"""
+    if verbosity is None:
+        yield
+        return
+    previous = logger.level
+    logger.setLevel(VERBOSITY_LEVELS[min(max(int(verbosity), 0), 2)])
+    try:
+        yield
+    finally:
+        logger.setLevel(previous)
+
+
+def save_chair_counts(chairs_df, schedule_output, region_df=None, layer_df=None, chair_df=None,
+                      schedule_format=None, reject_df=None, merged_df=None):
+    """Save the chair schedule to a file path or a binary stream (e.g. io.BytesIO)
+
+    The format is schedule_format, or the one of the path's suffix (see
+    chair_export).  The per-layer counts of layer_df go to a 'Layers' table,
+    the per-region counts of region_df to 'Regions', the per-chair rows
+    of chair_df to 'Chairs', the unparseable labels of reject_df to
+    'Rejects' and the merged duplicate chairs of merged_df to 'Merged':
+    sheets of one XLSX workbook, members of one JSON document, or
+    <name>_layers.csv etc. next to a CSV or Parquet file.
+    """
+    return export_schedule({'Counts': chairs_df, 'Layers': layer_df, 'Regions': region_df,
+                            'Chairs': chair_df, 'Rejects': reject_df, 'Merged': merged_df},
+                           schedule_output, schedule_format)
+
+
+def label_rejects(mtext_df):
+    """MTEXT labels of the result that could not be parsed, None when there are none"""
+    rejects = getattr(mtext_df, 'rejects', None)
+    if rejects is None or rejects.empty:
+        return None
+    return rejects
+
+
+def merged_groups(mtext_df):
+    """Chairs of the merged duplicate groups of the result, None when nothing was merged"""
+    merged = getattr(mtext_df, 'merged', None)
+    if merged is None or merged.empty:
+        return None
+    return merged
+
+
+def log_label_rejects(layer_name, table):
+    """Warn about the MTEXT of a layer that is neither a chair height nor an elongation"""
+    rejects = label_rejects(table)
+    if rejects is not None:
+        first = rejects.iloc[0]
+        logger.warning("%d MTEXT labels in layer '%s' are not chair heights and were left in place, "
+                       "e.g. %r (handle %s at %.2f, %.2f)", len(rejects), layer_name,
+                       first['text'], first['handle'], first['x'], first['y'])
+
+
+def chair_mtext_handles(scan, table):
+    """MTEXT handles of a scan to replace by chair labels: all but the rejects
+    of its chair table, which stay on the layer for the crew to find"""
+    rejects = label_rejects(table)
+    if rejects is None:
+        return scan.mtext_handles
+    kept = set(rejects['handle'])
+    return [handle for handle in scan.mtext_handles if handle not in kept]
+
+
+def chair_rows(mtext_df):
+    """Per-chair table of the schedule: the compact frame of a ChairTable"""
+    from chair_table import ChairTable
     
-    def convert_to_mixed_number(x):
+    if isinstance(mtext_df, ChairTable):
+        return mtext_df.to_frame(compact=True)
+    return mtext_df
 
-        #decimal_value = 5.25
-        fraction_object = Fraction(x)
-        
-        whole_number = fraction_object.numerator // fraction_object.denominator
-        remainder_numerator = fraction_object.numerator % fraction_object.denominator
-        denominator = fraction_object.denominator
-        
-        if remainder_numerator == 0:
-
-            if whole_number == 0:
-                return " "
-            else: return (f"{whole_number}")
-                
-            print (f"{remainder_numerator}/{denominator}")
-            
+
+def count_layer_mtext(dxf_file_path):
+    """Number of modelspace MTEXT entities per layer, from the raw ENTITIES tags"""
+    counts = Counter()
+    for tags in iter_entity_tags(dxf_file_path):
+        if tags[0].value != 'MTEXT':
+            continue
+        layer = '0'
+        paperspace = False
+        for code, value in tags:
+            if code == 8:
+                layer = value
+            elif code == 67:
+                paperspace = int(value) == 1
+        if not paperspace:
+            counts[layer] += 1
+    return counts
+
+
+def read_layer_summary(dxf_file_path):
+    """Layer names of the LAYER table with their MTEXT count
+
+    Neither reader builds the document: the names come from the TABLES section
+    and the counts from a tag-level pass over ENTITIES.  Returns a list of
+    (layer name, MTEXT count) in layer table order.
+    """
+    mtext_counts = count_layer_mtext(dxf_file_path)
+    return [(name, mtext_counts.get(name, 0)) for name in read_layer_names(dxf_file_path)]
+
+
+class ScanOptions:
+    """How process_dxf reads the chairs: read-only streaming, its workers and
+    the merging of duplicates"""
+
+    def __init__(self, stream=False, workers=None, merge_radius=None, merge_rule='max'):
+        self.stream = stream
+        self.workers = workers            # processes scanning ENTITIES in read-only mode
+        self.merge_radius = merge_radius  # drawing units, None keeps every chair
+        self.merge_rule = merge_rule
+
+
+class OutputOptions:
+    """What process_dxf writes besides the output DXF: the chair schedule, its
+    region counts and whether the DXF is spliced"""
+
+    def __init__(self, schedule_output=None, schedule_format=None, export_chairs=False,
+                 regions=None, fast_save=False):
+        self.schedule_output = schedule_output
+        self.schedule_format = schedule_format
+        self.export_chairs = export_chairs
+        self.regions = regions
+        self.fast_save = fast_save
+
+    def write_schedule(self, mtext_df, chairs_df, profile):
+        """Save the chair schedule of a result, if there is a target"""
+        if self.schedule_output is None:
+            return
+        profile.begin('export')
+        save_chair_counts(chairs_df, self.schedule_output, mtext_df.regions, layer_counts(mtext_df),
+                          chair_rows(mtext_df) if self.export_chairs else None, self.schedule_format,
+                          label_rejects(mtext_df), merged_groups(mtext_df))
+
+
+def process_dxf(dxf_file_path, selected_layer, z_offset, output_dxf_name,
+                stream=False, cache=None, profile=None, verbosity=None,
+                content_hash=None, regions=None, compact=False,
+                fast_save=False, schedule_output=None, schedule_format=None, export_chairs=False,
+                workers=None, merge_radius=None, merge_rule='max'):
+    """Extract chair heights from the MTEXT of selected_layer
+
+    selected_layer is a layer name, a list of names or a shell-style pattern
+    such as 'PT*' (see LayerSelection).  Several layers are extracted in one
+    pass: each gets its own <layer>_chairs layer in the one output DXF, the
+    returned mtext_df starts with a 'layer' column, chairs_df holds the
+    combined counts and the workbook adds the per-layer counts on a 'Layers'
+    sheet (see count_chairs_by_layer).
+
+    dxf_file_path is the path of a DXF file, its content in memory (bytes or
+    a binary stream), an already loaded ezdxf Drawing, a LayerScan or a
+    ChairAnnotator of selected_layer.  A Drawing is annotated and saved but
+    left as it was, so it can be processed again with another z_offset; a
+    LayerScan only gives the chair tables; a ChairAnnotator re-labels its
+    document in place, only recomputing the chair bins and counts.
+
+    output_dxf_name and schedule_output are file paths or binary streams
+    such as io.BytesIO.  The chair schedule is written by the exporter of
+    schedule_format (see chair_export: 'csv', 'json', 'parquet' or 'xlsx'),
+    by default the one of the schedule_output suffix, else CSV.  Without
+    schedule_output it goes next to the input file, or next to the output DXF
+    file when the input has no path; none is written when neither is a path
+    or when schedule_output is False.
+    export_chairs=True adds the per-chair table ('Chairs') to the schedule.
+
+    With stream=True the DXF file is read in low-memory read-only mode: the
+    chair tables are built from the streamed ENTITIES section and no modified
+    DXF file is written.  workers > 1 scans that section in a pool of as many
+    processes with the same result (see dxf_parallel); the full mode loads
+    the document with ezdxf in one process and ignores it.
+
+    cache is an optional result_cache.ResultCache; a run on the same file
+    content with the same parameters is then served from it without parsing.
+    content_hash (result_cache.content_sha256 of the input) lets the cache
+    key a Drawing or LayerScan that has no file behind it.
+
+    profile is an optional pipeline_profile.StageProfiler that receives the
+    wall time, CPU time and memory of every pipeline stage; its report() is
+    the structured counterpart of mtext_df and chairs_df.
+
+    regions adds per-region chair counts to the workbook: either a mapping of
+    region name -> rectangle (xmin, ymin, xmax, ymax) or polygon vertices, or
+    the name of a layer of the same DXF whose closed polylines are the regions
+    (see read_boundary_regions and chair_regions.count_chairs_by_region).
+    The counts are also kept in the regions frame of the compact table.
+
+    fast_save=True writes the output DXF by copying the input file and only
+    splicing in the edits (see dxf_splice), which is much faster than saving
+    the whole drawing on large files.  It applies to file and in-memory input;
+    a Drawing or ChairAnnotator is always saved in full.
+
+    compact=True returns the chair_table.ChairTable the pipeline works on
+    instead of mtext_df; its to_frame() gives mtext_df, to_frame(compact=True)
+    a smaller display frame.
+
+    MTEXT on the layers that is neither a chair height nor an elongation does
+    not stop the run: it is logged as a warning, written to a 'Rejects' table
+    of the schedule and kept, with handles and coordinates, in the rejects
+    frame of the compact table.  It stays on its layer in the output DXF.
+
+    merge_radius merges the chairs closer than that many drawing units, such
+    as the several labels ADAPT-Floor writes at tendon crossings, into one
+    governing chair: the highest of each group with merge_rule 'max', the
+    lowest with 'min' or the first in drawing order with 'first' (see
+    chair_clusters).  Only the governing chairs are labelled and counted, the
+    groups go to a 'Merged' table of the schedule and to the merged frame of
+    the compact table.  It does not apply to a ChairAnnotator.
+
+    verbosity sets how much is logged through the 'dxf_extraction' logger:
+    0 warnings only, 1 a summary per run (default), 2 also the per-entity
+    listing and DataFrame previews.  None keeps the logger's current level.
+    """
+    scan_options = ScanOptions(stream, workers, merge_radius, merge_rule)
+    output_options = OutputOptions(schedule_output, schedule_format, export_chairs, regions, fast_save)
+    with log_verbosity(verbosity):
+        table, chairs_df = _process_dxf(dxf_file_path, selected_layer, z_offset, output_dxf_name,
+                                        scan_options, output_options, cache, profile, content_hash)
+    if compact:
+        return table, chairs_df
+    return table.to_frame(), chairs_df
+
+
+def process_dxf_buffers(dxf_source, selected_layer, z_offset, stream=False, schedule_format='xlsx',
+                        **kwargs):
+    """Run process_dxf without touching the disk
+
+    Returns (mtext_df, chairs_df, dxf_buffer, schedule_buffer) where the
+    buffers are io.BytesIO rewound to the start; dxf_buffer is None in
+    read-only mode.  The schedule is one XLSX workbook by default; CSV and
+    Parquet only hold the counts table in a buffer.  Further keyword
+    arguments go to process_dxf.
+    """
+    dxf_buffer = io.BytesIO()
+    schedule_buffer = io.BytesIO()
+    mtext_df, chairs_df = process_dxf(dxf_source, selected_layer, z_offset, dxf_buffer, stream=stream,
+                                      schedule_output=schedule_buffer, schedule_format=schedule_format,
+                                      **kwargs)
+    dxf_buffer.seek(0)
+    schedule_buffer.seek(0)
+    if not dxf_buffer.getbuffer().nbytes:
+        dxf_buffer = None  # read-only mode, nothing written
+    return mtext_df, chairs_df, dxf_buffer, schedule_buffer
+
+
+def _process_dxf(dxf_file_path, selected_layer, z_offset, output_dxf_name,
+                 scan_options, output, cache, profile, content_hash):
+    if profile is None:
+        profile = StageProfiler()
+    
+    # Resolve what we were given: a file path, a loaded document or a scan
+    doc = None
+    scan = None
+    annotator = None
+    if isinstance(dxf_file_path, ChairAnnotator):
+        annotator = dxf_file_path
+        if annotator.layer_name != selected_layer:
+            raise ValueError(f"annotator of layer '{annotator.layer_name}' given for layer '{selected_layer}'")
+        if scan_options.merge_radius:
+            raise ValueError("merge_radius is not supported with a ChairAnnotator")
+        dxf_file_path = annotator.doc.filename
+    elif isinstance(dxf_file_path, LayerScan):
+        scan = dxf_file_path
+        if scan.layer_name != selected_layer:
+            raise ValueError(f"scan of layer '{scan.layer_name}' given for layer '{selected_layer}'")
+        dxf_file_path = scan.source
+        scan_options.stream = True  # nothing to write back
+    elif is_drawing(dxf_file_path):
+        doc = dxf_file_path
+        dxf_file_path = doc.filename
+    data = dxf_bytes(dxf_file_path)
+    if data is not None:
+        dxf_file_path = None  # in-memory input
+    selection = LayerSelection(selected_layer)
+    if isinstance(output.regions, str):
+        # polygons of a boundary layer, read from whatever source we were given
+        if doc is not None:
+            boundary_source = doc
+        elif annotator is not None:
+            boundary_source = annotator.doc
         else:
+            boundary_source = dxf_file_path if data is None else data
+        if boundary_source is None:
+            raise ValueError(f"no DXF content to read the regions of layer '{output.regions}' from")
+        profile.begin('regions')
+        output.regions = read_boundary_regions(boundary_source, output.regions)
+    if output.schedule_output is None:
+        # schedule next to a file path, in-memory runs pass their own target
+        output.schedule_output = next((schedule_path(path, output.schedule_format or DEFAULT_FORMAT)
+                                       for path in (dxf_file_path, output_dxf_name)
+                                       if isinstance(path, (str, os.PathLike))), None)
+    elif output.schedule_output is False:
+        output.schedule_output = None  # only the results are wanted
+    stream = scan_options.stream
 
-            if whole_number == 0:
-                return (f"{remainder_numerator}/{denominator}")
-            else: return  (f"{whole_number} {remainder_numerator}/{denominator}")
+    # Re-use the result of an earlier run on the same file and parameters
+    if cache is not None and content_hash is None:
+        if data is not None:
+            content_hash = content_sha256(data)
+        elif dxf_file_path and os.path.isfile(dxf_file_path):
+            content_hash = content_sha256(dxf_file_path)
+        else:
+            cache = None  # no content to key the cache on
+    if cache is not None:
+        profile.begin('cache_lookup')
+        cache_key = result_key(cache, content_hash, selection, z_offset, stream, output.fast_save,
+                               scan_options.merge_radius, scan_options.merge_rule)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            mtext_df, chairs_df, dxf_content = cached
+            logger.info("Using cached result for layer '%s', z_offset %s", selection.key, z_offset)
+            # the regions are not part of the key, count them for this run
+            mtext_df.regions = region_counts(mtext_df, output.regions, profile)
+            if dxf_content is not None:
+                profile.begin('save')
+                if hasattr(output_dxf_name, 'write'):
+                    output_dxf_name.write(dxf_content)
+                else:
+                    with open(output_dxf_name, 'wb') as fp:
+                        fp.write(dxf_content)
+            output.write_schedule(mtext_df, chairs_df, profile)
+            profile.end()
+            return mtext_df, chairs_df
 
-    
-    
-    
-    def assign_chair_colors(chair_height):
-        if not isinstance(chair_height, (int, float)) or chair_height == " ":
-            return (125, 125, 125)  # Default gray for missing/invalid values
+    if annotator is not None:
+        # Parsed chair dataset kept from an earlier run, patch the labels in place
+        mtext_df, chairs_df = annotator.annotate(z_offset, output_dxf_name, output.schedule_output,
+                                                 profile, regions=output.regions,
+                                                 schedule_format=output.schedule_format,
+                                                 export_chairs=output.export_chairs)
+        if cache is not None:
+            store_result(cache, cache_key, mtext_df, chairs_df, output_dxf_name, profile)
+            profile.end()
+        return mtext_df, chairs_df
+
+    # Layers to analyze, all of them are picked up in the same pass
+    if scan is not None:
+        # Parsed chair dataset given, nothing to read
+        scans = {scan.layer_name: scan}
+    elif stream:
+        # Read-only: stream the ENTITIES section, the document is not loaded
+        profile.begin('stream')
+        scans = stream_layers(dxf_file_path if data is None else data, selection,
+                              keep_entities=logger.isEnabledFor(logging.DEBUG),
+                              workers=scan_options.workers)
+    else:
+        # Open a DXF file unless a loaded document was given
+        shared_doc = doc is not None
+        if doc is None:
+            profile.begin('parse')
+            doc = read_dxf(dxf_file_path if data is None else data)
         
-        # Convert to float to ensure proper comparison
-        height = float(chair_height)
+        # Now you can work with the DXF document
+        # For example, to access the modelspace:
+        msp = doc.modelspace()
         
-        # Define colors for different height ranges
-        # Starting from 1.00 with increments of 0.25
-        if height == 1.00:
-            return (0, 0, 255)  # Blue
-        elif height == 1.25:
-            return (0, 125, 255)
-        elif height == 1.50:
-            return (0, 255, 255)  # Cyan
-        elif height == 1.75:
-            return (0, 255, 125)
-        elif height == 2.00:
-            return (0, 255, 125)  # Green
-        elif height == 2.25:
-            return (125, 255, 0)
-        elif height == 2.50:
-            return (255, 255, 0)  # Yellow
-        elif height == 2.75:
-            return (255, 191, 0)
-        elif height == 3.00:
-            return (255, 125, 0)  # Orange
-        elif height == 3.25:
-            return (255, 64, 0)
-        elif height == 3.50:
-            return (255, 0, 0)  # Red
-        elif height == 3.75:
-            return (255, 0, 64)
-        elif height == 4.00:
-            return (255, 0, 125)  # Pink
-        elif height == 4.25:
-            return (255, 0, 191)
-        elif height == 4.50:
-            return (255, 0, 255)  # Magenta
-        elif height == 4.75:
-            return (191, 0, 255)
-        elif height == 5.00:
-            return (125, 0, 255)  # Purple
-        elif height == 5.25:
-            return (64, 0, 255)
-        elif height == 5.50:
-            return (0, 0, 191)  # Dark blue
-        elif height == 5.75:
-            return (0, 0, 125)
-        elif height >= 6.00:
-            return (0, 0, 64)  # Very dark blue
-        else:
-            # For values that fall between defined increments, find the closest lower increment
-            # and return its color directly instead of recursively calling the function
-            base_height = int(height * 4) / 4  # Round down to nearest 0.25
-            
-            # Use a direct mapping instead of recursion
-            color_map = {
-                1.00: (0, 0, 255),
-                1.25: (0, 125, 255),
-                1.50: (0, 255, 255),
-                1.75: (0, 255, 125),
-                2.00: (0, 255, 125),
-                2.25: (125, 255, 0),
-                2.50: (255, 255, 0),
-                2.75: (255, 191, 0),
-                3.00: (255, 125, 0),
-                3.25: (255, 64, 0),
-                3.50: (255, 0, 0),
-                3.75: (255, 0, 64),
-                4.00: (255, 0, 125),
-                4.25: (255, 0, 191),
-                4.50: (255, 0, 255),
-                4.75: (191, 0, 255),
-                5.00: (125, 0, 255),
-                5.25: (64, 0, 255),
-                5.50: (0, 0, 191),
-                5.75: (0, 0, 125),
-                6.00: (0,0,64)
-            }
-            
-            # Return the color for the base_height if it exists in the map
-            if base_height in color_map:
-                return color_map[base_height]
-            # If base_height is less than 1.00, return a default color
-            elif base_height < 1.00:
-                return (125, 125, 125)  # Default gray
-            # If base_height is greater than 5.75 but less than 6.00
-            else:
-                return (0, 0, 64)  # Very dark blue
-    
-            if type(chair_height) == str : return " "
-    
-    # Apply the function to create a new 'Color' column in the dataframe
-    mtext_df['chairColor'] = mtext_df['Chairs'].apply(assign_chair_colors)
-    
-    def assign_chair_hex_colors(chair_height):
-        if not isinstance(chair_height, (int, float)) or chair_height == " ":
-            return "#808080"  # Default gray for missing/invalid values
+        # Walk the modelspace once: type counts, MTEXT rows and handles to delete
+        profile.begin('scan')
+        scans = scan_layers(msp, selection, source=dxf_file_path,
+                            keep_entities=logger.isEnabledFor(logging.DEBUG))
+    
+    profile.begin('report')
+    for layer_name, scan in scans.items():
+        # Count and report the unique entity types in the layer
+        type_counter = scan.type_counter
+        logger.info("Entity types in layer '%s': %s", layer_name,
+                    ", ".join(f"{entity_type}: {count}" for entity_type, count in type_counter.items()))
         
-        # Convert to float to ensure proper comparison
-        height = float(chair_height)
+        # All entities in the layer with their types, only collected for debugging
+        if scan.entity_list is not None:
+            logger.debug("Detailed list of entities in layer '%s':", layer_name)
+            for i, (entity_type, handle) in enumerate(scan.entity_list):
+                logger.debug("  %d. Type: %s, Handle: %s", i + 1, entity_type, handle)
         
-        # Define colors for different height ranges using hex notation
-        # Starting from 1.00 with increments of 0.25
-        if height == 1.00:
-            return "#0000FF"  # Blue
-        elif height == 1.25:
-            return "#0080FF"
-        elif height == 1.50:
-            return "#00FFFF"  # Cyan
-        elif height == 1.75:
-            return "#00FF80"
-        elif height == 2.00:
-            return "#00FF00"  # Green
-        elif height == 2.25:
-            return "#80FF00"
-        elif height == 2.50:
-            return "#FFFF00"  # Yellow
-        elif height == 2.75:
-            return "#FFBF00"
-        elif height == 3.00:
-            return "#FF8000"  # Orange
-        elif height == 3.25:
-            return "#FF4000"
-        elif height == 3.50:
-            return "#FF0000"  # Red
-        elif height == 3.75:
-            return "#FF0040"
-        elif height == 4.00:
-            return "#FF0080"  # Pink
-        elif height == 4.25:
-            return "#FF00BF"
-        elif height == 4.50:
-            return "#FF00FF"  # Magenta
-        elif height == 4.75:
-            return "#BF00FF"
-        elif height == 5.00:
-            return "#8000FF"  # Purple
-        elif height == 5.25:
-            return "#4000FF"
-        elif height == 5.50:
-            return "#0000BF"  # Dark blue
-        elif height == 5.75:
-            return "#000080"
-        elif height >= 6.00:
-            return "#000040"  # Very dark blue
-        else:
-            # For values that fall between defined increments, find the closest lower increment
-            # and return its color directly instead of recursively calling the function
-            base_height = int(height * 4) / 4  # Round down to nearest 0.25
-            
-            # Use a direct mapping instead of recursion
-            color_map = {
-                1.00: "#0000FF",
-                1.25: "#0080FF",
-                1.50: "#00FFFF",
-                1.75: "#00FF80",
-                2.00: "#00FF00",
-                2.25: "#80FF00",
-                2.50: "#FFFF00",
-                2.75: "#FFBF00",
-                3.00: "#FF8000",
-                3.25: "#FF4000",
-                3.50: "#FF0000",
-                3.75: "#FF0040",
-                4.00: "#FF0080",
-                4.25: "#FF00BF",
-                4.50: "#FF00FF",
-                4.75: "#BF00FF",
-                5.00: "#8000FF",
-                5.25: "#4000FF",
-                5.50: "#0000BF",
-                5.75: "#000080"
-            }
-            
-            # Return the color for the base_height if it exists in the map
-            if base_height in color_map:
-                return color_map[base_height]
-            # If base_height is less than 1.00, return a default color
-            elif base_height < 1.00:
-                return "#808080"  # Default gray
-            # If base_height is greater than 5.75 but less than 6.00
-            else:
-                return "#000040"  # Very dark blue
-    
-            if type(chair_height) == str : return " "
-    
-    # Apply the function to create a new 'Color' column in the dataframe
-    mtext_df['chairHexColor'] = mtext_df['Chairs'].apply(assign_chair_hex_colors)
-    
-    mtext_df['trueColor'] = mtext_df.chairColor.apply(ed.colors.rgb2int)
-    
-    
-    
-    
-    mtext_df['Chairs_Fraction'] =mtext_df['Chairs'].apply(convert_to_mixed_number)
-    
-    
-    
-    
-    # To delete entities from a layer
-    
-    # Specify the layer name from which to delete MTEXT entities
-    layer_name = selected_layer
-    
-    # Find all MTEXT entities on the specified layer
-    mtext_entities = msp.query('MTEXT[layer=="{}"]'.format(layer_name))
-    
-    # Count how many will be deleted
-    count = len(mtext_entities)
-    print(f"Found {count} MTEXT entities on layer '{layer_name}'")
-    
-    # Delete each entity
-    for entity in mtext_entities:
-        msp.delete_entity(entity)
+        # Summary information
+        logger.info("Found %d MTEXT entities in layer '%s'", len(scan.mtext_handles), layer_name)
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("DataFrame Preview:\n%s", scan.mtext_frame().head())
+    
+    # Chair rows in typed columns, "Elong" labels dropped and CGS heights parsed,
+    # labels that are neither are set aside instead of failing the run
+    profile.begin('classify')
+    chairs = {layer_name: scan.chair_table() for layer_name, scan in scans.items()}
+    for layer_name, table in chairs.items():
+        log_label_rejects(layer_name, table)
+    
+    # Chair height in inches for each CGS height in mm, rounded to 1/4"
+    # Ask the user if the chair heights given in the dxf already have the z-offset !!!
+    #z_offset = input("Check if offset given in dxf, What is the offset b/w the cable CGS and the chair height (inches)? ")
     
+    # z_offset = 0.75
     
-    # Create a new layer if it doesn't exist
-    new_layer_name = selected_layer + "_chairs"
-    if new_layer_name not in doc.layers:
-        doc.layers.new(name=new_layer_name)
+    # Classify all chairs at once; colours and labels are derived from the bin on demand
+    tables = {layer_name: table.classify(z_offset) for layer_name, table in chairs.items()}
     
-    # Assuming mtext_df has columns: 'text', 'x', 'y'
-    # Loop through each row in the DataFrame and add text
-    for index, row in mtext_df.iterrows():
-        # Extract text and coordinates
-        text_content = str(row['Chairs_Fraction'])
-        colorRGB = row['chairColor']
-        colorHex = row['chairHexColor']
-        true_Color = row['trueColor']
-        x_coord = row['x']
-        y_coord = row['y']
-        z_coord = row['z']
-
-
-   #    text.dxf.true_color = ed.colors.rgb2int((true_Color[0], true_Color[1], true_Color[2]))
-   #    r, g, b = ed.colors.int2rgb(text.dxf.true_color)
-    #    text_entity.rgb = (colorRGB[0], colorRGB[1], colorRGB[2])
-       
-        # Add text entity to the new layer with position directly specified
-        # Note: Fixed the syntax error by properly organizing arguments
-        t = msp.add_text(
-            text_content,  # Positional argument first
-            # text.dxf.true_color removed or should be part of dxfattribs
-            # If you need to set color, include it in dxfattribs
-      
-             dxfattribs={
-                'layer': new_layer_name,
-                'height': 0.100,  # Text height - adjust as needed
-                'style': 'STANDARD',  # Text style - adjust as needed
-                'insert': (x_coord, y_coord, z_coord),  # Specify position directly here
-    #           'set_elevation' : 'MIDDLE',
-    #           'halign' : 4,
-      #          'rgb': (colorRGB[0], colorRGB[1], colorRGB[2]) # Uncomment if you want to use the color from DataFrame
-       #        'true_color': text.dxf.true_color  # If this is what you intended
-            }, 
-        )     # .set_align_enum(align=text_content.Alignment.LEFT)
-        t.rgb = (colorRGB[0], colorRGB[1], colorRGB[2])
+    # Several labels at one point (tendon crossings) count as one chair
+    merged_df = None
+    if scan_options.merge_radius:
+        from chair_clusters import merge_tables
+        
+        profile.begin('merge')
+        tables, merged_df = merge_tables(tables, scan_options.merge_radius, scan_options.merge_rule)
+        logger.info("Merged %d chairs within %s of another into %d groups (%s height kept)",
+                    len(merged_df), scan_options.merge_radius, merged_df['group'].nunique(),
+                    scan_options.merge_rule)
+    
+    layers = [(layer_name, tables[layer_name], chair_mtext_handles(scan, chairs[layer_name]))
+              for layer_name, scan in scans.items()]
+    if stream:
+        logger.info("Read-only mode: no modified DXF written for layer '%s'", selection.key)
+    elif shared_doc:
+        # Annotate the caller's document and put it back as it was
+        with preserved_document(doc):
+            write_chair_layers(doc, layers, output_dxf_name, keep_source=True, profile=profile)
+    else:
+        write_chair_layers(doc, layers, output_dxf_name, profile=profile,
+                           source=(dxf_file_path if data is None else data) if output.fast_save else None)
+    
+    # One layer keeps the original mtext_df, several are stacked with a 'layer' column
+    if selection.single:
+        mtext_df = tables[selection.key]
+    else:
+        from chair_table import ChairTable
+        mtext_df = ChairTable.concat(tables)
+    mtext_df.merged = merged_df
+    
+    profile.begin('counts')
+    chairs_df = count_chairs(mtext_df, ", ".join(tables))
+    mtext_df.regions = region_counts(mtext_df, output.regions, profile)
+    
+    # Save the chair schedule (counts and optionally every chair)
+    output.write_schedule(mtext_df, chairs_df, profile)
+    
+    if cache is not None:
+        store_result(cache, cache_key, mtext_df, chairs_df,
+                     None if stream else output_dxf_name, profile)
+    profile.end()
 
-    
-    
+    return mtext_df , chairs_df
 
+
+def layer_counts(mtext_df):
+    """Per-layer chair counts of a multi-layer result, None for a single layer"""
+    if getattr(mtext_df, 'layer', None) is None:
+        return None
+    return count_chairs_by_layer(mtext_df)
+
+
+def region_counts(mtext_df, regions, profile=None):
+    """Per-region chair counts, None without regions"""
+    if not regions:
+        return None
+    from chair_regions import count_chairs_by_region
+    
+    if profile is not None:
+        profile.begin('region_counts')
+    return count_chairs_by_region(mtext_df, regions)
+
+
+def result_key(cache, content_hash, selected_layer, z_offset, stream=False, fast_save=False,
+               merge_radius=None, merge_rule='max'):
+    """Cache key of a process_dxf run, so a caller can look it up before parsing"""
+    if not isinstance(selected_layer, LayerSelection):
+        selected_layer = LayerSelection(selected_layer)
+    # the spliced output differs from a full save, older keys stay valid
+    params = {'fast_save': True} if fast_save and not stream else {}
+    if merge_radius:
+        params.update(merge_radius=merge_radius, merge_rule=merge_rule)
+    return cache.key(content_hash, selected_layer.key, z_offset, stream=stream, **params)
+
+
+def store_result(cache, cache_key, mtext_df, chairs_df, output_dxf_name, profile):
+    """Put a result and the bytes of its output DXF (None if not written) in the cache"""
+    profile.begin('cache_store')
+    dxf_content = None
+    if output_dxf_name is None:
+        pass
+    elif hasattr(output_dxf_name, 'getvalue'):
+        dxf_content = output_dxf_name.getvalue()
+    else:
+        with open(output_dxf_name, 'rb') as fp:
+            dxf_content = fp.read()
+    cache.put(cache_key, mtext_df, chairs_df, dxf_content)
+
+
+def count_chairs(mtext_df, layer_name):
+    """Number of chairs of each height, zero-height chairs left out
+
+    mtext_df can be the frame or the ChairTable of the chairs.  The counting
+    itself is chair_bins.quarter_counts, pandas only builds the frame.
+    """
+    import pandas as pd
     
-    # Save the modified DXF file
-    doc.saveas(output_dxf_name)
-    print(f"Added {len(mtext_df)} text entities to layer '{new_layer_name}'")
-    
-    chair_counts = mtext_df['Chairs'].value_counts()
-   
-    
-    chairs_df = chair_counts.to_frame()
-    chairs_df = chairs_df.sort_values(by='Chairs', ascending=True)
-    chairs_df = chairs_df.drop(0)
-    chairs_df.index.name = 'h_chair [in]'
-    print("\nCounts for 'chairs':\n", chair_counts)
-    chairs_df = chairs_df.reset_index()
+    quarters, counts = quarter_counts(np.rint(np.asarray(mtext_df['Chairs'], dtype=np.float64) * 4))
+    logger.info("%d chairs in %d heights on layer '%s'",
+                len(mtext_df), len(quarters), layer_name)
     
-    chairs_df.rename(columns={'index': 'h_chair [in]'}, inplace=True)
+    chairs_df = pd.DataFrame({'h_chair [in]': quarters / 4, 'count': counts})
+    logger.debug("Counts for 'chairs':\n%s", chairs_df)
     
-    chairs_df['h_chairs_inches'] =chairs_df['h_chair [in]'].apply(convert_to_mixed_number)
+    chairs_df['h_chairs_inches'] = quarter_labels(quarters)
     
     # chairs_df.drop(['h_chair [in]'], axis = 1, inplace = True)
     
     # chairs_df.rename(columns={'h_chairs_inches': 'h_chair [in]'}, inplace=True)
-    
-    # Save the chairs and count in an excel file
-    
-    Excel_file = dxf_file_path.split(".")[0] + ".xlsx"
-    
-    chairs_df.to_excel(Excel_file, sheet_name='Counts')
-    
-
-    return mtext_df , chairs_df
-
-
-
-
-
+    return chairs_df
 
 
+def count_chairs_by_layer(mtext_df):
+    """Chairs of each height on each layer of a multi-layer mtext_df
 
+    Same columns as count_chairs_by_region with 'layer' instead of 'region',
+    layers in extraction order and zero-height chairs left out.
+    """
+    import pandas as pd
+    
+    names = np.asarray(mtext_df['layer'], dtype=object)
+    layers = pd.Categorical(names, categories=pd.unique(names))
+    quarters = np.rint(mtext_df['Chairs'].to_numpy() * 4).astype(np.int64)
+    keep = quarters != 0
+    counts = (pd.DataFrame({'layer': layers[keep], 'quarters': quarters[keep]})
+              .groupby(['layer', 'quarters'], observed=True, sort=True).size())
+    heights = counts.index.get_level_values('quarters').to_numpy()
+    return pd.DataFrame({'layer': counts.index.get_level_values('layer').astype(object),
+                         'h_chair [in]': heights / 4,
+                         'count': counts.to_numpy(),
+                         'h_chairs_inches': quarter_labels(heights)})
 
 
+class ChairAnnotator:
+    """Chair labels of one layer kept live in a document for repeated z_offset runs
 
+    The document is parsed, scanned and stripped of the layer's chair MTEXT
+    once; the chair dataset (handle, position, CGS height) stays in memory as
+    a ChairTable.  The first annotate() creates the TEXT labels on
+    <layer>_chairs, later calls only recompute the bins and counts and patch
+    the text and colour of the labels whose height changed before writing
+    the DXF again.
 
+    source is a file path, DXF content in memory or a Drawing, which the
+    annotator then owns and modifies.
+    """
 
+    def __init__(self, source, selected_layer, profile=None):
+        if profile is None:
+            profile = StageProfiler()
+        self.layer_name = selected_layer
+        if is_drawing(source):
+            self.doc = source
+        else:
+            profile.begin('parse')
+            self.doc = read_dxf(source)
+        msp = self.doc.modelspace()
+        
+        profile.begin('scan')
+        scan = scan_layer(msp, selected_layer, source=self.doc.filename)
+        logger.info("Found %d MTEXT entities in layer '%s'", len(scan.mtext_handles), selected_layer)
+        
+        profile.begin('classify')
+        self.table = scan.chair_table()
+        log_label_rejects(selected_layer, self.table)
+        
+        # The chair MTEXT is replaced by the labels for good, rejects stay
+        profile.begin('delete')
+        delete_entities(msp, chair_mtext_handles(scan, self.table))
+        profile.end()
+        
+        self.labels = None    # TEXT entities in dataset order, made by the first annotate()
+        self.quarters = None  # chair height in 1/4" of the current labels
+        self.z_offset = None
 
+    def annotate(self, z_offset, output_dxf_name=None, schedule_output=None, profile=None,
+                 regions=None, schedule_format=None, export_chairs=False):
+        """Label the chairs for z_offset, write the DXF and schedule when given
 
+        regions (a mapping, see process_dxf) adds the per-region counts to the
+        schedule and the table, export_chairs the per-chair table.  Returns
+        the classified ChairTable and chairs_df.
+        """
+        if profile is None:
+            profile = StageProfiler()
+        profile.begin('classify')
+        mtext_df = self.table.classify(z_offset)
+        
+        profile.begin('annotate')
+        if self.labels is None:
+            new_layer_name = chair_layer_name(self.layer_name)
+            if new_layer_name not in self.doc.layers:
+                self.doc.layers.new(name=new_layer_name)
+            self.labels = []
+            add_chair_text(self.doc.modelspace(), new_layer_name,
+                           mtext_df['Chairs_Fraction'].to_numpy(),
+                           mtext_df['x'].to_numpy(),
+                           mtext_df['y'].to_numpy(),
+                           mtext_df['z'].to_numpy(),
+                           mtext_df['trueColor'].to_numpy(),
+                           created=self.labels)
+            logger.info("Created %d text entities", len(self.labels))
+        else:
+            # Only the labels that moved to another 1/4" bin change
+            changed = np.flatnonzero(mtext_df.quarters != self.quarters)
+            labels = mtext_df['Chairs_Fraction'].to_numpy()
+            true_colors = mtext_df['trueColor'].to_numpy()
+            for i in changed.tolist():
+                label = self.labels[i]
+                label.dxf.text = str(labels[i])
+                label.dxf.true_color = int(true_colors[i])
+            logger.info("Patched %d of %d text entities for z_offset %s",
+                        len(changed), len(self.labels), z_offset)
+        self.quarters = mtext_df.quarters
+        self.z_offset = z_offset
+        
+        if output_dxf_name is not None:
+            profile.begin('save')
+            write_dxf(self.doc, output_dxf_name)
+        
+        profile.begin('counts')
+        chairs_df = count_chairs(mtext_df, self.layer_name)
+        mtext_df.regions = region_counts(mtext_df, regions, profile)
+        
+        if schedule_output is not None:
+            profile.begin('export')
+            save_chair_counts(chairs_df, schedule_output, mtext_df.regions,
+                              chair_df=chair_rows(mtext_df) if export_chairs else None,
+                              schedule_format=schedule_format, reject_df=label_rejects(mtext_df))
+        profile.end()
+        return mtext_df, chairs_df
 
 
+def main(argv=None):
+    """Command line: process one DXF file, optionally printing the stage profile"""
+    import argparse
+    import json
+    
+    parser = argparse.ArgumentParser(description="Extract PT chair heights and counts from a DXF file")
+    parser.add_argument('dxf_file_path')
+    parser.add_argument('selected_layer', help="layer name or pattern such as 'PT*'")
+    parser.add_argument('z_offset', type=float, nargs='?', default=0.0)
+    parser.add_argument('output_dxf_name', nargs='?', default='modified_output.dxf')
+    parser.add_argument('--layer', action='append', default=[], metavar='LAYER',
+                        help="another layer (or pattern) to extract in the same pass, may repeat")
+    parser.add_argument('--stream', action='store_true', help="low-memory read-only mode")
+    parser.add_argument('--workers', type=int, metavar='N',
+                        help="scan the ENTITIES section in N processes (with --stream)")
+    parser.add_argument('--fast-save', action='store_true',
+                        help="copy the input file and splice in the edits instead of saving the whole drawing")
+    parser.add_argument('--regions', metavar='LAYER',
+                        help="also count chairs per closed polyline region of LAYER")
+    parser.add_argument('--schedule', metavar='PATH',
+                        help="chair schedule file (default: next to the input file)")
+    parser.add_argument('--schedule-format', choices=sorted(EXPORTERS),
+                        help=f"schedule format (default: from the --schedule suffix, else {DEFAULT_FORMAT})")
+    parser.add_argument('--chair-table', action='store_true',
+                        help="add the per-chair table to the schedule")
+    parser.add_argument('--merge-radius', type=float, metavar='R',
+                        help="count chairs closer than R drawing units as one")
+    parser.add_argument('--merge-rule', choices=['max', 'min', 'first'], default='max',
+                        help="height kept for merged chairs (default: %(default)s)")
+    parser.add_argument('--profile-json', metavar='PATH', nargs='?', const='-',
+                        help="write the stage profile as JSON to PATH, or stdout without PATH")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="trace Python allocations per stage (slower)")
+    parser.add_argument('-v', '--verbose', action='count', default=0,
+                        help="-v lists every entity of the layer")
+    parser.add_argument('-q', '--quiet', action='store_true', help="warnings only")
+    args = parser.parse_args(argv)
+    
+    # log records go to stderr, stdout stays free for the JSON report
+    logging.basicConfig(format='%(message)s')
+    verbosity = 0 if args.quiet else 1 + args.verbose
+    
+    profile = StageProfiler(trace_memory=args.trace_memory)
+    selected_layer = [args.selected_layer] + args.layer if args.layer else args.selected_layer
+    process_dxf(args.dxf_file_path, selected_layer, args.z_offset,
+                args.output_dxf_name, stream=args.stream, profile=profile,
+                verbosity=verbosity, regions=args.regions, fast_save=args.fast_save,
+                schedule_output=args.schedule, schedule_format=args.schedule_format,
+                export_chairs=args.chair_table, workers=args.workers,
+                merge_radius=args.merge_radius, merge_rule=args.merge_rule)
+    if args.profile_json == '-':
+        print(json.dumps(profile.report(), indent=2))
+    elif args.profile_json:
+        with open(args.profile_json, 'w') as fp:
+            json.dump(profile.report(), fp, indent=2)
 
 
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,162 @@
+# -*- coding: utf-8 -*-
+"""
+Parallel read-only scan of the ENTITIES section of one DXF file.
+
+The section is cut into byte ranges at entity boundaries, a '0' group code
+line followed by the entity type, so every range holds whole entities.  The
+ranges are decoded and scanned in a process pool exactly like stream_layers()
+does in one process, and the LayerScans of the ranges are merged in file
+order: the MTEXT rows, handles and type counts are those of the sequential
+scan.
+
+A file path is only mapped in memory to find the cuts, each worker reads its
+own range from the file; in-memory content is sent to the workers range by
+range.  Binary DXF and sections below MIN_PARALLEL_BYTES are scanned in the
+calling process, where starting a pool costs more than it saves.
+"""
+
+import io
+import mmap
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from dxf_extraction import dxf_bytes, logger, scan_entity_tags, stream_layers
+from dxf_splice import BINARY_DXF_SENTINEL, ENDSEC_TAG, SECTION_TAG
+
+
+MIN_PARALLEL_BYTES = 4 * 2**20
+RANGES_PER_WORKER = 4  # a few ranges per worker even out the MTEXT density
+
+# Structure tags as in dxf_splice: a "0" group code line and a name that starts
+# with a letter, which a value line reading "0" can never be followed by
+_ENTITIES = re.compile(SECTION_TAG % b'ENTITIES')
+_ENTITY_START = re.compile(rb'\n[ \t]*0\r?\n[A-Za-z_]')
+
+
+def _find_tag(buf, pattern, marker, start):
+    """First match of pattern after start, the candidates located with find()
+
+    bytes.find() skips through the buffer much faster than a regex search
+    that has to try every newline.
+    """
+    pos = start
+    while True:
+        i = buf.find(marker, pos)
+        if i < 0:
+            return None
+        m = pattern.search(buf, max(start, i - 64), i + len(marker) + 2)
+        if m is not None:
+            return m
+        pos = i + 1
+
+
+def entity_ranges(buf, parts):
+    """(start, end) byte ranges of the ENTITIES section body cut into at most
+    parts ranges of whole entities; None without an ENTITIES section"""
+    header = _find_tag(buf, _ENTITIES, b'\nENTITIES', 0)
+    if header is None:
+        return None
+    start = header.end()
+    # from the newline ending the header, so an empty section matches too
+    endsec = _find_tag(buf, ENDSEC_TAG, b'\nENDSEC', start - 1)
+    if endsec is None:
+        return None
+    end = endsec.start() + 1
+    cuts = [start]
+    step = (end - start) // max(parts, 1)
+    for i in range(1, parts):
+        m = _ENTITY_START.search(buf, max(cuts[-1], start + i * step), end)
+        if m is None:
+            break
+        if m.start() + 1 > cuts[-1]:
+            cuts.append(m.start() + 1)
+    cuts.append(end)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+
+def _file_ranges(path, parts):
+    """entity_ranges of a file, found through a read-only memory map"""
+    with open(path, 'rb') as fp:
+        if os.fstat(fp.fileno()).st_size == 0:
+            return None
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if buf[:len(BINARY_DXF_SENTINEL)] == BINARY_DXF_SENTINEL:
+                return None
+            return entity_ranges(buf, parts)
+
+
+def _encoding(path, data):
+    """Text encoding of the DXF file, detected from the header like open_dxf_text()"""
+    from ezdxf.filemanagement import dxf_file_info, dxf_stream_info
+
+    if data is None:
+        return dxf_file_info(str(path)).encoding
+    return dxf_stream_info(io.TextIOWrapper(io.BytesIO(data), encoding='utf-8', errors='ignore')).encoding
+
+
+def _group_entities(tags):
+    """Raw tags of each entity, split at the '0' tags like iter_entity_tags()"""
+    entity = []
+    for tag in tags:
+        if tag.code == 0 and entity:
+            yield entity
+            entity = []
+        entity.append(tag)
+    if entity:
+        yield entity
+
+
+def _scan_range(chunk, path, start, end, encoding, selection, keep_entities):
+    """Worker: LayerScans of the entities of one range
+
+    chunk is the content of the range, or None to read it from the file.
+    """
+    from ezdxf.lldxf.tagger import ascii_tags_loader
+
+    if chunk is None:
+        with open(path, 'rb') as fp:
+            fp.seek(start)
+            chunk = fp.read(end - start)
+    fp = io.TextIOWrapper(io.BytesIO(chunk), encoding=encoding, errors='surrogateescape')
+    return scan_entity_tags(_group_entities(ascii_tags_loader(fp)), selection, path, keep_entities)
+
+
+def parallel_stream_layers(dxf_file_path, selection, workers=None, keep_entities=False,
+                           min_bytes=MIN_PARALLEL_BYTES):
+    """stream_layers() with the ENTITIES section scanned by workers processes
+
+    workers defaults to the number of CPUs.  Returns the same dict of layer
+    name -> LayerScan as the sequential scan.
+    """
+    workers = workers or os.cpu_count() or 1
+    data = dxf_bytes(dxf_file_path)
+    path = dxf_file_path if data is None else None  # in memory, no path
+    ranges = None
+    if workers > 1:
+        if data is None:
+            ranges = _file_ranges(path, workers * RANGES_PER_WORKER)
+        elif not data.startswith(BINARY_DXF_SENTINEL):
+            ranges = entity_ranges(data, workers * RANGES_PER_WORKER)
+    size = ranges[-1][1] - ranges[0][0] if ranges else 0
+    if size < min_bytes:
+        return stream_layers(dxf_file_path if data is None else data, selection, keep_entities)
+
+    encoding = _encoding(path, data)
+    with ProcessPoolExecutor(max_workers=min(workers, len(ranges))) as pool:
+        futures = [pool.submit(_scan_range, None if data is None else data[start:end], path,
+                               start, end, encoding, selection, keep_entities)
+                   for start, end in ranges]
+        parts = [future.result() for future in futures]
+    logger.info("Scanned %.1f MB of entities in %d ranges on %d processes",
+                size / 2**20, len(ranges), min(workers, len(ranges)))
+
+    # the ranges are in file order, so are the rows of each layer
+    scans = {}
+    for part in parts:
+        for name, scan in part.items():
+            if name in scans:
+                scans[name].extend(scan)
+            else:
+                scans[name] = scan
+    return selection.ordered(scans)
@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Fast-path DXF output: splice the chair layer edits into the original bytes.
+
+The extraction only removes MTEXT entities and adds TEXT labels on new
+<layer>_chairs layers, so instead of serialising the whole drawing again with
+saveas() the original file is copied byte for byte with four edits:
+
+- $HANDSEED in the HEADER gets the next free handle after the new entities
+- each new layer is added to the LAYER table with the tags ezdxf writes for
+  it on a full save, so both outputs get the same visible, unlocked layer
+- the deleted entities are cut out of the ENTITIES section
+- the new TEXT labels are appended before its ENDSEC, formatted straight
+  from the chair columns with the tags ezdxf writes for a TEXT entity
+
+Only ASCII DXF R2000 or newer is spliced, where every modelspace entity
+starts with its type and handle, and only entities without an extension
+dictionary or reactors are cut, so nothing in OBJECTS refers to them.
+Anything unexpected raises SpliceError before a single byte is written, so
+the caller can fall back to saveas().
+"""
+
+import io
+import re
+
+
+class SpliceError(ValueError):
+    """The file layout does not allow a spliced save"""
+
+
+# A structure tag is a "0" group code line followed by the type name; the type
+# starts with a letter, so a value line reading "0" can never match.  The
+# section tags are also used by dxf_parallel: SECTION_TAG % b'ENTITIES' is the
+# pattern of the start of that section
+SECTION_TAG = rb'\n[ \t]*0\r?\nSECTION\r?\n[ \t]*2\r?\n%s\r?\n'
+ENDSEC_TAG = re.compile(rb'\n[ \t]*0\r?\nENDSEC\r?\n')
+_ENTITY = re.compile(rb'\n[ \t]*0\r?\n[A-Za-z_][A-Za-z0-9_]*\r?\n(?:[ \t]*5\r?\n([0-9A-Fa-f]+)\r?\n)?')
+_HANDSEED = re.compile(rb'\n[ \t]*9\r?\n\$HANDSEED\r?\n[ \t]*5\r?\n([0-9A-Fa-f]+)\r?\n')
+_LAYER_TABLE = re.compile(rb'\n[ \t]*0\r?\nTABLE\r?\n[ \t]*2\r?\nLAYER\r?\n')
+_ENDTAB = re.compile(rb'\n[ \t]*0\r?\nENDTAB\r?\n')
+_OWNED_GROUPS = (b'{ACAD_XDICTIONARY', b'{ACAD_REACTORS')
+_LAYER_REFERENCES = ('330', '390', '347')  # owner, plot style and material handles
+
+BINARY_DXF_SENTINEL = b"AutoCAD Binary DXF\r\n\x1a\x00"
+
+
+def section_span(data, name):
+    """(start, end) of the body of section name: after its '2 <name>' tag up
+    to the '0' line of its ENDSEC"""
+    # the leading newline lets the first section of the file match too
+    m = re.compile(SECTION_TAG % name).search(b'\n' + data)
+    if m is None:
+        raise SpliceError(f"no {name.decode()} section")
+    start = m.end() - 1
+    end = ENDSEC_TAG.search(data, start - 1)
+    if end is None:
+        raise SpliceError(f"{name.decode()} section not closed")
+    return start, end.start() + 1
+
+
+def _lines(data, start, end):
+    """Lines of data[start:end] as [offset, raw line without the newline]"""
+    lines = []
+    pos = start
+    while pos < end:
+        eol = data.index(b'\n', pos)
+        lines.append((pos, data[pos:eol]))
+        pos = eol + 1
+    return lines
+
+
+def _tag_pairs(lines):
+    """Group (offset, line) lines into (code, value line, offset of the value) tags"""
+    return [(int(lines[i][1]), lines[i + 1][1], lines[i + 1][0]) for i in range(0, len(lines) - 1, 2)]
+
+
+def _layer_record(layer, eol, encoding, seed):
+    """Raw tags of a new ezdxf Layer, exactly as saveas() would write them
+
+    The owner, plot style and material handles it refers to must be objects
+    of the file, not ones ezdxf only created when loading it (those get
+    handles from the file's seed up).
+    """
+    from ezdxf.lldxf.tagwriter import TagWriter
+
+    stream = io.StringIO()
+    layer.export_dxf(TagWriter(stream, write_handles=True, dxfversion=layer.doc.dxfversion))
+    text = stream.getvalue()
+    lines = text.split('\n')
+    for code, value in zip(lines[0::2], lines[1::2]):
+        if code.strip() in _LAYER_REFERENCES and int(value, 16) >= seed:
+            raise SpliceError(f"layer '{layer.dxf.name}' refers to object #{value} not in the file")
+    return text.encode(encoding, errors='dxfreplace').replace(b'\n', eol)
+
+
+def _layer_edits(data, new_layers, eol, encoding, seed):
+    """Edits adding the new layers (ezdxf Layer entities) to the LAYER table"""
+    m = _LAYER_TABLE.search(data)
+    if m is None:
+        raise SpliceError("no LAYER table")
+    end = _ENDTAB.search(data, m.end() - 1)
+    if end is None:
+        raise SpliceError("LAYER table not closed")
+    endtab = end.start() + 1
+    tags = _tag_pairs(_lines(data, m.end(), endtab))
+
+    # table header tags, then the name of each '0 LAYER' record
+    header = []
+    names = set()
+    in_record = False
+    for tag in tags:
+        code, value = tag[0], tag[1]
+        if code == 0:
+            in_record = True
+        elif not in_record:
+            header.append(tag)
+        elif code == 2:
+            names.add(value.strip().decode(encoding, 'replace').casefold())
+
+    edits = []
+    added = 0
+    for layer in new_layers:
+        name = layer.dxf.name
+        if name.casefold() in names:
+            continue
+        edits.append((endtab, endtab, _layer_record(layer, eol, encoding, seed)))
+        names.add(name.casefold())
+        added += 1
+    count = [tag for tag in header if tag[0] == 70]
+    if added and count:
+        _, value, offset = count[0]
+        edits.append((offset, offset + len(value.rstrip(b'\r')),
+                      b'%6d' % (int(value) + added)))
+    return edits
+
+
+def _cut(data, start, end):
+    """Edit cutting the entity data[start:end], which must not be linked to objects
+
+    An extension dictionary and the objects it owns, or the objects naming
+    the entity as reactor (e.g. a GROUP), live in the OBJECTS section and
+    would be left pointing at a deleted entity.
+    """
+    for group in _OWNED_GROUPS:
+        if data.find(group, start, end) >= 0:
+            raise SpliceError(f"deleted entity has a {group.decode()} group")
+    return start, end, b''
+
+
+def _entity_edits(data, start, end, deleted):
+    """Edits cutting the entities with a handle in deleted out of data[start:end]"""
+    edits = []
+    cut_from = None
+    found = 0
+    # the newline before the body lets the first entity match
+    for m in _ENTITY.finditer(data, start - 1, end):
+        entity_start = m.start() + 1
+        if cut_from is not None:
+            edits.append(_cut(data, cut_from, entity_start))
+            cut_from = None
+        handle = m.group(1)
+        if handle is not None and handle.upper() in deleted:
+            cut_from = entity_start
+            found += 1
+    if cut_from is not None:
+        edits.append(_cut(data, cut_from, end))
+    if found != len(deleted):
+        raise SpliceError(f"{len(deleted) - found} deleted entities not found by handle")
+    return edits
+
+
+def text_entity_tags(handles, owner, layer, texts, x, y, z, true_color,
+                     height=0.100, style='STANDARD', dxfversion='AC1032'):
+    """DXF text of one TEXT entity per chair, tag for tag as ezdxf exports it
+
+    Formatting the shared layout once is far cheaper than building ezdxf
+    entities and exporting them one by one.  The true colour (420) needs DXF
+    R2004 or newer, like in ezdxf.
+    """
+    owner, layer, style = (name.replace('%', '%%') for name in (owner, layer, style))
+    color = '420\n%d\n' if dxfversion >= 'AC1018' else ''
+    head = '  0\nTEXT\n  5\n%s\n330\n' + owner + '\n100\nAcDbEntity\n  8\n' + layer + '\n'
+    body = ('100\nAcDbText\n 10\n%r\n 20\n%r\n 30\n%r\n 40\n' + repr(float(height))
+            + '\n  1\n%s\n  7\n' + style + '\n100\nAcDbText\n')
+    template = head + color + body
+    if color:
+        rows = zip(handles, true_color.tolist(), x.tolist(), y.tolist(), z.tolist(), map(str, texts))
+    else:
+        rows = zip(handles, x.tolist(), y.tolist(), z.tolist(), map(str, texts))
+    return ''.join([template % row for row in rows])
+
+
+def splice_dxf(data, target, doc, deleted_handles, entities_text, new_layers=()):
+    """Write data with the chair layer edits spliced in
+
+    data is the content of the file doc was loaded from, target a file path
+    or a binary stream.  deleted_handles are the entities to remove from the
+    modelspace, entities_text the DXF text of the entities to add to it (see
+    text_entity_tags) and new_layers the ezdxf Layer entities created for
+    them.  doc gives the DXF version, the encoding and the
+    next free handle.
+    """
+    if data.startswith(BINARY_DXF_SENTINEL):
+        raise SpliceError("binary DXF")
+    if doc.loaded_dxfversion < 'AC1015' or doc.dxfversion != doc.loaded_dxfversion:
+        raise SpliceError(f"DXF version {doc.loaded_dxfversion} is saved as {doc.dxfversion}")
+    eol = b'\r\n' if data[:data.index(b'\n')].endswith(b'\r') else b'\n'
+    encoding = doc.output_encoding
+
+    edits = []
+    # next free handle, never below the seed the file already had
+    header_start, header_end = section_span(data, b'HEADER')
+    m = _HANDSEED.search(data, header_start - 1, header_end)
+    if m is None:
+        raise SpliceError("no $HANDSEED")
+    file_seed = int(m.group(1), 16)
+    seed = max(file_seed, int(str(doc.entitydb.handles), 16))
+    edits.append((m.start(1), m.end(1), b'%X' % seed))
+
+    edits += _layer_edits(data, new_layers, eol, encoding, file_seed)
+
+    entities_start, entities_end = section_span(data, b'ENTITIES')
+    deleted = {handle.upper().encode('ascii') for handle in deleted_handles}
+    edits += _entity_edits(data, entities_start, entities_end, deleted)
+    edits.append((entities_end, entities_end,
+                  entities_text.encode(encoding, errors='dxfreplace').replace(b'\n', eol)))
+
+    # everything checked, now copy the unchanged bytes around the edits
+    edits.sort(key=lambda edit: (edit[0], edit[1]))
+    view = memoryview(data)
+    fp = target if hasattr(target, 'write') else open(target, 'wb')
+    try:
+        pos = 0
+        for start, end, replacement in edits:
+            fp.write(view[pos:start])
+            fp.write(replacement)
+            pos = end
+        fp.write(view[pos:])
+    finally:
+        if fp is not target:
+            fp.close()
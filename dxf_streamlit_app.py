@@ -1,80 +1,147 @@
 import streamlit as st
-import pandas as pd
-import subprocess
-import sys
 import os
-from pathlib import Path
-import tempfile
 import dxf_extraction
-from dxf_extraction import process_dxf
-
-# Try to import ezdxf for layer extraction
-try:
-    import ezdxf
-    EZDXF_AVAILABLE = True
-except ImportError:
-    EZDXF_AVAILABLE = False
+from result_cache import ResultCache, content_sha256
+from chair_table import COMPACT_COLUMNS, ChairTable
+from extraction_jobs import CANCELLED, DONE, FINISHED, QUEUED, JobManager
+
+# ezdxf is looked up once per server process and only imported to read a file
+EZDXF_AVAILABLE = dxf_extraction.EZDXF_AVAILABLE
+if not EZDXF_AVAILABLE:
     st.error("ezdxf library not found. Please install it with: pip install ezdxf")
 
-def get_dxf_layers(dxf_file_path):
-    """Extract layer names from DXF file"""
+# Extractions running at the same time over all sessions, further jobs queue
+EXTRACTION_WORKERS = int(os.environ.get('DXF_EXTRACTION_WORKERS', 2))
+JOB_POLL_SECONDS = 1.0
+
+@st.cache_data(show_spinner="Reading layers...")
+def get_dxf_layers(upload_hash, _upload_bytes):
+    """Extract layer names and their MTEXT count from DXF file
+
+    Memoized per upload hash, so widget changes do not re-read the file.
+    Only the LAYER table and the raw ENTITIES tags are read, the drawing
+    itself is not loaded.
+    """
     if not EZDXF_AVAILABLE:
         return []
     
     try:
-        doc = ezdxf.readfile(dxf_file_path)
-        layers = [layer.dxf.name for layer in doc.layers]
-        return layers
+        return dxf_extraction.read_layer_summary(_upload_bytes)
     except Exception as e:
         st.error(f"Error reading DXF file: {str(e)}")
         return []
 
-def run_dxf_extraction(dxf_file_path, selected_layer, z_offset, output_dxf_name):
-    """Execute the dxf_extraction.py script and return the dataframes"""
-    try:
-        # Check if dxf_extraction.py exists
-        if not os.path.exists("dxf_extraction.py"):
-            st.error("dxf_extraction.py file not found in the current directory")
-            return None, None, None
-        
-        # Import the extraction module
-        sys.path.append(os.getcwd())
-        
-        # Try to import and run the extraction
-        try:
-            import dxf_extraction
-            # Assuming the extraction module has a main function that accepts parameters
-            # You may need to modify this based on your actual dxf_extraction.py structure
-            if hasattr(dxf_extraction, 'process_dxf'):
-                mtext_df, chairs_df = dxf_extraction.process_dxf(dxf_file_path, selected_layer, z_offset, output_dxf_name)
-            else:
-                # Alternative: run as subprocess if no direct function available
-                result = subprocess.run([
-                    sys.executable, "dxf_extraction.py", 
-                    dxf_file_path, selected_layer, str(z_offset), output_dxf_name
-                ], capture_output=True, text=True)
-                
-                if result.returncode != 0:
-                    st.error(f"Error running extraction: {result.stderr}")
-                    return None, None, None
-                
-                # This would require the script to save results to files
-                # and then load them back - adjust based on your implementation
-                mtext_df = pd.DataFrame()  # Load from saved file
-                chairs_df = pd.DataFrame()  # Load from saved file
-                
-        except Exception as e:
-            st.error(f"Error importing or running dxf_extraction: {str(e)}")
-            return None, None, None
-            
-        # Check if the output DXF file was created
-        output_dxf_path = output_dxf_name if os.path.exists(output_dxf_name) else None
-        
-        return mtext_df, chairs_df, output_dxf_path
-        
-    except Exception as e:
-        st.error(f"Error in extraction process: {str(e)}")
-        return None, None, None
+@st.cache_resource
+def get_result_cache():
+    """Disk-backed cache of extraction results shared by all sessions"""
+    return ResultCache()
+
+@st.cache_resource
+def get_job_manager():
+    """Worker pool running the extractions of all sessions in the background"""
+    return JobManager(max_workers=EXTRACTION_WORKERS)
+
+def get_parsed_upload(upload_hash):
+    """Parsed upload kept in the session, so each Execute skips the parse step
+
+    The dict is filled by the extraction job: the full mode keeps a
+    ChairAnnotator of the layer, so a new z_offset only re-labels the chairs,
+    the read-only mode the streamed scan of the layer.  Only the current
+    upload is kept.
+    """
+    parsed = st.session_state.get('parsed_upload')
+    if parsed is None or parsed['hash'] != upload_hash:
+        parsed = {'hash': upload_hash}
+        st.session_state['parsed_upload'] = parsed
+    return parsed
+
+def parsed_source(parsed, upload_bytes, selected_layer, stream, profile=None):
+    """Document or layer scan of the upload, parsed from memory on first use"""
+    key = ('scan' if stream else 'chairs', selected_layer)
+    if key not in parsed:
+        if stream:
+            if profile is not None:
+                profile.begin('stream')
+            parsed[key] = dxf_extraction.stream_layer(upload_bytes, selected_layer)
+        else:
+            # One annotated document at a time, each holds a full drawing
+            for other in [k for k in parsed if k[0] == 'chairs']:
+                del parsed[other]
+            parsed[key] = dxf_extraction.ChairAnnotator(upload_bytes, selected_layer, profile)
+    return parsed[key]
+
+def run_dxf_extraction(job, upload_bytes, selected_layer, z_offset, stream=False, upload_hash=None, parsed=None,
+                       result_cache=None, region_layer=None):
+    """Run process_dxf on the upload and return the dataframes and output files
+
+    Runs as a background job: progress and cancellation go through
+    job.profile and errors are raised to the job instead of shown on the page.
+    The upload is processed in memory, the chairs come back as a compact
+    ChairTable and the modified DXF and the workbook as BytesIO buffers (no
+    DXF buffer in read-only mode).  With a region_layer the chairs are also
+    counted per closed polyline of that layer.
+    """
+    # Parse once per upload and layer, a new z_offset only re-labels the kept chairs.
+    # A result already in the cache is read from the upload without parsing it
+    source = upload_bytes
+    cached = (result_cache is not None and upload_hash is not None
+              and dxf_extraction.result_key(result_cache, upload_hash, selected_layer, z_offset,
+                                            stream=stream) in result_cache)
+    if parsed is not None and not cached:
+        source = parsed_source(parsed, upload_bytes, selected_layer, stream, job.profile)
+    regions = None
+    if region_layer:
+        job.profile.begin('regions')
+        boundary_source = source.doc if isinstance(source, dxf_extraction.ChairAnnotator) else upload_bytes
+        regions = dxf_extraction.read_boundary_regions(boundary_source, region_layer)
+    # Same upload and parameters are served from the result cache
+    mtext_df, chairs_df, dxf_buffer, xlsx_buffer = dxf_extraction.process_dxf_buffers(
+        source, selected_layer, z_offset, stream=stream, cache=result_cache, content_hash=upload_hash,
+        profile=job.profile, regions=regions, compact=True)
+    return mtext_df, chairs_df, dxf_buffer, xlsx_buffer, mtext_df.regions
+
+def collect_job(job):
+    """Move the results of a finished job into the session state"""
+    get_job_manager().pop(job.id)
+    del st.session_state['job_id']
+    if job.status == DONE:
+        mtext_df, chairs_df, dxf_buffer, xlsx_buffer, region_df = job.result
+        # Store results in session state
+        st.session_state['mtext_df'] = mtext_df  # ChairTable, display columns derived when shown
+        st.session_state['chairs_df'] = chairs_df
+        st.session_state['output_dxf'] = dxf_buffer.getvalue() if dxf_buffer is not None else None
+        st.session_state['output_xlsx'] = xlsx_buffer.getvalue()
+        st.session_state['region_df'] = region_df
+        st.session_state['output_dxf_name'] = job.label
+        st.session_state['profile'] = job.profile
+        st.session_state['job_message'] = ('success', f"Extraction completed successfully in {job.elapsed:.1f} s!")
+    elif job.status == CANCELLED:
+        st.session_state['job_message'] = ('warning', "Extraction cancelled.")
+    else:
+        st.session_state['job_message'] = ('error', f"Extraction failed: {job.error}")
+
+def current_job():
+    job_id = st.session_state.get('job_id')
+    return get_job_manager().get(job_id) if job_id else None
+
+@st.fragment(run_every=JOB_POLL_SECONDS if current_job() is not None else None)
+def show_job_progress():
+    """Progress of the session's extraction job, polled while it runs"""
+    job = current_job()
+    if job is None:
+        if 'job_id' in st.session_state:  # server restarted, the job is gone
+            del st.session_state['job_id']
+        kind, message = st.session_state.pop('job_message', (None, None))
+        if kind is not None:
+            getattr(st, kind)(message)
+        return
+    if job.status in FINISHED:
+        collect_job(job)
+        st.rerun()
+    stage = job.stage or ('waiting for a free worker' if job.status == QUEUED else 'starting')
+    st.progress(job.progress, text=f"Processing DXF file... {stage} ({job.elapsed:.0f} s)")
+    if st.button("Cancel", disabled=job.cancel_requested.is_set()):
+        job.cancel()
 
 # Streamlit App Layout
 st.set_page_config(page_title="Post-tensioned Cable chairs extractor from DXF files ", layout="wide")
@@ -92,17 +159,23 @@ with col1:
     uploaded_file = st.file_uploader("Choose a DXF file", type=['dxf'])
     
     if uploaded_file is not None:
-        # Save uploaded file temporarily
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.dxf') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
+        # Keep the uploaded bytes in memory, hashed once per upload
+        if st.session_state.get('upload_id') != uploaded_file.file_id:
+            upload_bytes = uploaded_file.getvalue()
+            st.session_state['upload_id'] = uploaded_file.file_id
+            st.session_state['upload_hash'] = content_sha256(upload_bytes)
+            st.session_state['upload_bytes'] = upload_bytes
+        upload_bytes = st.session_state['upload_bytes']
         
         # Layer selection section
         st.subheader("Select Layer from File")
-        layers = get_dxf_layers(tmp_file_path)
+        layer_summary = get_dxf_layers(st.session_state['upload_hash'], upload_bytes)
         
-        if layers:
-            selected_layer = st.selectbox("Available Layers:", layers)
+        if layer_summary:
+            # Show the MTEXT count so the chair layer is easy to spot
+            mtext_counts = dict(layer_summary)
+            selected_layer = st.selectbox("Available Layers:", list(mtext_counts),
+                                          format_func=lambda name: f"{name} ({mtext_counts[name]} MTEXT)")
             
             # Z-offset input
             st.subheader("Z Offset (Distance between CG of tendon and chair height in inches)")
@@ -114,20 +187,29 @@ with col1:
                                            value="modified_output.dxf",
                                            help="This will be the name of the processed DXF file")
             
-            # Execute button
-            if st.button("Execute Chair Heights and Count Extraction", type="primary"):
-                with st.spinner("Processing DXF file..."):
-                    mtext_df, chairs_df, output_dxf_path = run_dxf_extraction(tmp_file_path, selected_layer, z_offset, output_dxf_name)
-                    
-                    if mtext_df is not None and chairs_df is not None:
-                        # Store results in session state
-                        st.session_state['mtext_df'] = mtext_df
-                        st.session_state['chairs_df'] = chairs_df
-                        st.session_state['output_dxf_path'] = output_dxf_path
-                        st.session_state['output_dxf_name'] = output_dxf_name
-                        st.success("Extraction completed successfully!")
-                    else:
-                        st.error("Extraction failed. Please check the error messages above.")
+            # Low-memory mode for very large files
+            stream_mode = st.checkbox("Low-memory read-only mode",
+                                      value=False,
+                                      help="Stream the DXF entities instead of loading the whole drawing. "
+                                           "Chair tables are extracted but no modified DXF file is written.")
+            
+            # Optional per-region counts, regions are the closed polylines of a boundary layer
+            region_layer = st.selectbox("Count chairs by region (boundary layer):",
+                                        ["(none)"] + [name for name in mtext_counts if name != selected_layer],
+                                        help="Closed polylines of this layer (pour strips, bays...) are the regions, "
+                                             "a text inside a region names it.")
+            region_layer = None if region_layer == "(none)" else region_layer
+            
+            # Execute button, the extraction runs in the background and the page polls it
+            if st.button("Execute Chair Heights and Count Extraction", type="primary",
+                         disabled=current_job() is not None):
+                st.session_state['job_id'] = get_job_manager().submit(
+                    run_dxf_extraction, upload_bytes, selected_layer, z_offset,
+                    stream=stream_mode, upload_hash=st.session_state['upload_hash'],
+                    parsed=get_parsed_upload(st.session_state['upload_hash']),
+                    result_cache=get_result_cache(), region_layer=region_layer, label=output_dxf_name)
+                st.rerun()
+            show_job_progress()
         else:
             st.warning("No layers found in the DXF file or file could not be read.")
 
@@ -137,7 +219,13 @@ with col2:
     # Upper right: Show mtext_df
     st.subheader("MText Data")
     if 'mtext_df' in st.session_state and not st.session_state['mtext_df'].empty:
-        st.dataframe(st.session_state['mtext_df'], use_container_width=False, height=300)
+        mtext_df = st.session_state['mtext_df']
+        if isinstance(mtext_df, ChairTable):
+            # Only the shown columns are built, labels stay dictionary-encoded for the browser
+            show_colors = st.checkbox("Show colour columns", value=False)
+            columns = COMPACT_COLUMNS + (['chairHexColor', 'trueColor'] if show_colors else [])
+            mtext_df = mtext_df.to_frame(columns, compact=True)
+        st.dataframe(mtext_df, use_container_width=False, height=300)
     else:
         st.info("MText data will appear here after extraction")
     
@@ -148,28 +236,44 @@ with col2:
     else:
         st.info("Chairs data will appear here after extraction")
     
+    # Chairs per region when a boundary layer was chosen
+    if st.session_state.get('region_df') is not None:
+        st.subheader("Chairs per Region")
+        st.dataframe(st.session_state['region_df'], use_container_width=False, height=300, hide_index=True)
+    
+    # Time and memory of each pipeline stage of the last run
+    if 'profile' in st.session_state:
+        profile = st.session_state['profile']
+        with st.expander(f"Pipeline profile ({profile.total():.2f} s)", expanded=False):
+            st.dataframe(profile.to_frame(), use_container_width=True, hide_index=True)
+            st.json(profile.report(), expanded=False)
+    
     # Modified DXF file section
     st.subheader("Modified DXF File")
-    if 'output_dxf_path' in st.session_state and st.session_state['output_dxf_path']:
+    if st.session_state.get('output_dxf'):
         st.success(f"✅ Modified DXF file created: {st.session_state['output_dxf_name']}")
         
-        # Download button for the modified DXF file
-        if os.path.exists(st.session_state['output_dxf_path']):
-            with open(st.session_state['output_dxf_path'], 'rb') as file:
-                st.download_button(
-                    label="📥 Download Modified DXF",
-                    data=file.read(),
-                    file_name=st.session_state['output_dxf_name'],
-                    mime="application/octet-stream"
-                )
+        # Download button for the modified DXF file, served from memory
+        st.download_button(
+            label="📥 Download Modified DXF",
+            data=st.session_state['output_dxf'],
+            file_name=st.session_state['output_dxf_name'],
+            mime="application/octet-stream"
+        )
         
         # Display file info
-        if os.path.exists(st.session_state['output_dxf_path']):
-            file_size = os.path.getsize(st.session_state['output_dxf_path'])
-            st.text(f"File size: {file_size:,} bytes")
-            st.text(f"Path: {st.session_state['output_dxf_path']}")
+        st.text(f"File size: {len(st.session_state['output_dxf']):,} bytes")
     else:
         st.info("Modified DXF file will appear here after extraction")
+    
+    # Chair count workbook of the last run
+    if st.session_state.get('output_xlsx'):
+        st.download_button(
+            label="📥 Download Chair Counts (Excel)",
+            data=st.session_state['output_xlsx'],
+            file_name=os.path.splitext(st.session_state['output_dxf_name'])[0] + '.xlsx',
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
 
 # Sidebar with additional information
 st.sidebar.header("Instructions")
@@ -0,0 +1,151 @@
+# -*- coding: utf-8 -*-
+"""
+Background execution of chair extractions for the Streamlit app.
+
+A JobManager runs submitted extractions on a bounded thread pool and hands
+back a job id at once, so the page stays responsive and several sessions
+can process files side by side.  Each job reports the pipeline stage it is
+in through its StageProfiler, can be cancelled, and keeps its result (or
+error) until the page collects it.  Finished jobs nobody collected, e.g.
+of a closed browser tab, are dropped result_ttl seconds after they end.
+"""
+
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from pipeline_profile import StageProfiler
+
+
+DEFAULT_MAX_WORKERS = 2
+DEFAULT_RESULT_TTL = 3600  # seconds a finished job waits to be collected
+
+# Stages in pipeline order, used to turn the current stage into a progress fraction
+PIPELINE_STAGES = ('regions', 'cache_lookup', 'parse', 'stream', 'scan', 'report', 'classify',
+                   'merge', 'delete', 'annotate', 'save', 'counts', 'region_counts', 'export',
+                   'cache_store')
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = 'queued', 'running', 'done', 'failed', 'cancelled'
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobCancelled(Exception):
+    """Raised inside a job at the next stage boundary after cancel()"""
+
+
+class JobProfiler(StageProfiler):
+    """StageProfiler that publishes the current stage and honours cancellation"""
+
+    def __init__(self, job, trace_memory=False):
+        super().__init__(trace_memory=trace_memory)
+        self.job = job
+
+    def begin(self, name):
+        if self.job.cancel_requested.is_set():
+            self.end()
+            raise JobCancelled(self.job.id)
+        super().begin(name)
+        self.job.stage = name
+
+
+class Job:
+    """State of one submitted extraction"""
+
+    def __init__(self, label=''):
+        self.id = uuid.uuid4().hex[:12]
+        self.label = label
+        self.status = QUEUED
+        self.stage = None
+        self.result = None
+        self.error = None
+        self.submitted = time.time()
+        self.finished = None
+        self.cancel_requested = threading.Event()
+        self.profile = JobProfiler(self)
+        self.future = None
+
+    @property
+    def progress(self):
+        """Fraction of the pipeline stages passed, 1.0 once finished"""
+        if self.status in FINISHED:
+            return 1.0
+        if self.stage not in PIPELINE_STAGES:
+            return 0.0
+        return PIPELINE_STAGES.index(self.stage) / len(PIPELINE_STAGES)
+
+    @property
+    def elapsed(self):
+        return (self.finished or time.time()) - self.submitted
+
+    def cancel(self):
+        """Drop the job if still queued, else stop it at the next stage boundary"""
+        self.cancel_requested.set()
+        if self.future is not None and self.future.cancel():
+            self.status = CANCELLED
+            self.finished = time.time()
+
+
+class JobManager:
+    """Bounded worker pool running extraction jobs, shared by all sessions"""
+
+    def __init__(self, max_workers=DEFAULT_MAX_WORKERS, result_ttl=DEFAULT_RESULT_TTL):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix='dxf-extraction')
+        self.result_ttl = result_ttl
+        self.jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, fn, *args, label='', **kwargs):
+        """Queue fn(job, *args, **kwargs) and return the job id
+
+        fn receives the Job so it can hand job.profile to process_dxf; its
+        return value becomes job.result.
+        """
+        job = Job(label)
+        self.prune()
+        with self._lock:
+            self.jobs[job.id] = job
+        job.future = self.executor.submit(self._run, job, fn, args, kwargs)
+        return job.id
+
+    def _run(self, job, fn, args, kwargs):
+        job.status = RUNNING
+        try:
+            job.result = fn(job, *args, **kwargs)
+            job.status = DONE
+        except JobCancelled:
+            job.status = CANCELLED
+        except Exception as e:
+            job.error = f"{type(e).__name__}: {e}"
+            job.status = FAILED
+        finally:
+            job.profile.end()
+            job.finished = time.time()
+
+    def get(self, job_id):
+        return self.jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.jobs.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def pop(self, job_id):
+        """Forget a finished job once its result has been collected"""
+        with self._lock:
+            return self.jobs.pop(job_id, None)
+
+    def prune(self):
+        """Forget the jobs finished more than result_ttl seconds ago, returns how many"""
+        expired = time.time() - self.result_ttl
+        with self._lock:
+            stale = [job_id for job_id, job in self.jobs.items()
+                     if job.finished is not None and job.finished < expired]
+            for job_id in stale:
+                del self.jobs[job_id]
+        return len(stale)
+
+    def active(self):
+        """Number of queued or running jobs over all sessions"""
+        return sum(job.status not in FINISHED for job in list(self.jobs.values()))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+"""
+Stage timing and memory instrumentation for the chair extraction pipeline.
+
+process_dxf records its named stages (parse, scan, classify, delete,
+annotate, save, counts, export...) one after the other in a StageProfiler.
+Each stage gets its wall time, CPU time, resident memory and, when memory
+tracing is on, the peak of Python allocations seen by tracemalloc during the
+stage.
+"""
+
+import json
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def _rss_mb():
+    """Current resident set size in MB, None where it cannot be read"""
+    try:
+        with open('/proc/self/statm') as fp:
+            pages = int(fp.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE') / 2**20
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def _peak_rss_mb():
+    """Peak resident set size of the process in MB"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024  # kB on Linux
+
+
+def _children_peak_rss_mb():
+    """Peak resident set size in MB of the largest finished child process
+    (e.g. a pool worker), None where it cannot be read or without children"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return peak / 1024 if peak else None
+
+
+class StageProfiler:
+    """Wall time, CPU time and memory of each named pipeline stage
+
+    With trace_memory=True tracemalloc runs during the stages and the peak of
+    Python allocations is reported per stage; it slows the pipeline down, so
+    it is off by default.
+    """
+
+    def __init__(self, trace_memory=False):
+        self.trace_memory = trace_memory
+        self.stages = []
+        self._current = None
+
+    def begin(self, name):
+        """Start stage name, ending the current stage if any"""
+        self.end()
+        started_tracing = False
+        if self.trace_memory:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                started_tracing = True
+            tracemalloc.reset_peak()
+        self._current = (name, time.perf_counter(), time.process_time(), started_tracing)
+
+    def end(self):
+        """End the current stage and record it"""
+        if self._current is None:
+            return
+        name, wall, cpu, started_tracing = self._current
+        self._current = None
+        record = {
+            'stage': name,
+            'wall_s': time.perf_counter() - wall,
+            'cpu_s': time.process_time() - cpu,
+            'rss_mb': _rss_mb(),
+            'peak_rss_mb': _peak_rss_mb(),
+            'traced_peak_mb': None,
+        }
+        if self.trace_memory:
+            record['traced_peak_mb'] = tracemalloc.get_traced_memory()[1] / 2**20
+            if started_tracing:
+                tracemalloc.stop()
+        self.stages.append(record)
+
+    @contextmanager
+    def stage(self, name):
+        """Record the block as stage name (stages do not nest)"""
+        self.begin(name)
+        try:
+            yield
+        finally:
+            self.end()
+
+    def total(self, key='wall_s'):
+        return sum(stage[key] for stage in self.stages)
+
+    def report(self):
+        """Structured report: the stage records and their totals"""
+        return {
+            'stages': [dict(stage) for stage in self.stages],
+            'total_wall_s': self.total('wall_s'),
+            'total_cpu_s': self.total('cpu_s'),
+            'peak_rss_mb': _peak_rss_mb(),
+            'children_peak_rss_mb': _children_peak_rss_mb(),
+        }
+
+    def to_json(self, indent=2):
+        return json.dumps(self.report(), indent=indent)
+
+    def to_frame(self):
+        """Stage records as a DataFrame, for display"""
+        import pandas as pd
+        return pd.DataFrame(self.stages, columns=['stage', 'wall_s', 'cpu_s', 'rss_mb',
+                                                  'peak_rss_mb', 'traced_peak_mb'])
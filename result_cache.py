@@ -0,0 +1,152 @@
+# -*- coding: utf-8 -*-
+"""
+Disk-backed cache of chair extraction results.
+
+An entry is keyed by the SHA-256 of the input DXF plus the extraction
+parameters (layer, z_offset, mode) and the version of the extraction code, and
+holds the chair dataset (a ChairTable), chairs_df and the bytes of the
+modified DXF.  Entries are evicted least recently used first once the cache
+grows past its size cap.
+
+Entries are pickles, and loading one can run code, so the cache directory
+must be private: it defaults to a per-user folder (~/.cache, or
+$XDG_CACHE_HOME), is created with mode 0o700, and a directory owned by
+another user or writable by others is refused.
+"""
+
+import hashlib
+import os
+import pickle
+import stat
+import tempfile
+
+
+# per user: the entries are pickles, a shared folder would let others plant them
+DEFAULT_CACHE_DIR = os.path.join(os.environ.get('XDG_CACHE_HOME')
+                                 or os.path.join(os.path.expanduser('~'), '.cache'), 'dxf_extraction')
+DEFAULT_MAX_BYTES = 512 * 1024 * 1024
+
+# Source files whose content defines the results, a change invalidates the cache
+CODE_MODULES = ('dxf_extraction.py', 'chair_bins.py', 'chair_clusters.py', 'chair_export.py',
+                'chair_regions.py', 'chair_table.py', 'dxf_splice.py')
+
+_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as fp:
+        for chunk in iter(lambda: fp.read(_CHUNK), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def content_sha256(source):
+    """SHA-256 hex digest of a DXF file path or of in-memory DXF bytes"""
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return hashlib.sha256(source).hexdigest()
+    return file_sha256(source)
+
+
+def code_version():
+    """Short hash of the extraction source files"""
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in CODE_MODULES:
+        with open(os.path.join(here, name), 'rb') as fp:
+            digest.update(fp.read())
+    return digest.hexdigest()[:16]
+
+
+def private_directory(directory):
+    """Create directory with mode 0o700 and check that only the current user
+    can write to it; raises PermissionError otherwise"""
+    os.makedirs(directory, mode=0o700, exist_ok=True)
+    info = os.lstat(directory)
+    if not stat.S_ISDIR(info.st_mode):
+        raise PermissionError(f"cache directory '{directory}' is not a directory")
+    if hasattr(os, 'getuid'):  # POSIX, Windows has no owner or mode bits to check
+        if info.st_uid != os.getuid():
+            raise PermissionError(f"cache directory '{directory}' belongs to another user")
+        if info.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise PermissionError(f"cache directory '{directory}' is writable by other users")
+    return directory
+
+
+class ResultCache:
+    """Content-addressed store of (mtext_df, chairs_df, dxf_bytes) with LRU eviction"""
+
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = code_version()
+        private_directory(directory)
+
+    def key(self, content_hash, selected_layer, z_offset, **params):
+        """Cache key of one extraction run
+
+        content_hash is the content_sha256() of the input DXF and params holds
+        any further option that changes the result (e.g. stream).
+        """
+        parts = [content_hash, selected_layer, repr(float(z_offset)), self.version]
+        parts += [f"{name}={params[name]!r}" for name in sorted(params)]
+        return hashlib.sha256('\x00'.join(parts).encode('utf-8')).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.pkl')
+
+    def __contains__(self, key):
+        """True when key has an entry, without loading it"""
+        return os.path.isfile(self._path(key))
+
+    def get(self, key):
+        """Return (mtext_df, chairs_df, dxf_bytes) or None on a miss"""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as fp:
+                entry = pickle.load(fp)
+        except (OSError, pickle.UnpicklingError, EOFError):
+            return None
+        os.utime(path)  # mark as recently used
+        return entry['mtext_df'], entry['chairs_df'], entry['dxf_bytes']
+
+    def put(self, key, mtext_df, chairs_df, dxf_bytes=None):
+        """Store a result and evict the least recently used entries over the cap"""
+        entry = {'mtext_df': mtext_df, 'chairs_df': chairs_df, 'dxf_bytes': dxf_bytes}
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as fp:
+                pickle.dump(entry, fp, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+
+    def evict(self):
+        """Remove least recently used entries until the cache fits max_bytes"""
+        entries = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                try:
+                    stat = os.stat(os.path.join(self.directory, name))
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, name))
+        total = sum(size for _, size, _ in entries)
+        for _, size, name in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except OSError:
+                continue
+            total -= size
+
+    def clear(self):
+        """Remove every entry"""
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+"""Shared fixtures of the tests: small DXF drawings built with ezdxf"""
+
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+CHAIR_LABELS = [r'\A1;75', r'\A1;100', r'\A1;125', r'\A1;150', 'Elong 3']
+
+
+@pytest.fixture
+def floor_doc():
+    """Drawing with chair labels on layer PT and a line on layer GRID"""
+    ezdxf = pytest.importorskip('ezdxf')
+
+    doc = ezdxf.new('R2010')
+    doc.layers.new('PT')
+    doc.layers.new('GRID')
+    msp = doc.modelspace()
+    for i, text in enumerate(CHAIR_LABELS):
+        msp.add_mtext(text, dxfattribs={'layer': 'PT', 'insert': (10 * i, 0)})
+    msp.add_line((0, -5), (50, -5), dxfattribs={'layer': 'GRID'})
+    return doc
@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+"""Tag-level readers on binary DXF files"""
+
+import dxf_extraction
+
+
+def test_layer_summary_of_binary_dxf(floor_doc, tmp_path):
+    ascii_path = tmp_path / 'floor.dxf'
+    binary_path = tmp_path / 'floor_bin.dxf'
+    floor_doc.saveas(ascii_path)
+    floor_doc.saveas(binary_path, fmt='bin')
+
+    summary = dxf_extraction.read_layer_summary(str(ascii_path))
+    assert ('PT', 5) in summary
+    assert dxf_extraction.read_layer_summary(str(binary_path)) == summary
+    assert dxf_extraction.read_layer_summary(binary_path.read_bytes()) == summary
+
+
+def test_stream_scan_of_binary_dxf(floor_doc, tmp_path):
+    binary_path = tmp_path / 'floor_bin.dxf'
+    floor_doc.saveas(binary_path, fmt='bin')
+
+    scan = dxf_extraction.stream_layer(str(binary_path), 'PT')
+    assert len(scan.mtext_handles) == 5
+    assert list(scan.chair_table().heights) == [75, 100, 125, 150]
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+"""Spliced fast save against the full save"""
+
+import io
+
+import pytest
+
+import dxf_extraction
+
+
+def saved(doc):
+    buf = io.StringIO()
+    doc.write(buf)
+    return buf.getvalue().encode()
+
+
+def process(data, fast_save):
+    import ezdxf
+
+    out = io.BytesIO()
+    dxf_extraction.process_dxf(data, 'PT', 0.25, out, fast_save=fast_save, schedule_output=False)
+    return ezdxf.read(io.StringIO(out.getvalue().decode()))
+
+
+@pytest.mark.parametrize('fast_save', [False, True])
+def test_label_with_extension_dictionary(floor_doc, fast_save):
+    label = next(e for e in floor_doc.modelspace() if e.dxftype() == 'MTEXT')
+    xdict = label.new_extension_dict()
+    xdict.add_dictionary_var('NOTE', 'checked')
+
+    out = process(saved(floor_doc), fast_save)
+    auditor = out.audit()
+    assert not auditor.has_errors and not auditor.has_fixes
+    assert len(out.modelspace().query('TEXT[layer=="PT_chairs"]')) == 4
+
+
+def test_frozen_layer_gives_the_same_chair_layer(floor_doc):
+    pt = floor_doc.layers.get('PT')
+    pt.freeze()
+    pt.lock()
+    data = saved(floor_doc)
+
+    full, spliced = (process(data, fast_save).layers.get('PT_chairs') for fast_save in (False, True))
+    assert spliced.dxf.flags == full.dxf.flags == 0
+    assert spliced.dxfattribs(drop={'handle', 'owner'}) == full.dxfattribs(drop={'handle', 'owner'})